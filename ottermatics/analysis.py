@@ -1,14 +1,71 @@
 import attr
-from ottermatics.configuration import otterize, Configuration
-from ottermatics.components import Component, ComponentIterator
+from ottermatics.configuration import otterize, Configuration, fingerprint_value
+from ottermatics.components import Component, ComponentIterator, items_excluded
+from ottermatics.sources import ComponentSource
 from ottermatics.patterns import SingletonMeta
-from ottermatics.data import DBConnection
+from ottermatics.data import DBConnection, EvaluationCache
+from ottermatics.tabulation import TabulationMixin
+from ottermatics.columnar import ColumnarTable, arrow_row_block
+from ottermatics.sampling import sample, sample_count, adaptive_refine, SAMPLING_MODES
+from ottermatics.stopping import as_criteria
+from ottermatics import instrumentation
+from ottermatics.instrumentation import RunMetrics, perf_counter
 
 import datetime
 import os 
+import collections
+import itertools
+import pickle
+import json
+import hashlib
 from uuid import uuid4
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 
 import random
+import numpy
+import ray
+from scipy.integrate import solve_ivp, OdeSolution
+
+PARALLEL_MODES = ['process','ray']
+
+#The item evaluate_item gets in the default mode, where evaluate only takes the solve arguments
+NO_ITEM = object()
+
+#What solve_iter yields for each item, row is the analysis' new table row or None if nothing changed
+SolveStep = collections.namedtuple('SolveStep',('position','item','output','row'))
+
+#What a transient solve returns, the final time and state, the times and states of each event, the 
+#dense solution over the span (or None) and the integrator's status and message
+TransientResult = collections.namedtuple('TransientResult',('time','state','t_events','y_events',
+                                                            'solution','status','message'))
+
+#Names for solve_ivp methods, any of its methods can also be used
+INTEGRATORS = {'explicit':'RK45','stiff':'BDF'}
+
+#The analysis copy each worker process solves chunks of the iterator with
+_worker = {}
+
+def _init_worker(analysis,args,kwargs):
+    _worker.update(analysis=analysis,args=args,kwargs=kwargs)
+
+def _solve_chunk(chunk):
+    return _worker['analysis'].solve_chunk(chunk,*_worker['args'],**_worker['kwargs'])
+
+@ray.remote
+class RaySolver:
+    '''A ray actor holding a copy of the analysis that solves chunks of its iterator, the rows
+    come back as arrow batches'''
+
+    def __init__(self,analysis,args,kwargs):
+        self.analysis = analysis
+        self.args = args
+        self.kwargs = kwargs
+
+    def solve(self,chunk):
+        outputs,tables = self.analysis.solve_chunk(chunk,*self.args,**self.kwargs)
+        return outputs,{path: table.to_arrow() for path,table in tables.items() if table}
+
 
 @otterize  
 class Analysis(Component):
@@ -34,7 +91,7 @@ class Analysis(Component):
     _solved = False #this is used
     _uploaded = False #this is used by reporting system
     
-    modes = ['default','iterator']
+    modes = ['default','iterator','transient']
     mode = 'default'
 
     namepath_modes = ['analysis','iterator','both']
@@ -43,6 +100,40 @@ class Analysis(Component):
 
     run_id = attr.ib(default=None) #this gets logged!
 
+    #Checkpoints of an iterator solve, every `checkpoint_interval` items the tables are flushed to 
+    #segments and the position is saved so a failed run can pick up with resume(run_id)
+    checkpoint_interval = None
+    checkpoint_dir = None #by default checkpoints/ in config_path
+    _checkpoint_outputs = None
+
+    #Iterator items are looked up in the EvaluationCache by fingerprint before calling evaluate,
+    #only use this when evaluate is deterministic and its results come from attrs fields
+    cache_evaluations = False
+    fingerprint_exclude = ('run_id',)
+
+    #Solves record the time of each phase per class in a RunMetrics for the run_id, see metrics
+    instrument = True
+    _metrics = None
+
+    #Iterator solves and sweeps stop at the first of these criteria that is met, eg. a tolerance on
+    #the running mean of a column or a wall time (see ottermatics.stopping), the reason is kept
+    stopping_criteria = ()
+    stop_reason = None
+    _criteria = None
+
+    #The transient mode integrates the attrs fields in state_fields (a dotted name is a field of a
+    #component) with derivative(time,state) over transient_span, tabulating every output_dt in
+    #chunks of transient_chunk rows, see solve_transient
+    state_fields = ()
+    time_field = 'time'
+    transient_span = (0.0,1.0)
+    output_dt = None #100 steps over the span by default
+    integrator = 'explicit'
+    transient_chunk = 1000
+    dense_output = False
+    transient_events = () #event functions of (time,state), see solve_ivp
+    vectorized_derivative = False #derivative takes (n x k) states, helps the stiff integrators
+
     # #FIXME: Is it ok to override dataframe? its a super set so should be ok...
     # @property
     # def dataframe(self):
@@ -76,42 +167,847 @@ class Analysis(Component):
         '''Override me!'''
         return self.iterator
 
-    def solve(self,*args,**kwargs):
-        '''override at your own peril'''
-        prev_item = None
+    def solve(self,*args,parallel=None,workers=None,chunksize=None,checkpoint=None,stop=None,**kwargs):
+        '''override at your own peril
+        
+        :param parallel: 'process' evaluates chunks of the iterator in a pool of worker processes,
+                         each solving a copy of this analysis, see solve_parallel
+        :param workers: the number of worker processes, by default the cpu count
+        :param chunksize: the number of iterator items sent to a worker at once
+        :param checkpoint: items between checkpoints of a serial iterator solve, by default 
+                           checkpoint_interval, see resume
+        :param stop: stopping criteria of an iterator solve, by default stopping_criteria'''
         self.info(f'running analysis: {self} with input {self.component_iterator}')
 
         if not self._solved:
             #with alive_bar(len(locations)) as bar:
             self.run_id = str(uuid4())
-            if self.mode=='iterator' and self.component_iterator is not None:
-                output = []
-                for item in self.component_iterator:
-                    #curloc = self.component_iterator.current_location
-                    
-                    # if prev_item is not None: #We hotpatch the table since we loop over configs
-                    #     #loc._table = prev_loc._table
-                    #     prev_item.reset_table()
-                    
-                    output.append(self.evaluate(item,*args,**kwargs))
+            self.start_stopping(stop)
+            with self.instrumented():
+                if self.mode=='iterator' and self.component_iterator is not None and parallel:
+                    output = self.solve_parallel(parallel,workers,chunksize,*args,**kwargs)
+                    self._solved = True
+                    return output
 
-                    self.save_data()
-                    
-                    prev_item = item #We hotpatch the table since we loop over configs
+                elif self.mode=='iterator' and self.component_iterator is not None:
+                    self._checkpoint_outputs = []
+                    output = self.solve_items(0,[],checkpoint,*args,**kwargs)
+                    self._solved = True
+                    return output
 
-                self._solved = True
+                elif self.mode=='transient':
+                    output = self.solve_transient(*args,**kwargs)
+                    self._solved = True
+                    return output
 
-            else: #mode == 'default':                 
-                output = self.evaluate(*args,**kwargs)
-                self.save_data()
-                self._solved = True
-                return output
-            
-            #TODO: Add a ODE simulation analysis strategy
+                else: #mode == 'default':                 
+                    output = self.evaluate_item(NO_ITEM,*args,**kwargs)
+                    self._solved = True
+                    return output
 
         else:
             raise Exception('Analysis Already Solved')            
     
+    def solve_items(self,start,output,checkpoint=None,*args,**kwargs):
+        '''evaluates and saves the iterator items from position `start` on, appending to output
+        :param checkpoint: items between checkpoints, by default checkpoint_interval'''
+        for position,item,item_output in self.step_items(start,checkpoint,*args,**kwargs):
+            output.append(item_output)
+        return output
+
+    def step_items(self,start=0,checkpoint=None,*args,**kwargs):
+        '''A generator evaluating and saving one iterator item each time it is advanced, from 
+        position `start` on, yielding (position,item,output). Closing it early saves a checkpoint
+        when checkpointing so the run can be resumed, a stopping criterion ends it as complete
+        :param checkpoint: items between checkpoints, by default checkpoint_interval'''
+        checkpoint = self.checkpoint_interval if checkpoint is None else checkpoint
+        position = start
+        pending = [] #outputs since the last checkpoint
+        activate = self.instrument and instrumentation.ACTIVE is None #stepped outside solve
+        try:
+            for inx,item in enumerate(self.iterator_items(start),start):
+                if activate:
+                    with self.instrumented():
+                        output = self.evaluate_item(item,*args,**kwargs)
+                else:
+                    output = self.evaluate_item(item,*args,**kwargs)
+                position = inx + 1
+                if checkpoint:
+                    pending.append(output)
+                    if position % checkpoint == 0:
+                        self.save_checkpoint(position,pending)
+                        pending = []
+
+                stopping = self.should_stop(position)
+                yield position,item,output
+                if stopping:
+                    break
+
+        except GeneratorExit: #the consumer stopped
+            if checkpoint:
+                self.save_checkpoint(position,pending)
+            raise
+
+        if checkpoint:
+            self.save_checkpoint(position,pending,complete=True)
+
+    #Transient
+    def derivative(self,time,state):
+        '''the rate of change of the state_fields at time, override this for the transient mode
+        :param state: the values of state_fields, or (n x k) of them with vectorized_derivative
+        :returns: an array like state'''
+        raise NotImplementedError(f'{self.identity} needs derivative(time,state) to be solved transiently')
+
+    def transient_fields(self) -> list:
+        '''(configuration, field) of the time_field and each of the state_fields'''
+        owners = []
+        for path in (self.time_field,)+tuple(self.state_fields):
+            *parents,name = path.split('.')
+            conf = self
+            for parent in parents:
+                conf = getattr(conf,parent)
+            if name not in attr.fields_dict(type(conf)):
+                raise KeyError(f'{conf.identity} has no attrs field {name} for the transient state')
+            owners.append((conf,name))
+        return owners
+
+    def solve_transient(self,t_span=None,dt=None,t_eval=None,method=None,dense=None,events=None,
+                             chunk=None,**options):
+        '''Integrates the state_fields from their current values with scipy's solve_ivp, the output
+        times are integrated a chunk at a time and each chunk is tabulated with save_block, with the
+        time and state fields holding arrays of the chunk's values. Table properties are evaluated 
+        over the arrays, see table_property(array_safe=False). After each chunk the fields are set
+        back to the scalar time and state it ended at, then the stopping criteria are checked
+
+        :param t_span: (start,end) times, by default transient_span
+        :param dt: the output step, by default output_dt or 100 steps over the span
+        :param t_eval: the output times instead of dt
+        :param method: 'explicit' (RK45), 'stiff' (BDF) or any solve_ivp method, by default integrator
+        :param dense: keep a continuous solution over the span, by default dense_output
+        :param events: event functions of (time,state), with the terminal and direction attributes
+                       solve_ivp uses, by default transient_events
+        :param chunk: output times per chunk, by default transient_chunk
+        :param options: other solve_ivp options such as rtol, atol and max_step
+        :returns: a TransientResult'''
+        t0,t1 = self.transient_span if t_span is None else t_span
+        if t_eval is None:
+            dt = self.output_dt if dt is None else dt
+            count = int(numpy.floor((t1-t0)/dt + 1E-9)) + 1 if dt else 101
+            t_eval = t0 + numpy.arange(count) * (dt if dt else (t1-t0)/(count-1))
+        t_eval = numpy.asarray(t_eval,dtype=float)
+        method = INTEGRATORS.get(method or self.integrator,method or self.integrator)
+        dense = self.dense_output if dense is None else dense
+        events = list(self.transient_events if events is None else events)
+        chunk = chunk or self.transient_chunk
+
+        owners = self.transient_fields()
+        time = float(t0)
+        state = numpy.array([getattr(conf,name) for conf,name in owners[1:]],dtype=float)
+
+        for level,conf in self.go_through_configurations(0,self.store_level):
+            if isinstance(conf,TabulationMixin):
+                conf.TABLE.reserve(len(conf.TABLE)+len(t_eval))
+
+        set_field = object.__setattr__
+        def set_fields(values):
+            for (conf,name),value in zip(owners,values):
+                set_field(conf,name,value)
+                conf._property_changed(name)
+                conf._anything_changed = True
+
+        self.info(f'integrating {self.state_fields} over {t0}-{t1} with {method} to {len(t_eval)} outputs')
+        metrics = instrumentation.ACTIVE
+        t_events = [[] for event in events]
+        y_events = [[] for event in events]
+        solutions = []
+        status,message,rows = 0,'',0
+        for start in range(0,len(t_eval),chunk):
+            times = t_eval[start:start+chunk]
+            begin = perf_counter()
+            result = solve_ivp(self.derivative,(time,times[-1]),state,method=method,t_eval=times,
+                               dense_output=dense,events=events or None,
+                               vectorized=self.vectorized_derivative,**options)
+            if metrics is not None:
+                metrics.record('integrate',type(self).__name__,perf_counter()-begin)
+                metrics.count('nfev',result.nfev)
+            if result.status < 0:
+                raise RuntimeError(f'{self.identity} integration failed at {time}: {result.message}')
+
+            if dense:
+                solutions.append(result.sol)
+            for inx in range(len(events)):
+                t_events[inx].append(result.t_events[inx])
+                y_events[inx].append(result.y_events[inx].reshape(-1,len(state)))
+
+            size = len(result.t)
+            if size:
+                set_fields([result.t]+list(result.y))
+                self.save_block(size)
+                rows += size
+
+            status,message = result.status,result.message
+            if status == 1: #a terminal event, the last one found
+                hits = [(ts[-1],ys[-1]) for ts,ys in zip(result.t_events,result.y_events) if len(ts)]
+                time,state = max(hits,key=lambda hit: hit[0])
+            else:
+                time,state = times[-1],result.y[:,-1]
+            time = float(time)
+            set_fields([time]+[float(value) for value in state]) #scalars again between chunks
+            if status == 1 or self.should_stop(rows):
+                break
+
+        solution = None
+        if solutions:
+            ts = numpy.concatenate([solutions[0].ts]+[sol.ts[1:] for sol in solutions[1:]])
+            solution = OdeSolution(ts,[interp for sol in solutions for interp in sol.interpolants])
+        t_events = [numpy.concatenate(ts) for ts in t_events]
+        y_events = [numpy.concatenate(ys) for ys in y_events]
+        return TransientResult(time,numpy.asarray(state,dtype=float),t_events,y_events,solution,status,message)
+
+    #Stopping
+    def start_stopping(self,stop=None):
+        '''starts the stopping criteria of a solve, `stop` or stopping_criteria'''
+        self._criteria = as_criteria(self.stopping_criteria if stop is None else stop)
+        self.stop_reason = None
+        for criterion in self._criteria:
+            criterion.start(self)
+
+    def should_stop(self,items) -> bool:
+        '''checks the criteria after `items` were solved, the first that is met sets stop_reason'''
+        for criterion in self._criteria or ():
+            if criterion.check(self,items):
+                self.stop_reason = criterion.reason
+                self.info(f'stopping {self.run_id}: {criterion.reason}')
+                return True
+        return False
+
+    #Evaluation Cache
+    @property
+    def evaluation_cache(self) -> EvaluationCache:
+        return EvaluationCache()
+
+    def evaluation_key(self,item,*args,**kwargs) -> str:
+        '''the fingerprint of this analysis and everything it holds, the item and evaluate's arguments.
+        The other components of the iterator are left out, fingerprinting them for every item 
+        would cost the square of their number'''
+        if item is NO_ITEM:
+            return hashlib.blake2b(fingerprint_value([self,args,kwargs]),digest_size=20).hexdigest()
+        ancestors = frozenset([items_excluded(self.component_iterator)])
+        return hashlib.blake2b(fingerprint_value([self,item,args,kwargs],ancestors),digest_size=20).hexdigest()
+
+    def evaluate_item(self,item,*args,**kwargs):
+        '''evaluates the item and saves the data, with cache_evaluations a stored evaluation of the 
+        same fingerprint is used instead: the attrs fields evaluate changed are set and the stored 
+        rows are tabulated. In the default mode the item is NO_ITEM and evaluate gets the arguments
+        :returns: the output of evaluate'''
+        metrics = instrumentation.ACTIVE
+        if metrics is not None:
+            metrics.count('items')
+            if not metrics.sample():
+                metrics = None
+        start = perf_counter() if metrics is not None else None
+        if not self.cache_evaluations:
+            output = self.evaluate(*args,**kwargs) if item is NO_ITEM else self.evaluate(item,*args,**kwargs)
+            middle = perf_counter()
+            self.save_data()
+            if metrics is not None:
+                self.record_item(metrics,start,middle)
+            return output
+
+        cache = self.evaluation_cache
+        key = self.evaluation_key(item,*args,**kwargs)
+        entry = cache.lookup(key)
+        configs = self.row_configurations()
+        if entry is not None:
+            output,changes,rows = entry
+            for path,conf in configs:
+                for name,value in changes.get(path,{}).items():
+                    setattr(conf,name,value)
+            middle = perf_counter()
+            self.save_rows(rows)
+            if instrumentation.ACTIVE is not None:
+                instrumentation.ACTIVE.count('cache_hits')
+            if metrics is not None:
+                self.record_item(metrics,start,middle,'cached')
+            return output
+
+        output = self.evaluate(*args,**kwargs) if item is NO_ITEM else self.evaluate(item,*args,**kwargs)
+        middle = perf_counter()
+        changes = {path: {name: getattr(conf,name) for name in conf.dirty} for path,conf in configs if conf.dirty}
+        before = {path: (len(conf.TABLE),conf.index) for path,conf in configs}
+        self.save_data()
+
+        rows = {}
+        for path,conf in configs:
+            size,index = before[path]
+            if len(conf.TABLE) > size:
+                row = conf.TABLE.row(len(conf.TABLE)-1)
+                rows[path] = (row,row.get('index') == index) #the index is renumbered when used
+        cache.store(key,(output,changes,rows))
+        if metrics is not None:
+            self.record_item(metrics,start,middle)
+        return output
+
+    #Instrumentation
+    @property
+    def metrics(self) -> RunMetrics:
+        '''the RunMetrics of the current run_id'''
+        if self._metrics is None or self._metrics.run_id != self.run_id:
+            self._metrics = RunMetrics(self.run_id,self.identity)
+        return self._metrics
+
+    @contextmanager
+    def instrumented(self):
+        '''records the instrumentation hooks to this run's metrics while in the context'''
+        if not self.instrument:
+            yield None
+            return
+        with self.metrics.active() as metrics:
+            yield metrics
+
+    def record_item(self,metrics,start,middle,evaluate='evaluate'):
+        '''records a sample of the evaluate phase from start to middle, then saving the data and the item'''
+        end = perf_counter()
+        owner = type(self).__name__
+        weight = metrics.weight
+        metrics.record(evaluate,owner,middle-start,weight)
+        metrics.record('save_data',owner,end-middle,weight)
+        metrics.record('item',owner,end-start,weight)
+
+    @property
+    def metrics_dataframe(self):
+        return self.metrics.dataframe()
+
+    def run_summary(self) -> dict:
+        '''the json summary of the run's metrics, with the number of rows in each table'''
+        summary = self.metrics.summary()
+        summary['tables'] = {'.'.join(path) or self.identity: len(conf.TABLE) for path,conf in self.row_configurations()}
+        return summary
+
+    def save_metrics(self,path=None) -> str:
+        '''writes the run_summary as json, by default to metrics/<run_id>.json in config_path'''
+        if path is None:
+            path = os.path.join(self.config_path,'metrics',f'{self.run_id}.json')
+        os.makedirs(os.path.dirname(path),exist_ok=True)
+        with open(path,'w') as fp:
+            json.dump(self.run_summary(),fp,indent=2)
+        return path
+
+    def save_rows(self,rows):
+        '''saves data like save_data but with the stored {path: (row,renumber)} in place of the 
+        data_dict of those configurations, renumbered rows take the configuration's index'''
+        for path,conf in self.row_configurations():
+            if conf.anything_changed or not conf.TABLE:
+                if path not in rows:
+                    row = conf.data_dict
+                else:
+                    row,renumber = rows[path]
+                    row = dict(row,index=conf.index) if renumber else row
+                conf.TABLE.append(row)
+                conf.index += 1
+                conf.clear_cached_properties()
+            conf._anything_changed = False
+            conf.mark_clean()
+
+    def solve_iter(self,*args,batch_size=None,checkpoint=None,stop=None,**kwargs):
+        '''Solves the iterator one item at a time as the results are consumed, yielding a 
+        SolveStep(position,item,output,row) per item, or with `batch_size` a pyarrow RecordBatch of 
+        each `batch_size` new rows of the analysis table. 
+
+        Nothing is evaluated until the next result is asked for, and the run stops when the 
+        consumer does (break or close()), leaving the analysis unsolved. Outputs are not kept, 
+        set spill_rows on the tables to keep them from growing in memory
+        
+        for step in analysis.solve_iter():
+            if converged(step.row): 
+                break'''
+        if self._solved:
+            raise Exception('Analysis Already Solved')
+        if self.mode != 'iterator' or self.component_iterator is None:
+            raise ValueError('solve_iter needs an iterator mode analysis with a component_iterator')
+
+        self.run_id = str(uuid4())
+        self.start_stopping(stop)
+        self._checkpoint_outputs = []
+        self.info(f'streaming analysis: {self} with input {self.component_iterator}')
+
+        table = self.TABLE
+        start = len(table)
+        for position,item,output in self.step_items(0,checkpoint,*args,**kwargs):
+            if batch_size is None:
+                row = table.row(len(table)-1) if len(table) > start else None
+                start = len(table)
+                yield SolveStep(position,item,output,row)
+
+            elif len(table) - start >= batch_size:
+                yield table.to_arrow(start,len(table))
+                start = len(table)
+
+        if batch_size and len(table) > start:
+            yield table.to_arrow(start,len(table))
+        self._solved = True
+
+    #Checkpoints
+    @property
+    def checkpoint_root(self):
+        if self.checkpoint_dir is not None:
+            return self.checkpoint_dir
+        return os.path.join(self.config_path,'checkpoints')
+
+    def checkpoint_path(self,run_id=None) -> str:
+        return os.path.join(self.checkpoint_root,run_id or self.run_id)
+
+    def save_checkpoint(self,position,outputs,complete=False):
+        '''Flushes every table to segments in the run's checkpoint folder (or the table's own spill
+        folder) and saves the iterator position, indexes and tables so resume can carry on from here.
+        :param outputs: the evaluate outputs since the last checkpoint, saved alongside'''
+        path = self.checkpoint_path()
+        os.makedirs(path,exist_ok=True)
+
+        tables = {}
+        for cpath,conf in self.row_configurations():
+            table = conf.TABLE
+            if not table.spill_dir:
+                table.spill_dir = os.path.join(path,'tables','.'.join(cpath) or 'analysis')
+            table.flush()
+            tables[cpath] = (conf.index,table)
+
+        if self._checkpoint_outputs is None:
+            self._checkpoint_outputs = []
+        if outputs:
+            fil = os.path.join(path,f'outputs_{position:010d}.pkl')
+            with open(fil,'wb') as fp:
+                pickle.dump(list(outputs),fp)
+            self._checkpoint_outputs.append((os.path.basename(fil),len(outputs)))
+
+        iterator = self.component_iterator
+        order = iterator._shuffled if isinstance(iterator,ComponentIterator) else None #the seed
+
+        record = {'run_id':self.run_id,'position':position,'complete':complete,'tables':tables,
+                  'outputs':list(self._checkpoint_outputs),'order':order,
+                  'time':datetime.datetime.now()}
+        
+        tmp = os.path.join(path,'checkpoint.pkl.tmp')
+        with open(tmp,'wb') as fp:
+            pickle.dump(record,fp)
+        os.replace(tmp,os.path.join(path,'checkpoint.pkl')) #never leave half a checkpoint
+        self.debug(f'checkpoint {self.run_id} at {position}')
+
+    def load_checkpoint(self,run_id) -> dict:
+        fil = os.path.join(self.checkpoint_path(run_id),'checkpoint.pkl')
+        if not os.path.exists(fil):
+            raise FileNotFoundError(f'no checkpoint for run {run_id} in {self.checkpoint_root}')
+        with open(fil,'rb') as fp:
+            return pickle.load(fp)
+
+    def resume(self,run_id,*args,checkpoint=None,stop=None,**kwargs):
+        '''Continues an iterator solve from its last checkpoint, the tables and indexes are
+        restored, completed items are skipped and new rows are appended. The analysis should be
+        configured as it was for the original solve, with the same iterator
+        :returns: the outputs of evaluate for every item, including those before the checkpoint'''
+        record = self.load_checkpoint(run_id)
+        self.run_id = run_id
+        self.info(f'resuming {run_id} at {record["position"]}')
+
+        for cpath,conf in self.row_configurations():
+            if cpath in record['tables']:
+                conf.index,conf._table = record['tables'][cpath]
+                conf.reset_meta()
+                conf._anything_changed = False
+        self.start_stopping(stop) #criteria watch the restored tables
+            
+        iterator = self.component_iterator
+        if record['order'] is not None:
+            iterator._shuffled = record['order']
+
+        self._checkpoint_outputs = list(record['outputs'])
+        output = []
+        for fil,count in record['outputs']:
+            with open(os.path.join(self.checkpoint_path(run_id),fil),'rb') as fp:
+                output.extend(pickle.load(fp))
+
+        if not record['complete']:
+            output = self.solve_items(record['position'],output,checkpoint,*args,**kwargs)
+        self._solved = True
+        return output
+
+    def solve_parallel(self,parallel='process',workers=None,chunksize=None,*args,**kwargs):
+        '''Solves the iterator in chunks over a process pool, or ray actors. Each worker gets a copy
+        of this analysis, evaluates its chunk of items and tabulates the rows, which are merged back 
+        into the tables here in iterator order with their index renumbered. Rows are saved by the 
+        same rule as save_data, when a configuration changed or its table is empty.
+
+        With `ray` the analysis is put in the object store once and shared by `workers` RaySolver
+        actors, ray is started locally unless it was initialized (eg. connected to a cluster)
+
+        The analysis and its evaluate arguments must pickle, and the configurations here keep 
+        their state from before the solve since evaluate ran on the copies
+        :returns: the outputs of evaluate for each item in order'''
+        if parallel not in PARALLEL_MODES:
+            raise ValueError(f'parallel must be one of {PARALLEL_MODES}, got {parallel}')
+
+        count = self.iterator_count() #also fixes a shuffled order before the copy
+        if parallel == 'ray' and not ray.is_initialized():
+            ray.init()
+        if not workers:
+            workers = int(ray.cluster_resources().get('CPU',1)) if parallel == 'ray' else os.cpu_count()
+        if not chunksize:
+            chunksize = max(1,-(-count // (workers*4))) if count is not None else ComponentSource.chunksize
+        iterator = self.component_iterator
+        base = iterator.index if isinstance(iterator,TabulationMixin) else 0
+        chunks = self.iterator_chunks(chunksize,count,base)
+
+        configs = self.row_configurations()
+        if count is not None:
+            for path,conf in configs:
+                conf.TABLE.reserve(len(conf.TABLE)+count)
+
+        self.info(f'solving {"all" if count is None else count} items in chunks of {chunksize} over {workers} {parallel} workers')
+        if parallel == 'ray':
+            results = self._ray_chunks(chunks,workers,args,kwargs)
+        else:
+            results = self._process_chunks(chunks,workers,args,kwargs)
+
+        output = []
+        metrics = instrumentation.ACTIVE
+        for outputs,tables in results:
+            start = perf_counter()
+            output.extend(outputs)
+            for path,conf in configs:
+                table = tables.get(path)
+                if table is None:
+                    continue
+                if isinstance(table,ColumnarTable):
+                    block,size = table.row_block(),len(table)
+                else:
+                    block,size = arrow_row_block(table)
+                if size:
+                    block['index'] = numpy.arange(conf.index,conf.index+size)
+                    conf.TABLE.extend(block,size)
+                    conf.index += size
+                    if metrics is not None:
+                        metrics.count('rows',size)
+            if metrics is not None:
+                metrics.record('merge',type(self).__name__,perf_counter()-start)
+                metrics.count('items',len(outputs))
+            if self.should_stop(len(output)):
+                results.close() #the chunks left are cancelled
+                break
+        return output
+
+    def iterator_chunks(self,chunksize,count=None,base=0):
+        '''yields the (start,stop,base index,items) chunks of solve_parallel in order. Items are 
+        None when the iterator has random access so workers build their own, otherwise the items
+        are built here in one pass and each chunk gets its slice
+        :param count: the number of items, when None the chunks go on until the iterator ends'''
+        iterator = self.component_iterator
+        if count is not None and isinstance(iterator,ComponentIterator) and iterator.component_source.random_access:
+            for start in range(0,count,chunksize):
+                yield start,min(start+chunksize,count),base,None
+            return
+        if isinstance(iterator,ComponentIterator):
+            items = iterator.build_items(0,count)
+        else:
+            items = iter(self.iterator_items(0,count))
+        start = 0
+        while True:
+            chunk = list(itertools.islice(items,chunksize))
+            if not chunk:
+                return
+            yield start,start+len(chunk),base,chunk
+            start += len(chunk)
+
+    def _process_chunks(self,chunks,workers,args,kwargs):
+        '''yields the (outputs,tables) of each chunk in order from a process pool, a few chunks per
+        worker are submitted ahead so lazily built chunks aren't all held at once'''
+        with ProcessPoolExecutor(workers,initializer=_init_worker,initargs=(self,args,kwargs)) as pool:
+            pending = collections.deque()
+            try:
+                for chunk in chunks:
+                    pending.append(pool.submit(_solve_chunk,chunk))
+                    if len(pending) > 2*workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally: #a stopped solve doesn't wait on the rest
+                pool.shutdown(cancel_futures=True)
+
+    def _ray_chunks(self,chunks,workers,args,kwargs):
+        '''yields the (outputs,arrow batches) of each chunk in order from ray actors, submitted a 
+        few per actor ahead like _process_chunks'''
+        shared = ray.put(self)
+        solvers = []
+        pending = collections.deque()
+        try:
+            for inx,chunk in enumerate(chunks):
+                if len(solvers) < workers:
+                    solvers.append(RaySolver.remote(shared,args,kwargs))
+                pending.append(solvers[inx % len(solvers)].solve.remote(chunk))
+                if len(pending) > 2*workers:
+                    yield ray.get(pending.popleft())
+            while pending:
+                yield ray.get(pending.popleft())
+        finally:
+            for solver in solvers:
+                ray.kill(solver)
+
+    def row_configurations(self) -> list:
+        '''the (path, component) of each table save_data writes a row to, in tree order'''
+        seen = set()
+        configs = []
+        for node in self.tree_index(Component):
+            if id(node.config) not in seen:
+                seen.add(id(node.config))
+                configs.append((node.path,node.config))
+        return configs
+
+    def iterator_items(self,start=0,stop=None):
+        '''the items of the iterator from position start to stop, built on demand by a ComponentIterator'''
+        iterator = self.component_iterator
+        if isinstance(iterator,ComponentIterator):
+            return iterator.items(start,stop)
+        return itertools.islice(iterator,start,stop)
+
+    def iterator_count(self) -> int:
+        '''the number of iterator items, or None when it can't be known without building them'''
+        iterator = self.component_iterator
+        try:
+            if isinstance(iterator,ComponentIterator):
+                if iterator.shuffle_mode:
+                    iterator.shuffle_order()
+                return iterator.item_count()
+            return len(iterator)
+        except TypeError:
+            return None
+
+    def solve_chunk(self,chunk,*args,**kwargs):
+        '''evaluates items[start:stop] of the iterator and tabulates the rows each configuration 
+        would save in a new table, this runs in a worker process of solve_parallel
+        :param chunk: (start,stop,index of the iterator before the solve,items or None to build them)
+        :returns: (outputs,{path: table})'''
+        start,stop,base_index,items = chunk
+        iterator = self.component_iterator
+        if items is None:
+            items = self.iterator_items(start,stop)
+        elif isinstance(iterator,ComponentIterator):
+            items = iterator.iterate(items)
+        configs = self.row_configurations()
+        #only rows before anything was saved fill an empty table
+        primed = {path: bool(conf.TABLE) or start > 0 for path,conf in configs}
+        tables = {path: ColumnarTable(schema=conf.cls_table_schema(),blocks=conf.cls_table_blocks()) \
+                                                                              for path,conf in configs}
+        output = []
+        for inx,item in enumerate(items,start):
+            if isinstance(iterator,TabulationMixin):
+                iterator.index = base_index + inx
+                iterator._anything_changed = True
+            output.append(self.evaluate(item,*args,**kwargs))
+            for path,conf in configs:
+                if conf.anything_changed or not primed[path]:
+                    tables[path].append(conf.data_dict)
+                    conf.clear_cached_properties()
+                    primed[path] = True
+                conf._anything_changed = False
+                conf.mark_clean()
+        return output,tables
+
+    def sweep(self,component=None,mode='grid',samples=None,seed=None,evaluate=True,values:dict=None,
+                   vectorized=False,block_size=None,**arrays):
+        '''Evaluates and tabulates the analysis over samples of `component`'s attrs fields
+        
+        analysis.sweep(analysis.wing, span=numpy.linspace(1,10,10), chord=[1,2])
+
+        The values are converted and validated once up front, each sample is then set directly
+        without going through the attrs validators, and the tables are sized for the sweep.
+        The fields are returned to their original values afterwards
+
+        :param component: the configuration to vary, by default the analysis
+        :param mode: the sampling plan, grid, zip or lhs (latin hypercube over each span)
+        :param samples: the number of samples for lhs
+        :param seed: random seed for lhs
+        :param evaluate: call evaluate() before saving each sample
+        :param values: {field: array} for fields that would clash with these arguments
+        :param vectorized: set the fields to arrays of samples and evaluate once per block, the 
+                           rows are saved with save_block. evaluate and the table properties must
+                           work on arrays, see table_property(array_safe=False)
+        :param block_size: the most samples per vectorized block, all of them by default
+        :returns: the outputs of evaluate for each sample, or for each block when vectorized'''
+        component = self if component is None else component
+        arrays = dict(values or {},**arrays)
+        plan = self.sweep_plan(component,arrays,mode,samples,seed)
+        count = sample_count(plan)
+
+        if self.run_id is None:
+            self.run_id = str(uuid4())
+
+        for level,conf in self.go_through_configurations(0,self.store_level):
+            if isinstance(conf,TabulationMixin):
+                conf.TABLE.reserve(len(conf.TABLE)+count)
+
+        #the setter path, values are already python objects of the field's type
+        set_field = object.__setattr__
+        changed = component._property_changed
+        columns = [(name,values.tolist()) for name,values in plan.items()]
+        originals = {name:getattr(component,name) for name in plan}
+
+        self.info(f'sweeping {count} samples of {list(plan)} on {component.identity}')
+        output = []
+        try:
+            if vectorized:
+                block_size = count if not block_size else block_size
+                held = self.array_fields() #arrays from before the sweep are left alone
+                for start in range(0,count,block_size):
+                    size = min(block_size,count-start)
+                    for name,values in plan.items():
+                        set_field(component,name,values[start:start+size])
+                        changed(name)
+                    component._anything_changed = True
+                    if evaluate:
+                        output.append(self.evaluate())
+                    self.save_block(size)
+                    self.scalarize_fields(size,held)
+                return output
+
+            for inx in range(count):
+                for name,values in columns:
+                    set_field(component,name,values[inx])
+                    changed(name)
+                component._anything_changed = True
+                if evaluate:
+                    output.append(self.evaluate())
+                self.save_data()
+        finally:
+            for name,value in originals.items():
+                set_field(component,name,value)
+                changed(name)
+        return output
+
+    def array_fields(self) -> set:
+        '''the (configuration, attrs field) of the tree holding numpy arrays'''
+        return set([(conf,field.name) for level,conf in self.go_through_configurations() 
+                        for field in attr.fields(type(conf)) if isinstance(getattr(conf,field.name),numpy.ndarray)])
+
+    def scalarize_fields(self,size,held=frozenset()):
+        '''sets the attrs fields holding a vectorized block's arrays of `size` rows to their last 
+        row, so later saves and evaluations see the values of one sample
+        :param held: (configuration, field) that held arrays before the block and are kept'''
+        for conf,name in self.array_fields() - held:
+            values = getattr(conf,name)
+            if values.ndim and len(values) == size:
+                value = values[-1]
+                object.__setattr__(conf,name,value.item() if value.ndim == 0 else value)
+                conf._property_changed(name)
+
+    def sweep_plan(self,component,arrays,mode='grid',samples=None,seed=None) -> dict:
+        '''samples {field: values} with the sampling plan, after converting and validating each 
+        unique value with the fields' attrs converters and validators'''
+        fields = attr.fields_dict(type(component))
+        unknown = set(arrays) - set(fields)
+        if unknown:
+            raise KeyError(f'{component.identity} has no attrs fields {unknown} to sweep')
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f'sweep mode must be one of {list(SAMPLING_MODES)}, got {mode}')
+
+        plan = sample(arrays,mode,samples,seed)
+        for name,values in plan.items():
+            field = fields[name]
+            if field.converter is not None:
+                values = numpy.array([field.converter(val) for val in values.tolist()])
+            if field.validator is not None:
+                for value in dict.fromkeys(values.tolist()):
+                    field.validator(component,field,value)
+            plan[name] = values
+        return plan
+
+    def adaptive_sweep(self,component=None,outputs=None,budget=100,initial=None,batch=None,
+                            candidates=20,explore=0.1,seed=None,stop=None,evaluate=True,
+                            output_component=None,**bounds):
+        '''Evaluates and tabulates the analysis over samples of `component`'s numeric attrs fields
+        between bounds, starting from a latin hypercube and adding batches of samples where the
+        `outputs` change fastest (see sampling.adaptive_refine). Rows go to the same tables as sweep
+        and the fields are returned to their original values afterwards
+
+        analysis.adaptive_sweep(analysis.wing, outputs='lift', budget=60, span=(1,10), chord=(1,2))
+
+        :param component: the configuration to vary, by default the analysis
+        :param outputs: the column or columns to refine on, of the table of `output_component`
+        :param budget: the most samples
+        :param initial: latin hypercube samples to start from, by default 4 per field and at least 8
+        :param batch: samples added per refinement, by default half of initial
+        :param candidates: random candidates tried per added sample
+        :param explore: the weight of unexplored space relative to the steepest change
+        :param seed: random seed of the samples
+        :param stop: stopping criteria checked after each sample, by default stopping_criteria
+        :param output_component: the configuration whose table has the outputs, by default the analysis
+        :returns: the outputs of evaluate for each sample'''
+        component = self if component is None else component
+        target = self if output_component is None else output_component
+        outputs = [outputs] if isinstance(outputs,str) else list(outputs or [])
+        if not outputs:
+            raise ValueError('adaptive_sweep needs the output columns to refine on')
+        if not bounds:
+            raise ValueError('adaptive_sweep needs bounds of the fields to vary, eg. span=(1,10)')
+
+        names = list(bounds)
+        low = numpy.array([min(bounds[name]) for name in names],dtype=float)
+        high = numpy.array([max(bounds[name]) for name in names],dtype=float)
+        initial = min(budget,initial or max(4*len(names),8))
+        batch = batch or max(1,initial//2)
+
+        if self.run_id is None:
+            self.run_id = str(uuid4())
+        self.start_stopping(stop)
+
+        for level,conf in self.go_through_configurations(0,self.store_level):
+            if isinstance(conf,TabulationMixin):
+                conf.TABLE.reserve(len(conf.TABLE)+budget)
+
+        set_field = object.__setattr__
+        changed = component._property_changed
+        originals = {name:getattr(component,name) for name in names}
+        plan = self.sweep_plan(component,dict(bounds),'lhs',initial,seed)
+
+        self.info(f'adaptive sweep of {names} on {component.identity} refining {outputs}')
+        points,values,output = [],[],[]
+        try:
+            while plan is not None:
+                columns = [plan[name].tolist() for name in names]
+                for inx in range(sample_count(plan)):
+                    point = [column[inx] for column in columns]
+                    for name,value in zip(names,point):
+                        set_field(component,name,value)
+                        changed(name)
+                    component._anything_changed = True
+                    rows = len(target.TABLE)
+                    if evaluate:
+                        output.append(self.evaluate())
+                    self.save_data()
+
+                    points.append(point)
+                    if len(target.TABLE) > rows:
+                        values.append([target.TABLE.value(column) for column in outputs])
+                    else: #no row was saved, the last one belongs to another point
+                        values.append([numpy.nan]*len(outputs))
+                    if len(points) >= budget or self.should_stop(len(points)):
+                        plan = None
+                        break
+                else:
+                    size = min(batch,budget-len(points))
+                    known = numpy.isfinite(numpy.array(values,dtype=float)).all(axis=1) #missing points aren't refined on
+                    if known.any():
+                        known = numpy.flatnonzero(known)
+                        refine = [points[inx] for inx in known],[values[inx] for inx in known]
+                    else: #explore only
+                        refine = points,numpy.zeros((len(points),len(outputs)))
+                    new = adaptive_refine(*refine,low,high,size,candidates,explore,
+                                          None if seed is None else seed+len(points))
+                    plan = self.sweep_plan(component,{name: new[:,inx] for inx,name in enumerate(names)},'zip')
+        finally:
+            for name,value in originals.items():
+                set_field(component,name,value)
+                changed(name)
+        return output
+
     def post_process(self):
         '''override me!'''
         pass
@@ -160,7 +1056,7 @@ class Analysis(Component):
                 gdrive.sleep(2*(1+gdrive.time_fuzz*random.random()))                 
 
                 for df_result in self.variable_tables:
-                    df = df_result['df']
+                    df = df_result['df'].copy() #dont tag the cached dataframe
                     conf = df_result['conf']
 
                     if meta_tags is not None and type(meta_tags) is dict:
@@ -231,4 +1127,425 @@ class Analysis(Component):
     
 #     def remove_report(file):
 #         pass
-     
\ No newline at end of file
+     
+
+if __name__ == '__main__':
+
+    import unittest
+    import tempfile
+    import pandas
+    from ottermatics.tabulation import table_property
+    from ottermatics.sources import TableSource, GeneratorSource
+    from ottermatics.stopping import MaxEvaluations, StoppingCriterion, RunningTolerance
+
+    @otterize
+    class Part(Component):
+        x = attr.ib(1.0)
+
+        @table_property
+        def square(self):
+            return self.x**2
+
+    @otterize
+    class Parts(ComponentIterator):
+        _iterated_component_type = Part
+
+    @otterize
+    class Fixture(Component):
+        k = attr.ib(3.0)
+
+    @otterize
+    class PartsAnalysis(Analysis):
+        parts = attr.ib(factory=Parts)
+        fixture = attr.ib(factory=Fixture)
+        gain = attr.ib(1.0)
+        mode = 'iterator'
+        fail_at = None
+        calls = 0
+
+        def __attrs_post_init__(self):
+            self.parts.component_list = [Part(x=float(x)) for x in range(23)]
+
+        @property
+        def component_iterator(self):
+            return self.parts
+
+        def evaluate(self,item):
+            if item.x == self.fail_at:
+                raise RuntimeError('lost the instance')
+            self.gain = item.x * 2
+            PartsAnalysis.calls += 1
+            return item.x
+
+        @table_property
+        def total(self):
+            return self.gain + 1
+
+    @otterize
+    class Surface(Analysis):
+        a = attr.ib(0.0)
+        b = attr.ib(0.0)
+
+        @table_property
+        def height(self):
+            return float(numpy.tanh((self.a - 0.6) * 40))
+
+    @otterize
+    class GappySurface(Surface):
+        '''saves no row for half of the samples'''
+        def save_data(self,*args,**kwargs):
+            if self.b < 0.5:
+                super(GappySurface,self).save_data(*args,**kwargs)
+
+    def crossing(time,state):
+        return state[0]
+
+    @otterize
+    class Oscillator(Analysis):
+        time = attr.ib(0.0)
+        x = attr.ib(1.0)
+        v = attr.ib(0.0)
+        k = attr.ib(1.0)
+        mode = 'transient'
+        state_fields = ('x','v')
+        transient_span = (0.0,2*numpy.pi)
+
+        transient_events = (crossing,)
+
+        def derivative(self,time,state):
+            return [state[1],-self.k*state[0]]
+
+        @table_property
+        def energy(self):
+            return 0.5 * (self.v**2 + self.k*self.x**2)
+
+    def positive(instance,attribute,value):
+        if value <= 0:
+            raise ValueError(f'{attribute.name} must be positive, got {value}')
+
+    @otterize
+    class Beam(Analysis):
+        length = attr.ib(1.0,validator=positive)
+        load = attr.ib(2.0,converter=float)
+        moment = attr.ib(0.0)
+
+        def evaluate(self):
+            self.moment = self.length * self.load
+            return self.moment
+
+        @table_property
+        def stress(self):
+            return self.moment * 3
+
+    class TestSweep(unittest.TestCase):
+
+        def test_grid(self):
+            beam = Beam()
+            output = beam.sweep(length=[1.,2.],load=[1,2,3])
+            self.assertEqual(output,[1.,2.,3.,2.,4.,6.])
+            df = beam.dataframe
+            self.assertEqual(list(zip(df['length'],df['load'])),[(1.,1.),(1.,2.),(1.,3.),(2.,1.),(2.,2.),(2.,3.)])
+            self.assertEqual(df['load'].dtype,numpy.float64) #converted by the field
+            self.assertEqual(list(df['stress']),[3*value for value in output])
+            self.assertEqual((beam.length,beam.load),(1.0,2.0))
+
+        def test_plans(self):
+            beam = Beam()
+            plan = beam.sweep_plan(beam,{'length':[1.,2.,3.],'load':[4,5,6]},'zip')
+            self.assertEqual(list(plan['load']),[4.,5.,6.])
+            plan = beam.sweep_plan(beam,{'length':(1.,2.),'load':(0.,10.)},'lhs',samples=8,seed=1)
+            self.assertEqual({name: values.shape for name,values in plan.items()},{'length':(8,),'load':(8,)})
+            self.assertEqual(sorted(numpy.floor((plan['length']-1.)*8).astype(int)),list(range(8)))
+            again = beam.sweep_plan(beam,{'length':(1.,2.),'load':(0.,10.)},'lhs',samples=8,seed=1)
+            numpy.testing.assert_array_equal(plan['load'],again['load'])
+
+            beam.sweep(mode='lhs',samples=8,seed=1,length=(1.,2.),load=(0.,10.))
+            numpy.testing.assert_allclose(beam.dataframe['length'],plan['length'])
+            numpy.testing.assert_allclose(beam.dataframe['load'],plan['load'])
+
+        def test_values_and_evaluate(self):
+            beam = Beam()
+            output = beam.sweep(mode='zip',evaluate=False,values={'length':[1.,2.,3.]},load=[1.,1.,2.])
+            self.assertEqual(output,[])
+            df = beam.dataframe
+            self.assertEqual(list(df['length']),[1.,2.,3.])
+            self.assertEqual(list(df['moment']),[0.,0.,0.]) #not evaluated
+
+        def test_invalid(self):
+            beam = Beam()
+            with self.assertRaises(ValueError):
+                beam.sweep(length=[-1.,1.]) #validated before any sample
+            self.assertEqual(len(beam.TABLE),0)
+            with self.assertRaises(KeyError):
+                beam.sweep(width=[1.])
+            with self.assertRaises(ValueError):
+                beam.sweep(mode='spiral',length=[1.])
+
+        def test_vectorized(self):
+            beam = Beam()
+            output = beam.sweep(vectorized=True,block_size=4,length=numpy.arange(1.,11.))
+            self.assertEqual([len(block) for block in output],[4,4,2])
+            self.assertEqual(beam.length,1.0) #the swept field is restored
+            self.assertIs(type(beam.moment),float) #set by evaluate, left at the last sample
+            self.assertEqual(beam.moment,20.0)
+            beam.load = 3.0
+            beam.save_data()
+            df = beam.dataframe
+            self.assertEqual(len(df),11)
+            self.assertEqual(list(df['moment'][:10]),list(2.0*numpy.arange(1.,11.)))
+            self.assertEqual(df['moment'].iloc[-1],20.0)
+            self.assertEqual(df['moment'].dtype,numpy.float64)
+
+            serial = Beam()
+            serial.sweep(length=numpy.arange(1.,11.))
+            numpy.testing.assert_allclose(df['stress'][:10],serial.dataframe['stress'])
+
+    class TestParallelSolve(unittest.TestCase):
+
+        @classmethod
+        def setUpClass(cls):
+            cls.serial = PartsAnalysis()
+            cls.output = cls.serial.solve()
+
+        def assertSameTables(self,analysis,renumbered=True):
+            '''parallel solves renumber the index, the iterator's rows otherwise take the index
+            of the current component'''
+            drop = ['run_id','index'] if renumbered else ['run_id']
+            columns = lambda df: df.drop(columns=drop,errors='ignore')
+            for conf,other in ((analysis,self.serial),(analysis.parts,self.serial.parts),
+                               (analysis.fixture,self.serial.fixture)):
+                df = conf.dataframe
+                pandas.testing.assert_frame_equal(columns(df),columns(other.dataframe))
+                if renumbered:
+                    self.assertEqual(list(df['index']),list(range(len(df))))
+
+        def test_process(self):
+            analysis = PartsAnalysis()
+            output = analysis.solve(parallel='process',workers=2,chunksize=4)
+            self.assertEqual(output,self.output)
+            self.assertSameTables(analysis)
+            self.assertEqual(len(analysis.fixture.dataframe),1)
+
+        def test_resume(self):
+            with tempfile.TemporaryDirectory() as tmp:
+                failed = PartsAnalysis()
+                failed.checkpoint_dir,failed.checkpoint_interval,failed.fail_at = tmp,5,12.0
+                with self.assertRaises(RuntimeError):
+                    failed.solve()
+                self.assertEqual(failed.load_checkpoint(failed.run_id)['position'],10)
+
+                analysis = PartsAnalysis()
+                analysis.checkpoint_dir,analysis.checkpoint_interval = tmp,5
+                output = analysis.resume(failed.run_id)
+                self.assertEqual(output,self.output)
+                self.assertTrue(analysis.load_checkpoint(failed.run_id)['complete'])
+                self.assertEqual(analysis.parts.TABLE.spilled_rows,len(self.output))
+                self.assertSameTables(analysis,renumbered=False)
+
+                failed = PartsAnalysis()
+                failed.checkpoint_dir,failed.checkpoint_interval,failed.fail_at = tmp,5,12.0
+                with self.assertRaises(RuntimeError):
+                    failed.solve()
+                stopped = PartsAnalysis()
+                stopped.checkpoint_dir,stopped.checkpoint_interval = tmp,5
+                settled = RunningTolerance('total',atol=1E3,min_rows=5)
+                output = stopped.resume(failed.run_id,stop=settled)
+                self.assertEqual(output,self.output[:15]) #5 rows after the checkpoint
+                self.assertEqual(settled.rows,5)
+
+        def test_tree_index_reused(self):
+            analysis = PartsAnalysis()
+            index = analysis.tree_index()
+            analysis.solve()
+            self.assertIs(analysis.tree_index(),index) #items made current don't change the tree
+            analysis.fixture = Fixture(k=4.0)
+            self.assertIsNot(analysis.tree_index(),index)
+            self.assertIs(analysis.tree_index()[-1].config,analysis.fixture)
+
+        def test_incremental_frames(self):
+            analysis = PartsAnalysis()
+            confs = [conf for level,conf in analysis.go_through_configurations()]
+            for step in analysis.solve_iter():
+                joined = analysis.joined_dataframe
+                frames = [(conf.dataframe,conf.variable_dataframe) for conf in confs]
+                analysis.refresh()
+                pandas.testing.assert_frame_equal(joined,analysis.joined_dataframe)
+                for conf,(dataframe,variable) in zip(confs,frames):
+                    pandas.testing.assert_frame_equal(dataframe,conf.dataframe)
+                    if variable is None or conf.variable_dataframe is None:
+                        self.assertIs(variable,conf.variable_dataframe)
+                    else:
+                        pandas.testing.assert_frame_equal(variable,conf.variable_dataframe)
+            self.assertEqual(len(analysis.joined_dataframe),len(self.output))
+
+        def test_solve_iter(self):
+            analysis = PartsAnalysis()
+            steps = []
+            for step in analysis.solve_iter():
+                steps.append(step)
+                if step.position == 5:
+                    break
+            self.assertEqual([step.output for step in steps],self.output[:5])
+            self.assertEqual(steps[-1].row['total'],9.0)
+            self.assertFalse(analysis.solved)
+            self.assertEqual(len(analysis.parts.dataframe),5)
+
+            analysis = PartsAnalysis()
+            batches = list(analysis.solve_iter(batch_size=10))
+            self.assertEqual([batch.num_rows for batch in batches],[10,10,3])
+            self.assertEqual(batches[0].column('total').to_pylist()[:2],[1.0,3.0])
+            self.assertTrue(analysis.solved)
+
+        def test_evaluation_cache(self):
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = EvaluationCache(cache_dir=tmp,memory_items=8)
+                try:
+                    self.assertIs(EvaluationCache(),cache)
+                    with self.assertRaises(ValueError):
+                        EvaluationCache(memory_items=16)
+                    first = PartsAnalysis()
+                    first.cache_evaluations = True
+                    self.assertEqual(first.solve(),self.output)
+
+                    PartsAnalysis.calls = 0
+                    cache.memory.clear() #from disk
+                    analysis = PartsAnalysis()
+                    analysis.cache_evaluations = True
+                    self.assertEqual(analysis.solve(),self.output)
+                    self.assertEqual(PartsAnalysis.calls,0)
+                    self.assertSameTables(analysis,renumbered=False)
+
+                    changed = PartsAnalysis(gain=2.0)
+                    self.assertNotEqual(changed.fingerprint(),analysis.fingerprint())
+                    changed,fingerprint = PartsAnalysis(),PartsAnalysis().fingerprint()
+                    self.assertEqual(changed.fingerprint(),fingerprint)
+                    changed.parts.component_list[-1].x = 100.0 #not an attrs field of the analysis or iterator
+                    self.assertNotEqual(changed.fingerprint(),fingerprint)
+                    item = changed.parts.component_list[0]
+                    key = changed.evaluation_key(item)
+                    changed.parts.component_list = changed.parts.component_list[:5]
+                    self.assertEqual(changed.evaluation_key(item),key) #the item is keyed, not the list
+                    changed.fixture_copy = Fixture(k=4.0) #a plain attribute, indexed by tree_index
+                    self.assertNotEqual(changed.evaluation_key(item),key)
+                finally:
+                    cache.cache.close()
+
+        def test_lazy_source(self):
+            lazy = lambda: PartsAnalysis()
+            analysis = lazy()
+            analysis.parts.component_source = TableSource(Part,{'x':numpy.arange(23.)})
+            self.assertEqual(analysis.solve(),self.output)
+            self.assertSameTables(analysis,renumbered=False)
+
+            generate = lambda: (Part(x=float(x)) for x in range(23))
+            analysis = lazy()
+            analysis.parts.component_source = GeneratorSource(generate,chunksize=5)
+            self.assertEqual(analysis.solve(),self.output)
+            for length in (None,23): #built in one pass and handed out in chunks
+                analysis = lazy()
+                analysis.parts.component_source = GeneratorSource(generate,length=length)
+                self.assertEqual(analysis.solve(parallel='process',workers=2,chunksize=4),self.output)
+                self.assertEqual(len(analysis.parts.TABLE),len(self.output))
+
+            shuffled = []
+            for parallel in (None,'process'):
+                analysis = lazy()
+                analysis.parts.component_source = TableSource(Part,{'x':numpy.arange(23.)})
+                analysis.parts.shuffle_mode,analysis.parts.shuffle_seed = True,7
+                shuffled.append(analysis.solve(parallel=parallel,workers=2,chunksize=4))
+            self.assertEqual(shuffled[0],shuffled[1])
+            self.assertNotEqual(shuffled[0],self.output)
+            self.assertEqual(sorted(shuffled[0]),self.output)
+
+        def test_stopping(self):
+            analysis = PartsAnalysis()
+            self.assertEqual(analysis.solve(stop=MaxEvaluations(5)),self.output[:5])
+            self.assertIn('5 items',analysis.stop_reason)
+            self.assertEqual(len(analysis.parts.TABLE),5)
+
+            analysis = PartsAnalysis()
+            analysis.stopping_criteria = [MaxEvaluations(8)]
+            self.assertEqual(analysis.solve(parallel='process',workers=2,chunksize=4),self.output[:8])
+
+        def test_adaptive_sweep(self):
+            analysis = Surface()
+            analysis.adaptive_sweep(outputs='height',budget=60,initial=12,batch=8,seed=1,a=(0,1),b=(0,1))
+            df = analysis.dataframe
+            self.assertEqual(len(df),60)
+            self.assertEqual((analysis.a,analysis.b),(0.0,0.0))
+            refined = numpy.abs(df['a'].values[12:] - 0.6) < 0.15 #0.3 of the span
+            self.assertGreater(refined.mean(),0.5)
+
+            analysis = Surface()
+            analysis.adaptive_sweep(outputs='height',budget=60,stop=MaxEvaluations(20),a=(0,1),b=(0,1))
+            self.assertEqual(len(analysis.dataframe),20)
+
+            analysis = GappySurface()
+            analysis.adaptive_sweep(outputs='height',budget=30,initial=12,seed=1,a=(0,1),b=(0,1))
+            df = analysis.dataframe
+            self.assertLess(len(df),30)
+            self.assertTrue((df['b'] < 0.5).all())
+
+        def test_transient(self):
+            analysis = Oscillator()
+            result = analysis.solve(dt=0.01,chunk=100,dense=True,rtol=1E-8,atol=1E-10)
+            df = analysis.dataframe
+            self.assertEqual(len(df),int(2*numpy.pi/0.01)+1)
+            numpy.testing.assert_allclose(df['x'],numpy.cos(df['time']),atol=1E-6)
+            numpy.testing.assert_allclose(df['energy'],0.5,atol=1E-6)
+            self.assertAlmostEqual(result.solution(numpy.pi)[0],-1.0,places=6)
+            self.assertAlmostEqual(analysis.time,2*numpy.pi,places=2)
+            numpy.testing.assert_allclose(result.t_events[0],[numpy.pi/2,3*numpy.pi/2],atol=1E-6)
+
+            seen = []
+            class Watch(StoppingCriterion):
+                def check(self,analysis,items):
+                    seen.append(analysis.x)
+                    return False
+            Oscillator().solve(dt=0.01,chunk=100,stop=Watch())
+            self.assertEqual(len(seen),7)
+            self.assertTrue(all([type(x) is float for x in seen])) #not the chunk's array
+
+            analysis = Oscillator()
+            terminal = lambda time,state: state[0]
+            terminal.terminal = True
+            result = analysis.solve(method='stiff',events=[terminal],rtol=1E-8,atol=1E-10)
+            self.assertEqual(result.status,1)
+            self.assertAlmostEqual(result.time,numpy.pi/2,places=5)
+            self.assertLessEqual(analysis.dataframe['time'].max(),numpy.pi/2)
+            self.assertAlmostEqual(analysis.v,-1.0,places=5)
+
+        def test_metrics(self):
+            analysis = PartsAnalysis()
+            rate,RunMetrics.sample_rate = RunMetrics.sample_rate,1.0 #every item, the run's metrics are made in solve
+            try:
+                analysis.solve()
+            finally:
+                RunMetrics.sample_rate = rate
+            df = analysis.metrics_dataframe
+            phases = set(zip(df['phase'],df['owner']))
+            for phase in (('evaluate','PartsAnalysis'),('item','PartsAnalysis'),('data_dict','Parts'),
+                          ('table_property','PartsAnalysis.total'),('table_property','Part.square')):
+                self.assertIn(phase,phases)
+            summary = analysis.run_summary()
+            self.assertEqual(summary['run_id'],analysis.run_id)
+            self.assertEqual(summary['counters']['items'],len(self.output))
+            self.assertGreater(summary['rates']['rows_per_s'],0)
+            self.assertEqual(summary['tables']['parts'],len(self.output))
+            with tempfile.TemporaryDirectory() as tmp:
+                path = analysis.save_metrics(os.path.join(tmp,'metrics.json'))
+                with open(path) as fp:
+                    self.assertEqual(json.load(fp)['run_id'],analysis.run_id)
+            self.assertIsNone(instrumentation.ACTIVE)
+
+        def test_ray(self):
+            ray.init(num_cpus=2,include_dashboard=False,ignore_reinit_error=True)
+            try:
+                analysis = PartsAnalysis()
+                output = analysis.solve(parallel='ray',workers=2,chunksize=5)
+                self.assertEqual(output,self.output)
+                self.assertSameTables(analysis)
+            finally:
+                ray.shutdown()
+
+    unittest.main()
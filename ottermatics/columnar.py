@@ -0,0 +1,1295 @@
+'''Columnar storage for tabulated data
+
+The ColumnarTable keeps one typed numpy buffer per column instead of a list of row dictionaries,
+buffers are preallocated and grown geometrically so appending a row is an assignment per column.
+Numeric columns are stored as float64 or int64, anything else (strings) lands in an object column.
+
+Fixed length vectors are stored as a (rows x k) float block, each component of the vector is 
+exposed as its own float column that is a strided view of the block.
+
+Rows can still be appended and read back as dictionaries so code that treats a table as a list of
+dicts (reporting, database upload) keeps working, but dataframes and columns are built straight from
+the buffers. Most tables only ever hold a row or few, so until `row_threshold` rows a table without
+a capacity keeps them as a list of dictionaries, which is far smaller than a buffer per column, and 
+reads them through a columnar view built on demand.
+
+A table can also spill to disk, once a row or byte limit is hit the buffered rows are written to an
+Arrow IPC (or Parquet) segment file and the buffers are reused. Reads of spilled rows go through
+memory mapped segments, pyarrow is only needed when spilling.
+'''
+import os
+import uuid
+import functools
+import weakref
+import numpy
+import pandas
+
+#Column Kinds
+FLOAT_KIND = 'f'
+INT_KIND = 'i'
+OBJECT_KIND = 'O'
+
+KIND_DTYPES = {FLOAT_KIND: numpy.float64, INT_KIND: numpy.int64, OBJECT_KIND: object}
+
+#Values that can be tabulated, object columns track if they only hold these
+TABLE_TYPES = (int, float, str, type(None))
+
+
+def value_kind(value):
+    '''Maps a python value to the column kind that can hold it, None is treated as a missing float'''
+    if value is None:
+        return FLOAT_KIND
+    if isinstance(value, bool): #bool is an int, but we dont want to lose that
+        return OBJECT_KIND
+    if isinstance(value, (float, numpy.floating)):
+        return FLOAT_KIND
+    if isinstance(value, (int, numpy.integer)):
+        return INT_KIND
+    return OBJECT_KIND
+
+def array_kind(values):
+    '''The column kind for a numpy array of values'''
+    if values.dtype.kind == 'f':
+        return FLOAT_KIND
+    if values.dtype.kind in 'iu':
+        return INT_KIND
+    return OBJECT_KIND
+
+def same_value(value, other):
+    '''equality where missing values (nan) are equal to each other'''
+    if value is other:
+        return True
+    try:
+        return bool(value == other) or (value != value and other != other)
+    except (TypeError, ValueError):
+        return False
+
+def promote_kind(kind, other):
+    '''The smallest kind able to store values of both kinds'''
+    if kind == other:
+        return kind
+    if kind in (FLOAT_KIND, INT_KIND) and other in (FLOAT_KIND, INT_KIND):
+        return FLOAT_KIND
+    return OBJECT_KIND
+
+
+class TableColumn:
+    '''A growable typed buffer holding the values of a single column
+
+    The column also keeps running state updated as values are written so the table can be
+    classified without scanning it: the first value, if any value has differed from it, and if
+    every value has been a tabular type'''
+    __slots__ = ('name', 'kind', 'buffer', 'first', 'varies', 'tabular')
+
+    def __init__(self, name, kind, capacity):
+        self.name = name
+        self.kind = kind
+        self.buffer = self.allocate(kind, capacity)
+        self.first = numpy.nan
+        self.varies = False
+        self.tabular = True
+
+    def track(self, index, value):
+        '''update the running state with `value` written at row `index`'''
+        if index == 0:
+            self.first = value
+        elif not self.varies and not same_value(value, self.first):
+            self.varies = True
+        if self.tabular and not isinstance(value, TABLE_TYPES):
+            self.tabular = False
+
+    def track_block(self, index, values):
+        '''update the running state with an array of `values` written from row `index`'''
+        if not len(values):
+            return
+        if index == 0:
+            first = values[0]
+            self.first = first.item() if isinstance(first, numpy.generic) else first
+        if not self.varies:
+            first = self.first
+            if values.dtype.kind == 'f':
+                if first != first:
+                    self.varies = not numpy.isnan(values).all()
+                else:
+                    self.varies = bool((values != first).any())
+            elif values.dtype.kind in 'iu':
+                self.varies = bool((values != first).any())
+            else:
+                self.varies = not all([same_value(val, first) for val in values.tolist()])
+        if self.tabular and values.dtype.kind not in 'fiu':
+            self.tabular = all([isinstance(val, TABLE_TYPES) for val in values.tolist()])
+
+    @staticmethod
+    def allocate(kind, capacity):
+        buffer = numpy.empty(capacity, dtype=KIND_DTYPES[kind])
+        if kind != INT_KIND:
+            buffer.fill(numpy.nan)
+        return buffer
+
+    def grow(self, size, capacity):
+        '''copy the first `size` values into a new buffer with `capacity`'''
+        buffer = self.allocate(self.kind, capacity)
+        buffer[:size] = self.buffer[:size]
+        self.buffer = buffer
+
+    def promote(self, kind, size):
+        '''convert the column to a wider kind, keeping the first `size` values'''
+        if kind == self.kind:
+            return
+        buffer = self.allocate(kind, len(self.buffer))
+        buffer[:size] = self.buffer[:size]
+        self.kind = kind
+        self.buffer = buffer
+
+    def values(self, size):
+        return self.buffer[:size]
+
+    def get(self, index):
+        return self.buffer[index]
+
+    def slice(self, start, stop):
+        return self.buffer[start:stop]
+
+    def write(self, index, value, keyframe=False):
+        self.buffer[index] = value
+
+    def write_block(self, start, values, keyframes=None):
+        '''write an array of values from buffer row `start`'''
+        self.buffer[start:start+len(values)] = values
+
+    def reset(self):
+        '''forget the buffered values, the running state is kept'''
+        if self.kind == OBJECT_KIND: #release the references
+            self.buffer.fill(numpy.nan)
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    def dump(self, size):
+        '''the buffered values for pickling'''
+        return self.values(size).copy()
+
+    def load(self, values, size):
+        self.buffer[:size] = values
+
+    @property
+    def source(self):
+        '''the row key this column is written from'''
+        return self.name
+
+
+class DeltaColumn(TableColumn):
+    '''A column that only stores a value when it differs from the row before, as the row index and
+    value of each change. Rows are rebuilt by repeating each change until the next one, so a column
+    that hardly changes costs a few entries instead of a value per row
+
+    A keyframe writes the value whether or not it changed'''
+    __slots__ = ('rows', 'count')
+
+    initial_capacity = 16
+
+    def __init__(self, name, kind, capacity=None):
+        super().__init__(name, kind, self.initial_capacity)
+        self.rows = numpy.empty(self.initial_capacity, dtype=numpy.int64)
+        self.count = 0
+
+    def grow(self, size, capacity):
+        pass #changes are stored compactly, see write
+
+    def promote(self, kind, size):
+        super().promote(kind, self.count)
+
+    def write(self, index, value, keyframe=False):
+        count = self.count
+        if count and not keyframe:
+            last = self.buffer[count-1]
+            if same_value(value, last) and (self.kind != OBJECT_KIND or type(value) is type(last)):
+                return
+        if count and self.rows[count-1] == index: #rewriting the last row
+            count -= 1
+        elif count >= len(self.buffer):
+            capacity = 2 * len(self.buffer)
+            super().grow(count, capacity)
+            rows = numpy.empty(capacity, dtype=numpy.int64)
+            rows[:count] = self.rows[:count]
+            self.rows = rows
+        self.buffer[count] = value
+        self.rows[count] = index
+        self.count = count + 1
+
+    def write_block(self, start, values, keyframes=None):
+        '''write the changes in an array of values from buffer row `start`, rows at the `keyframes`
+        offsets into values are always written'''
+        size = len(values)
+        if not size:
+            return
+        changed = numpy.ones(size, dtype=bool)
+        if values.dtype.kind == 'f':
+            same = (values[1:] == values[:-1]) | (numpy.isnan(values[1:]) & numpy.isnan(values[:-1]))
+        else:
+            same = numpy.array([same_value(a, b) and type(a) is type(b) for a, b in 
+                                zip(values[1:].tolist(), values[:-1].tolist())], dtype=bool)
+        changed[1:] = ~same
+        if self.count and self.rows[self.count-1] < start:
+            last = self.buffer[self.count-1]
+            first = values[0]
+            first = first.item() if isinstance(first, numpy.generic) else first
+            changed[0] = not (same_value(first, last) and (self.kind != OBJECT_KIND or type(first) is type(last)))
+        if keyframes is not None:
+            changed[keyframes] = True
+
+        offsets = numpy.flatnonzero(changed)
+        count = self.count
+        needed = count + len(offsets)
+        if needed > len(self.buffer):
+            capacity = max(needed, 2 * len(self.buffer))
+            TableColumn.grow(self, count, capacity)
+            rows = numpy.empty(capacity, dtype=numpy.int64)
+            rows[:count] = self.rows[:count]
+            self.rows = rows
+        self.buffer[count:needed] = values[offsets]
+        self.rows[count:needed] = start + offsets
+        self.count = needed
+
+    def values(self, size):
+        return self.slice(0, size)
+
+    def get(self, index):
+        return self.buffer[numpy.searchsorted(self.rows[:self.count], index, 'right') - 1]
+
+    def slice(self, start, stop):
+        '''rebuilds rows [start:stop) by forward filling the changes'''
+        if stop <= start:
+            return self.buffer[:0].copy()
+        rows = self.rows[:self.count]
+        lo = numpy.searchsorted(rows, start, 'right') - 1
+        hi = numpy.searchsorted(rows, stop, 'left')
+        bounds = rows[lo:hi].copy()
+        bounds[0] = start
+        return numpy.repeat(self.buffer[lo:hi], numpy.diff(numpy.append(bounds, stop)))
+
+    def reset(self):
+        super().reset()
+        self.count = 0
+
+    @property
+    def changes(self):
+        '''the number of values stored'''
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes + self.rows.nbytes
+
+    def dump(self, size):
+        return (self.rows[:self.count].copy(), self.buffer[:self.count].copy())
+
+    def load(self, values, size):
+        rows, changes = values
+        self.count = 0
+        for index, value in zip(rows.tolist(), changes):
+            self.write(index, value, keyframe=True)
+
+
+class BlockColumn:
+    '''A (rows x width) float buffer holding a fixed length vector per row'''
+    __slots__ = ('name', 'width', 'buffer', 'splits')
+
+    def __init__(self, name, split_names, capacity):
+        self.name = name
+        self.width = len(split_names)
+        self.buffer = self.allocate(capacity)
+        self.splits = [SplitColumn(split, self, inx) for inx, split in enumerate(split_names)]
+
+    def allocate(self, capacity):
+        buffer = numpy.empty((capacity, self.width), dtype=numpy.float64)
+        buffer.fill(numpy.nan)
+        return buffer
+
+    def grow(self, size, capacity):
+        buffer = self.allocate(capacity)
+        buffer[:size] = self.buffer[:size]
+        self.buffer = buffer
+
+    def values(self, size):
+        return self.buffer[:size]
+
+
+class SplitColumn(TableColumn):
+    '''A float column that is one component of a BlockColumn, its buffer is a view of the block'''
+    __slots__ = ('block', 'offset')
+
+    def __init__(self, name, block, offset):
+        self.name = name
+        self.kind = FLOAT_KIND
+        self.block = block
+        self.offset = offset
+        self.first = numpy.nan
+        self.varies = False
+        self.tabular = True
+
+    @property
+    def buffer(self):
+        return self.block.buffer[:, self.offset]
+
+    @property
+    def source(self):
+        return self.block.name
+
+    def grow(self, size, capacity):
+        pass #the block grows
+
+    def promote(self, kind, size):
+        raise TypeError(f'vector column {self.name} can only hold floats')
+
+
+#The last view built of a table holding rows as dictionaries, (weakref to the table, version, view),
+#so a run of reads of one small table builds it once without every table keeping its own
+_last_view = (None, None, None)
+
+def row_list_view(method):
+    '''reads a table still holding its rows as dictionaries through a columnar view of them'''
+    @functools.wraps(method)
+    def read(self, *args, **kwargs):
+        if self._rows is not None:
+            return method(self._view(), *args, **kwargs)
+        return method(self, *args, **kwargs)
+    return read
+
+
+class ColumnarTable:
+    '''A table stored as one numpy buffer per column, with a per-class schema of column kinds
+
+    `version` increments on every change to the table and `schema_version` whenever a column is
+    added or changes kind, so consumers can tell if they only need the rows added since they looked
+
+    Rows with a numpy array value are written into a block, the block's columns are named by
+    `blocks` or default to `{key}_{i}`
+
+    :param schema: a dictionary of {column: kind} used to pick the column dtype before data arrives,
+                   it is only read so one dictionary can be shared by the tables of a class
+    :param blocks: a dictionary of {key: (column names,...)} for vector values, also shared
+    :param capacity: the number of rows to preallocate
+    :param spill_dir: a directory to write segments to, spilling is off without one
+    :param spill_rows: spill once this many rows are buffered
+    :param spill_bytes: spill instead of growing the buffers past this many bytes (approximate, 
+                        object columns count their pointers)
+    :param spill_format: `arrow` segments are memory mapped when read, or `parquet`
+    :param delta: store scalar columns as DeltaColumns, only the values that change are kept
+    :param keyframe_interval: with delta, every column is written every this many rows'''
+
+    initial_capacity = 4 #most tables hold a row or few, larger ones grow geometrically
+    row_threshold = 8 #rows kept as dictionaries before switching to column buffers, see append
+    _rows = None #the rows as dictionaries, None once the table is columnar
+    growth_factor = 2
+    spill_formats = ('arrow','parquet')
+    segment_prefix = 'segment'
+    _shared_segments = frozenset() #segments of the table this was copied from, see __copy__
+    keyframe_interval = 256
+
+    def __init__(self, schema=None, capacity=None, blocks=None, spill_dir=None, spill_rows=None, 
+                       spill_bytes=None, spill_format='arrow', delta=False, keyframe_interval=None):
+        self.schema = schema if schema is not None else {}
+        self.blocks = blocks if blocks is not None else {}
+        self._blocks = {}
+        self._columns = {}
+        self._size = 0 #rows in the buffers
+        self._offset = 0 #rows in segments
+        self._segments = [] #(path,start,stop)
+        self._capacity = int(capacity) if capacity else self.initial_capacity
+        self._rows = None if capacity else []
+        self.version = 0
+        self.schema_version = 0
+
+        assert spill_format in self.spill_formats, f'spill_format must be one of {self.spill_formats}'
+        self.spill_dir = spill_dir
+        self.spill_rows = spill_rows
+        self.spill_bytes = spill_bytes
+        self.spill_format = spill_format
+
+        self.delta = delta
+        if keyframe_interval:
+            self.keyframe_interval = keyframe_interval
+
+    #List Emulation, rows are dictionaries
+    def __len__(self):
+        return self._offset + self._size
+
+    def __bool__(self):
+        return len(self) > 0
+
+    @row_list_view
+    def __iter__(self):
+        names = list(self._columns.keys())
+        for path,start,stop in self._segments:
+            segment = self._read_segment(path, names)
+            values = [self._segment_column(segment, name, stop-start).tolist() for name in names]
+            for row in zip(*values):
+                yield dict(zip(names, row))
+
+        values = [col.values(self._size).tolist() for col in self._columns.values()]
+        for row in zip(*values):
+            yield dict(zip(names, row))
+
+    @row_list_view
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(inx) for inx in range(*index.indices(len(self)))]
+        return self.row(index)
+
+    @row_list_view
+    def row(self, index):
+        '''returns the row at `index` as a dictionary of python values'''
+        size = len(self)
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError(f'row {index} out of range for table of {size} rows')
+        if index < self._offset:
+            return {name: values[0] for name, values in self._range_columns(index, index+1).items()}
+
+        index -= self._offset
+        out = {}
+        for name, col in self._columns.items():
+            value = col.get(index)
+            out[name] = value if col.kind == OBJECT_KIND else value.item()
+        return out
+
+    @row_list_view
+    def value(self, name, index=-1):
+        '''the python value of column `name` at row `index`, the last row by default'''
+        size = len(self)
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError(f'row {index} out of range for table of {size} rows')
+        if index < self._offset:
+            return self._range_columns(index, index+1, [name])[name][0]
+        col = self._columns[name]
+        value = col.get(index - self._offset)
+        return value if col.kind == OBJECT_KIND else value.item()
+
+    def append(self, row: dict):
+        '''add a row of {column: value}, columns not in the row are filled as missing'''
+        if self._rows is not None:
+            if self._size < self._row_limit():
+                self._rows.append({key: value.copy() if isinstance(value, numpy.ndarray) else value 
+                                                                    for key, value in row.items()})
+                self._size += 1
+                self.version += 1
+                self.schema_version += 1 #the columns aren't known until the view is built
+                return
+            self._columnar()
+
+        if self._size >= self._capacity:
+            if self.spill_dir and self.spill_bytes and self.nbytes * self.growth_factor > self.spill_bytes:
+                self.flush()
+            else:
+                self._grow(self._capacity * self.growth_factor)
+
+        inx = self._size
+        rinx = self._offset + inx #the row index, for column tracking
+        keyframe = self.delta and (inx == 0 or rinx % self.keyframe_interval == 0)
+        columns = self._columns
+        written = 0
+        for key, value in row.items():
+            if isinstance(value, numpy.ndarray):
+                block = self._blocks.get(key)
+                if block is None:
+                    block = self._add_block(key, value)
+                try:
+                    block.buffer[inx] = value
+                except ValueError:
+                    raise ValueError(f'vector {key} should have {block.width} values, got shape {value.shape}')
+                for col, val in zip(block.splits, block.buffer[inx].tolist()):
+                    col.track(rinx, val)
+                written += block.width
+                continue
+
+            written += 1
+            kind = value_kind(value)
+            col = columns.get(key)
+            if col is None:
+                col = self._add_column(key, kind)
+            elif kind != col.kind and not (col.kind == FLOAT_KIND and kind == INT_KIND):
+                self._promote(col, promote_kind(col.kind, kind))
+            if value is None:
+                value = numpy.nan
+            try:
+                col.write(inx, value, keyframe)
+            except OverflowError: #python ints can outgrow int64
+                self._promote(col, OBJECT_KIND)
+                col.write(inx, value, keyframe)
+            col.track(rinx, value)
+
+        if written != len(columns): #fill missing values
+            for key, col in columns.items():
+                if col.source not in row:
+                    if col.kind == INT_KIND:
+                        self._promote(col, FLOAT_KIND)
+                    col.write(inx, numpy.nan, keyframe)
+                    col.track(rinx, numpy.nan)
+
+        self._size += 1
+        self.version += 1
+
+        if self.spill_dir and self.spill_rows and self._size >= self.spill_rows:
+            self.flush()
+
+    def extend(self, columns: dict, size: int):
+        '''add `size` rows at once from {column: array of size values, or one value for every row},
+        a (size x k) array is written to a block. Columns not given are filled as missing'''
+        if size <= 0:
+            return
+        if self._rows is not None:
+            self._columnar()
+        limit = self._buffer_limit()
+        if limit is None or self._size + size <= limit:
+            self._extend_buffers(columns, size)
+            return
+
+        start = 0 #spill as we go, filling the buffers up to the limit each time
+        while start < size:
+            if self._size >= limit:
+                self.flush()
+            take = min(limit - self._size, size - start)
+            self._extend_buffers({key: value[start:start+take] if isinstance(value, numpy.ndarray) else value 
+                                                                for key, value in columns.items()}, take)
+            start += take
+            limit = self._buffer_limit()
+
+    def _extend_buffers(self, columns, size):
+        '''writes `size` rows of extend to the buffers, growing them as needed'''
+        if self._size + size > self._capacity:
+            self._grow(max(self._size + size, self._capacity * self.growth_factor))
+
+        start = self._size
+        rstart = self._offset + start
+        keyframes = None
+        if self.delta:
+            keyframes = numpy.flatnonzero(numpy.arange(rstart, rstart + size) % self.keyframe_interval == 0)
+            if start == 0:
+                keyframes = numpy.union1d(keyframes, [0])
+
+        written = set()
+        for key, value in columns.items():
+            if isinstance(value, numpy.ndarray) and value.ndim == 2:
+                block = self._blocks.get(key)
+                if block is None:
+                    block = self._add_block(key, value[0])
+                if value.shape != (size, block.width):
+                    raise ValueError(f'vector {key} should have shape {(size, block.width)}, got {value.shape}')
+                block.buffer[start:start+size] = value
+                for col in block.splits:
+                    col.track_block(rstart, block.buffer[start:start+size, col.offset])
+                    written.add(col.name)
+                continue
+
+            if isinstance(value, numpy.ndarray):
+                if value.shape != (size,):
+                    raise ValueError(f'column {key} should have {size} values, got shape {value.shape}')
+                if value.dtype.kind in 'USb': #strings and bools are kept as python objects
+                    value = value.astype(object)
+                kind = array_kind(value)
+                values = value
+            else:
+                if value is None:
+                    value = numpy.nan
+                kind = value_kind(value)
+                values = numpy.empty(size, dtype=KIND_DTYPES[kind])
+                values.fill(value)
+
+            col = self._columns.get(key)
+            if col is None:
+                col = self._add_column(key, kind)
+            elif kind != col.kind and not (col.kind == FLOAT_KIND and kind == INT_KIND):
+                self._promote(col, promote_kind(col.kind, kind))
+            if values.dtype != KIND_DTYPES[col.kind]:
+                values = values.astype(KIND_DTYPES[col.kind])
+            col.write_block(start, values, keyframes)
+            col.track_block(rstart, values)
+            written.add(key)
+
+        if len(written) != len(self._columns): #fill missing values
+            missing = numpy.full(size, numpy.nan)
+            for key, col in self._columns.items():
+                if key not in written:
+                    if col.kind == INT_KIND:
+                        self._promote(col, FLOAT_KIND)
+                    values = missing if col.kind == FLOAT_KIND else missing.astype(object)
+                    col.write_block(start, values, keyframes)
+                    col.track_block(rstart, values)
+
+        self._size += size
+        self.version += 1
+
+        limit = self._buffer_limit()
+        if limit is not None and self._size >= limit:
+            self.flush()
+
+    @row_list_view
+    def row_block(self, start=0, stop=None):
+        '''rows [start:stop) as {column: array}, with vectors as (rows x k) arrays under their row
+        key, so they can be added to another table with extend'''
+        stop = len(self) if stop is None else min(stop, len(self))
+        data = self._range_columns(start, stop)
+        for name, block in self._blocks.items():
+            data[name] = numpy.column_stack([data.pop(col.name) for col in block.splits])
+        return data
+
+    @row_list_view
+    def to_arrow(self, start=0, stop=None):
+        '''rows [start:stop) as a pyarrow RecordBatch, the split columns of each vector are kept with 
+        the block names in the schema metadata, see arrow_row_block'''
+        import json
+        import pyarrow
+        stop = len(self) if stop is None else min(stop, len(self))
+        data = self._range_columns(start, stop)
+        arrays = arrow_arrays({name: (self._columns[name].kind, values) for name, values in data.items()})
+        blocks = {name: [col.name for col in block.splits] for name, block in self._blocks.items()}
+        return pyarrow.RecordBatch.from_pydict(arrays, metadata={'blocks': json.dumps(blocks)})
+
+    def reserve(self, capacity):
+        '''ensure the buffers can hold `capacity` rows, a spilling table reserves no more than it 
+        buffers before spilling'''
+        capacity = int(capacity)
+        if self._rows is not None:
+            if capacity <= self._row_limit():
+                return
+            self._columnar()
+        limit = self._buffer_limit()
+        if limit is not None:
+            capacity = min(capacity, limit)
+        self._grow(capacity)
+
+    def _buffer_limit(self):
+        '''the rows buffered before spilling by spill_rows or by the bytes per row of spill_bytes, 
+        None when the table doesn't spill'''
+        if not self.spill_dir:
+            return None
+        limit = self.spill_rows
+        if self.spill_bytes and self.nbytes:
+            rows = max(int(self.spill_bytes * self._capacity / self.nbytes), 1)
+            limit = rows if limit is None else min(limit, rows)
+        return limit
+
+    def _row_limit(self):
+        '''the rows kept as dictionaries, no more than are buffered before spilling'''
+        if self.spill_dir and self.spill_rows:
+            return min(self.row_threshold, self.spill_rows - 1)
+        return self.row_threshold
+
+    def _view(self):
+        '''a columnar table of the rows held as dictionaries, to read them by column'''
+        global _last_view
+        ref, version, view = _last_view
+        if ref is not None and ref() is self and version == self.version:
+            return view
+        view = type(self)(self.schema, capacity=max(self._size, 1), blocks=self.blocks, delta=self.delta,
+                          keyframe_interval=self.keyframe_interval)
+        for row in self._rows:
+            view.append(row)
+        _last_view = (weakref.ref(self), self.version, view)
+        return view
+
+    def _columnar(self):
+        '''switches from rows held as dictionaries to the column buffers'''
+        rows, self._rows = self._rows, None
+        self._size = 0
+        for row in rows:
+            self.append(row)
+        self.schema_version += 1
+
+    def _grow(self, capacity):
+        if capacity <= self._capacity:
+            return
+        for col in self._columns.values():
+            col.grow(self._size, capacity)
+        for block in self._blocks.values():
+            block.grow(self._size, capacity)
+        self._capacity = capacity
+
+    def _add_column(self, key, kind):
+        if key in self.schema:
+            kind = promote_kind(self.schema[key], kind)
+        if len(self) > 0 and kind == INT_KIND: #earlier rows are missing
+            kind = FLOAT_KIND
+        if self.delta:
+            col = DeltaColumn(key, kind)
+            if self._size > 0:
+                col.write(0, numpy.nan, keyframe=True)
+        else:
+            col = TableColumn(key, kind, self._capacity)
+        if len(self) > 0: #the earlier rows were missing
+            col.track(0, numpy.nan)
+        self._columns[key] = col
+        self.schema_version += 1
+        return col
+
+    def _add_block(self, key, value):
+        names = self.blocks.get(key)
+        if names is None:
+            names = [f'{key}_{inx}' for inx in range(value.size)]
+        block = BlockColumn(key, names, self._capacity)
+        self._blocks[key] = block
+        for col in block.splits:
+            if len(self) > 0:
+                col.track(0, numpy.nan)
+            self._columns[col.name] = col
+        self.schema_version += 1
+        return block
+
+    def _promote(self, col, kind):
+        col.promote(kind, self._size)
+        self.schema_version += 1
+
+    def clear(self):
+        self.remove_segments()
+        self._blocks = {}
+        self._columns = {}
+        self._size = 0
+        self._capacity = self.initial_capacity
+        self._rows = []
+        self.version += 1
+        self.schema_version += 1
+
+    #Spilling
+    @property
+    def segments(self):
+        '''the (path,start row,stop row) of each segment written to disk'''
+        return list(self._segments)
+
+    @property
+    def spilled_rows(self):
+        return self._offset
+
+    def flush(self):
+        '''writes the buffered rows to a new segment in spill_dir, then reuses the buffers'''
+        if not self._size:
+            return
+        if not self.spill_dir:
+            raise ValueError('set a spill_dir to flush the table')
+        if self._rows is not None:
+            self._columnar()
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        ext = 'arrow' if self.spill_format == 'arrow' else 'parquet'
+        path = os.path.join(self.spill_dir, f'{self.segment_prefix}_{len(self._segments):05d}.{ext}')
+        write_segment(path, {name: (col.kind, col.values(self._size)) for name, col in self._columns.items()}, 
+                      self.spill_format)
+
+        self._segments.append((path, self._offset, self._offset + self._size))
+        self._offset += self._size
+        self._size = 0
+        for col in self._columns.values():
+            col.reset()
+
+    def remove_segments(self):
+        '''deletes the segment files, the rows in them are lost. Segments shared with the table this
+        one was copied from are only forgotten'''
+        for path,start,stop in self._segments:
+            if path not in self._shared_segments and os.path.exists(path):
+                os.remove(path)
+        self._segments = []
+        self._offset = 0
+
+    def _read_segment(self, path, columns=None):
+        return read_segment(path, columns)
+
+    def _segment_column(self, segment, name, rows):
+        '''a column of a read segment as the current kind, filled as missing if the segment doesn't have it'''
+        col = self._columns[name]
+        if name not in segment.column_names:
+            return TableColumn.allocate(FLOAT_KIND if col.kind == INT_KIND else col.kind, rows)
+        values = segment.column(name).to_numpy(zero_copy_only=False)
+        if col.kind == OBJECT_KIND:
+            values = numpy.array([numpy.nan if val is None else val for val in values.tolist()], dtype=object)
+        elif values.dtype != KIND_DTYPES[col.kind]:
+            values = values.astype(KIND_DTYPES[col.kind])
+        return values
+
+    def _range_columns(self, start, stop, columns=None):
+        '''the values of rows [start:stop) for each column, spanning segments and the buffers'''
+        names = self.keys() if columns is None else list(columns)
+        if start >= self._offset:
+            return {name: self._columns[name].slice(start-self._offset, stop-self._offset) for name in names}
+
+        pieces = {name: [] for name in names}
+        for path,seg_start,seg_stop in self._segments:
+            if seg_stop <= start or seg_start >= stop:
+                continue
+            segment = self._read_segment(path, names)
+            lo, hi = max(start, seg_start) - seg_start, min(stop, seg_stop) - seg_start
+            for name in names:
+                pieces[name].append(self._segment_column(segment, name, seg_stop-seg_start)[lo:hi])
+
+        if stop > self._offset:
+            for name in names:
+                pieces[name].append(self._columns[name].slice(0, stop-self._offset))
+
+        return {name: numpy.concatenate(values) if len(values) > 1 else values[0] \
+                                                for name, values in pieces.items()}
+
+    #Column Access
+    @row_list_view
+    def keys(self):
+        return list(self._columns.keys())
+
+    @row_list_view
+    def __contains__(self, key):
+        return key in self._columns
+
+    @property
+    @row_list_view
+    def kinds(self):
+        return {name: col.kind for name, col in self._columns.items()}
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def nbytes(self):
+        '''bytes allocated for the buffers, not counting segments'''
+        return sum([col.nbytes for col in self._columns.values() if not isinstance(col, SplitColumn)]) + \
+               sum([block.buffer.nbytes for block in self._blocks.values()])
+
+    @row_list_view
+    def column(self, name):
+        '''returns a read only view of the stored values of column `name`, or when the table has 
+        spilled an array read from the segments and buffers'''
+        if self._offset:
+            return read_only(self._range_columns(0, len(self), [name])[name])
+        return read_only(self._columns[name].values(self._size))
+
+    @row_list_view
+    def columns(self, names=None):
+        '''returns {name: read only view} for `names`, or all columns, spilled segments are read once'''
+        names = self.keys() if names is None else list(names)
+        if self._offset:
+            return {name: read_only(values) for name, values in self._range_columns(0, len(self), names).items()}
+        return {name: read_only(self._columns[name].values(self._size)) for name in names}
+
+    @row_list_view
+    def block(self, name):
+        '''returns a read only (rows x k) view of the vectors stored under row key `name`'''
+        if self._offset:
+            return read_only(numpy.column_stack([self.column(col.name) for col in self._blocks[name].splits]))
+        return read_only(self._blocks[name].values(self._size))
+
+    def finite_mask(self, name):
+        '''a boolean array of the rows of column `name` holding a finite number'''
+        values = self.column(name)
+        if values.dtype.kind == FLOAT_KIND:
+            return numpy.isfinite(values)
+        elif values.dtype.kind == INT_KIND:
+            return numpy.ones(values.shape, dtype=bool)
+        return numpy.array([isinstance(val, (int, float)) and not isinstance(val, bool) and numpy.isfinite(val)
+                                                                        for val in values.tolist()], dtype=bool)
+
+    @row_list_view
+    def block_keys(self):
+        return list(self._blocks.keys())
+
+    @row_list_view
+    def get_column(self, name, default=None):
+        if name in self._columns:
+            return self.column(name)
+        return default
+
+    @row_list_view
+    def is_constant(self, name):
+        '''True if every value in the column is equal to the first, missing values are equal'''
+        return not self._columns[name].varies
+
+    @row_list_view
+    def is_tabular(self, name):
+        '''True if every value in the column is one of TABLE_TYPES'''
+        return self._columns[name].tabular
+
+    @row_list_view
+    def first(self, name):
+        '''the value of column `name` in the first row'''
+        col = self._columns[name]
+        if col.kind == FLOAT_KIND:
+            return float(col.first)
+        return col.first
+
+    @row_list_view
+    def constant_columns(self):
+        return [name for name, col in self._columns.items() if not col.varies]
+
+    @row_list_view
+    def variable_columns(self):
+        return [name for name, col in self._columns.items() if col.varies]
+
+    @row_list_view
+    def to_dataframe(self, start=0, stop=None, columns=None):
+        '''builds a dataframe from rows [start:stop) straight from the column buffers and segments'''
+        stop = len(self) if stop is None else min(stop, len(self))
+        stop = max(start, stop)
+        data = self._range_columns(start, stop, columns)
+        return pandas.DataFrame(data, index=pandas.RangeIndex(start, stop), copy=True)
+
+    @row_list_view
+    def iter_dataframes(self, columns=None):
+        '''yields a dataframe per segment and one for the buffered rows, so a spilled table can be
+        processed without loading all of it'''
+        for path,start,stop in self._segments:
+            yield self.to_dataframe(start, stop, columns)
+        if self._size:
+            yield self.to_dataframe(self._offset, len(self), columns)
+
+    #Pickling, we dont need to send the empty capacity
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_blocks'] = {name: ([col.name for col in block.splits], block.values(self._size).copy()) \
+                                    for name, block in self._blocks.items()}
+        state['_columns'] = {name: (col.kind, None if isinstance(col, SplitColumn) else col.dump(self._size), 
+                                    col.first, col.varies, col.tabular) for name, col in self._columns.items()}
+        return state
+
+    def __copy__(self):
+        '''a table with its own buffers holding copies of the buffered rows, spilled segments are
+        shared read only and the copy names its new segments apart'''
+        other = type(self).__new__(type(self))
+        other.__setstate__(self.__getstate__())
+        if self._rows is not None:
+            other._rows = list(self._rows)
+        other.schema = dict(self.schema)
+        other.blocks = dict(self.blocks)
+        other._segments = list(self._segments)
+        other._shared_segments = self._shared_segments | set([path for path,start,stop in self._segments])
+        other.segment_prefix = f'segment_{uuid.uuid4().hex[:8]}'
+        return other
+
+    def __setstate__(self, state):
+        columns = state.pop('_columns')
+        blocks = state.pop('_blocks', {})
+        self.__dict__.update(state)
+        self._capacity = max(self._size, 1)
+        self._blocks = {}
+        splits = {}
+        for name, (names, values) in blocks.items():
+            block = BlockColumn(name, names, self._capacity)
+            block.buffer[:self._size] = values
+            self._blocks[name] = block
+            splits.update({col.name: col for col in block.splits})
+
+        self._columns = {}
+        for name, (kind, values, first, varies, tabular) in columns.items():
+            if name in splits:
+                col = splits[name]
+            else:
+                col = DeltaColumn(name, kind) if isinstance(values, tuple) else TableColumn(name, kind, self._capacity)
+                col.load(values, self._size)
+            col.first, col.varies, col.tabular = first, varies, tabular
+            self._columns[name] = col
+
+    @row_list_view
+    def __repr__(self):
+        return f'{type(self).__name__}(rows={len(self)}, columns={len(self._columns)}, segments={len(self._segments)})'
+
+
+def read_only(values):
+    '''a view of values that can't be written to, the table's buffers stay writable'''
+    view = values.view()
+    view.flags.writeable = False
+    return view
+
+
+#Arrow IO
+def arrow_arrays(columns):
+    '''{name: (kind,values)} as {name: pyarrow array}, object columns of mixed types become strings'''
+    import pyarrow
+    arrays = {}
+    for name, (kind, values) in columns.items():
+        if kind == OBJECT_KIND:
+            try:
+                arrays[name] = pyarrow.array(values, from_pandas=True)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError): #mixed types are written as strings
+                arrays[name] = pyarrow.array([None if val != val else str(val) for val in values.tolist()])
+        else:
+            arrays[name] = pyarrow.array(values)
+    return arrays
+
+def arrow_row_block(batch):
+    '''the {column: array} of an arrow batch from ColumnarTable.to_arrow and its number of rows, 
+    vectors are stacked back into (rows x k) arrays so the block can be added with extend'''
+    import json
+    meta = batch.schema.metadata or {}
+    blocks = json.loads(meta.get(b'blocks', b'{}'))
+    columns = {}
+    for name, values in zip(batch.schema.names, batch.columns):
+        values = values.to_numpy(zero_copy_only=False)
+        if values.dtype.kind not in 'fi':
+            values = numpy.array([numpy.nan if val is None else val for val in values.tolist()], dtype=object)
+        columns[name] = values
+    for name, splits in blocks.items():
+        columns[name] = numpy.column_stack([columns.pop(split) for split in splits]).astype(numpy.float64)
+    return columns, batch.num_rows
+
+#Segment IO
+def write_segment(path, columns, spill_format='arrow'):
+    '''writes {name: (kind,values)} to an arrow ipc or parquet file'''
+    import pyarrow
+    table = pyarrow.table(arrow_arrays(columns))
+
+    if spill_format == 'parquet':
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table, path)
+    else:
+        import pyarrow.ipc
+        with pyarrow.OSFile(path, 'wb') as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+def read_segment(path, columns=None):
+    '''reads a segment as a pyarrow table, arrow files are memory mapped'''
+    import pyarrow
+    if path.endswith('.parquet'):
+        import pyarrow.parquet
+        available = pyarrow.parquet.read_schema(path).names
+        columns = None if columns is None else [col for col in columns if col in available]
+        return pyarrow.parquet.read_table(path, columns=columns, memory_map=True)
+
+    import pyarrow.ipc
+    table = pyarrow.ipc.open_file(pyarrow.memory_map(path, 'r')).read_all()
+    if columns is not None:
+        table = table.select([col for col in columns if col in table.column_names])
+    return table
+
+
+if __name__ == '__main__':
+
+    import unittest
+    import pickle
+    import copy
+    import tempfile
+
+    class TestColumnarTable(unittest.TestCase):
+
+        def setUp(self):
+            self.table = ColumnarTable(schema={'label': OBJECT_KIND}, capacity=2)
+
+        def test_append_rows(self):
+            for i in range(10):
+                self.table.append({'index': i, 'value': i * 0.5, 'label': 'x'})
+            self.assertEqual(len(self.table), 10)
+            self.assertGreaterEqual(self.table.capacity, 10)
+            self.assertEqual(self.table[3], {'index': 3, 'value': 1.5, 'label': 'x'})
+            self.assertEqual(self.table.kinds, {'index': INT_KIND, 'value': FLOAT_KIND, 'label': OBJECT_KIND})
+
+        def test_promotion(self):
+            self.table.append({'a': 1})
+            self.table.append({'a': 1.5})
+            self.assertEqual(self.table.kinds['a'], FLOAT_KIND)
+            self.table.append({'a': 'word'})
+            self.assertEqual(self.table.kinds['a'], OBJECT_KIND)
+            self.assertEqual(list(self.table.column('a')), [1, 1.5, 'word'])
+
+        def test_missing(self):
+            self.table.append({'a': 1})
+            self.table.append({'b': 2})
+            self.assertTrue(numpy.isnan(self.table[0]['b']))
+            self.assertTrue(numpy.isnan(self.table[1]['a']))
+
+        def test_dataframe(self):
+            for i in range(5):
+                self.table.append({'index': i, 'label': 'x'})
+            df = self.table.to_dataframe()
+            self.assertEqual(df.shape, (5, 2))
+            self.assertEqual(list(self.table.to_dataframe(3)['index']), [3, 4])
+
+        def test_versions(self):
+            self.table.append({'index': 0})
+            version, schema_version = self.table.version, self.table.schema_version
+            self.table.append({'index': 1})
+            self.assertEqual(self.table.version, version + 1)
+            self.assertEqual(self.table.schema_version, schema_version)
+            self.table.append({'index': 2.5})
+            self.assertGreater(self.table.schema_version, schema_version)
+
+        def test_constant(self):
+            for i in range(5):
+                self.table.append({'index': i, 'label': 'x', 'nan': None})
+            self.assertFalse(self.table.is_constant('index'))
+            self.assertTrue(self.table.is_constant('label'))
+            self.assertTrue(self.table.is_constant('nan'))
+            self.table.append({'index': 5, 'label': 'y'})
+            self.assertFalse(self.table.is_constant('label'))
+            self.assertEqual(self.table.variable_columns(), ['index', 'label'])
+
+        def test_constant_new_column(self):
+            self.table.append({'index': 0})
+            self.table.append({'index': 0, 'late': 1.0})
+            self.assertFalse(self.table.is_constant('late'))
+            self.assertTrue(self.table.is_constant('index'))
+
+        def test_blocks(self):
+            self.table.blocks['cog'] = ('cog_x', 'cog_y', 'cog_z')
+            for i in range(100):
+                self.table.append({'index': i, 'cog': numpy.array([i, 0., 1.])})
+            self.assertEqual(self.table.block('cog').shape, (100, 3))
+            self.assertEqual(self.table.keys(), ['index', 'cog_x', 'cog_y', 'cog_z'])
+            self.assertEqual(self.table[5], {'index': 5, 'cog_x': 5.0, 'cog_y': 0.0, 'cog_z': 1.0})
+            self.assertEqual(self.table.variable_columns(), ['index', 'cog_x'])
+            self.assertEqual(list(self.table.to_dataframe(98)['cog_x']), [98., 99.])
+            self.table.append({'index': 100})
+            self.assertTrue(numpy.isnan(self.table[100]['cog_y']))
+            other = pickle.loads(pickle.dumps(self.table))
+            self.assertEqual(other.block('cog').shape, (101, 3))
+            self.assertEqual(other.variable_columns(), self.table.variable_columns())
+            with self.assertRaises(ValueError):
+                self.table.append({'cog': numpy.zeros(2)})
+
+        def test_value(self):
+            for i in range(4):
+                self.table.append({'a': i, 'b': f'r{i}'})
+            self.assertEqual(self.table.value('a'), 3)
+            self.assertEqual(self.table.value('b', 1), 'r1')
+            with self.assertRaises(IndexError):
+                self.table.value('a', 4)
+
+        def test_row_block(self):
+            other = ColumnarTable(blocks={'vec': ['vec_x', 'vec_y']})
+            for i in range(4):
+                self.table.append({'a': i, 'b': f'r{i}', 'vec': numpy.array([i, 2.*i])})
+            other.extend(self.table.row_block(1, 3), 2)
+            self.assertEqual(list(other.column('a')), [1, 2])
+            self.assertEqual(list(other.column('b')), ['r1', 'r2'])
+            self.assertEqual(other.block('vec').tolist(), [[1., 2.], [2., 4.]])
+
+        def test_arrow(self):
+            for i in range(4):
+                self.table.append({'a': i, 'b': f'r{i}', 'vec': numpy.array([i, 2.*i])})
+            other = ColumnarTable()
+            other.extend(*arrow_row_block(self.table.to_arrow(1, 3)))
+            self.assertEqual(list(other.column('a')), [1, 2])
+            self.assertEqual(list(other.column('b')), ['r1', 'r2'])
+            self.assertEqual(other.block_keys(), ['vec'])
+            self.assertEqual(other.block('vec').tolist(), [[1., 2.], [2., 4.]])
+
+        def test_copy(self):
+            for i in range(3):
+                self.table.append({'a': i, 'vec': numpy.array([i, 2.*i])})
+            other = copy.copy(self.table)
+            other.append({'a': 3, 'vec': numpy.array([3., 6.])})
+            self.assertEqual(len(self.table), 3)
+            self.assertEqual(list(other.column('a')), [0, 1, 2, 3])
+            self.assertIsNot(other._columns['a'].buffer, self.table._columns['a'].buffer)
+
+        def test_pickle(self):
+            for i in range(5):
+                self.table.append({'index': i, 'label': 'x'})
+            other = pickle.loads(pickle.dumps(self.table))
+            self.assertEqual(list(other), list(self.table))
+            other.append({'index': 5, 'label': 'y'})
+            self.assertEqual(len(other), 6)
+
+        def test_row_list(self):
+            table = ColumnarTable(schema={'label': OBJECT_KIND})
+            columnar = ColumnarTable(schema={'label': OBJECT_KIND}, capacity=2)
+            rows = [{'a': 1, 'label': 'x'}, {'a': 1.5, 'vec': numpy.array([1., 2.])}, {'a': None, 'label': 'y'}]
+            for row in rows:
+                table.append(row)
+                columnar.append(row)
+            self.assertIsNotNone(table._rows)
+            self.assertEqual(table._columns, {})
+            self.assertEqual(len(table), 3)
+            self.assertEqual(table.kinds, columnar.kinds)
+            self.assertEqual(table[1], columnar[1])
+            self.assertEqual(table.value('label'), 'y')
+            pandas.testing.assert_frame_equal(table.to_dataframe(), columnar.to_dataframe())
+            pickled = pickle.loads(pickle.dumps(table))
+            pandas.testing.assert_frame_equal(pickled.to_dataframe(), columnar.to_dataframe())
+            other = copy.copy(table)
+            other.append({'a': 2})
+            self.assertEqual(len(table), 3)
+
+            for i in range(ColumnarTable.row_threshold):
+                table.append({'a': i})
+                columnar.append({'a': i})
+            self.assertIsNone(table._rows)
+            pandas.testing.assert_frame_equal(table.to_dataframe(), columnar.to_dataframe())
+            self.assertEqual(table.constant_columns(), columnar.constant_columns())
+
+        def test_column_views(self):
+            for i in range(5):
+                self.table.append({'index': i, 'value': float(i) if i != 2 else numpy.inf})
+            values = self.table.column('value')
+            self.assertTrue(numpy.shares_memory(values, self.table._columns['value'].buffer))
+            with self.assertRaises(ValueError):
+                values[0] = 1.0
+            self.assertEqual(list(self.table.finite_mask('value')), [True, True, False, True, True])
+            self.assertEqual(list(self.table.columns(['index', 'value'])), ['index', 'value'])
+            self.table.append({'index': 5, 'value': 5.0})
+            self.assertEqual(self.table.column('value')[5], 5.0)
+
+        def test_delta(self):
+            dense = ColumnarTable()
+            delta = ColumnarTable(delta=True, keyframe_interval=50)
+            for i in range(200):
+                row = {'index': i, 'sweep': i // 20 * 0.5, 'label': 'a' if i < 150 else 'b'}
+                if i > 10:
+                    row['late'] = 1 if i < 100 else 1.5
+                dense.append(row)
+                delta.append(row)
+            self.assertLess(delta._columns['sweep'].changes, 20)
+            self.assertLess(delta.nbytes, dense.nbytes)
+            pandas.testing.assert_frame_equal(dense.to_dataframe(), delta.to_dataframe())
+            pandas.testing.assert_frame_equal(dense.to_dataframe(105, 160), delta.to_dataframe(105, 160))
+            self.assertEqual(dense[42], delta[42])
+            self.assertEqual(delta.variable_columns(), dense.variable_columns())
+            other = pickle.loads(pickle.dumps(delta))
+            pandas.testing.assert_frame_equal(other.to_dataframe(), delta.to_dataframe())
+
+        def test_spill(self):
+            for spill_format in ColumnarTable.spill_formats:
+                with tempfile.TemporaryDirectory() as tmp:
+                    table = ColumnarTable(schema={'label': OBJECT_KIND}, spill_dir=tmp, spill_rows=4, 
+                                          spill_format=spill_format)
+                    for i in range(10):
+                        table.append({'index': i, 'value': i * 0.5, 'label': 'x'})
+                    table.append({'index': 10, 'late': 1.0})
+                    table.reserve(1000) #no more than is buffered before a spill
+                    self.assertEqual(table.capacity, 4)
+                    self.assertEqual(len(table), 11)
+                    self.assertEqual(len(table.segments), 2)
+                    self.assertEqual(table.spilled_rows, 8)
+                    self.assertEqual(table[5]['value'], 2.5)
+                    self.assertTrue(numpy.isnan(table[5]['late']))
+                    self.assertEqual(list(table.column('index')), list(range(11)))
+                    df = table.to_dataframe()
+                    self.assertEqual(df.shape, (11, 4))
+                    self.assertEqual(list(df['label'][:3]), ['x', 'x', 'x'])
+                    self.assertEqual(sum(len(frame) for frame in table.iter_dataframes()), 11)
+                    self.assertEqual(len(list(table)), 11)
+                    self.assertFalse(table.is_constant('label'))
+                    table.clear()
+                    self.assertEqual(os.listdir(tmp), [])
+
+        def test_extend_spill_bytes(self):
+            with tempfile.TemporaryDirectory() as tmp:
+                table = ColumnarTable(spill_dir=tmp, spill_bytes=800)
+                table.append({'x': 0.0})
+                table.extend({'x': numpy.arange(1., 1000.)}, 999)
+                self.assertLessEqual(table.nbytes, 800)
+                self.assertGreater(len(table.segments), 1)
+                self.assertEqual(list(table.column('x')), list(range(1000)))
+
+        def test_extend_at_limit(self):
+            with tempfile.TemporaryDirectory() as tmp:
+                table = ColumnarTable(spill_dir=tmp)
+                table.extend({'x': numpy.arange(4.)}, 4)
+                table.spill_rows = 2 #the buffers already hold more than the limit
+                table.extend({'x': numpy.arange(4., 9.)}, 5)
+                self.assertEqual(list(table.column('x')), list(range(9)))
+                self.assertLessEqual(len(table) - table.spilled_rows, 2)
+                table.spill_rows = None
+                table.spill_bytes = 8
+                table.extend({'x': numpy.arange(9., 12.)}, 3)
+                self.assertEqual(list(table.column('x')), list(range(12)))
+
+    unittest.main()
@@ -5,6 +5,7 @@ from ottermatics.logging import LoggingMixin, log
 from ottermatics.tabulation import TabulationMixin, table_property
 from ottermatics.configuration import otterize, Configuration
 from ottermatics.patterns import SingletonMeta, flatten
+from ottermatics.sources import ComponentSource, ListSource, as_source
 
 
 import numpy
@@ -97,8 +98,7 @@ class Component(TabulationMixin):
     def internal_components(self):
         '''go through all attributes determining which are configuration objects
         we skip any configuration that start with an underscore (private variable)'''
-        return {k:v for k,v in self.store.items() \
-                if isinstance(v,Component) and not k.startswith('_')}
+        return {node.path[-1]:node.config for node in self.tree_index(Component) if node.level == 1}
 
 
     def go_through_components(self,level = 0,levels_to_descend = -1, parent_level=0):
@@ -107,17 +107,10 @@ class Component(TabulationMixin):
         only go through this configuration
         
         :return: level,config'''
-
-        should_yield_level = lambda level: all([level>=parent_level, \
-                                              any([levels_to_descend < 0, level <= levels_to_descend])])
-
-        if should_yield_level(level):
-            yield level,self
-
-        level += 1
-        for comp in self.internal_components.values():
-            for level,icomp in comp.go_through_components(level,levels_to_descend,parent_level):
-                yield level,icomp
+        for node in self.tree_index(Component):
+            node_level = level + node.level
+            if node_level >= parent_level and (levels_to_descend < 0 or node_level <= levels_to_descend):
+                yield node_level,node.config
 
     @property
     def all_internal_components(self):
@@ -139,31 +132,76 @@ class Component(TabulationMixin):
 
 
 
+def items_excluded(iterator):
+    '''the fingerprint ancestors marker that leaves the components of `iterator` out'''
+    return ('items_excluded',id(iterator))
+
 @otterize
 class ComponentIterator(Component):
     '''An object to loop through a list of components as the system is evaluated,
     
-    iterates through each component and pipes data_row and data_label to this objects table'''
+    iterates through each component and pipes data_row and data_label to this objects table
+
+    Components come from a source, a list set as `component_list` or a lazy `component_source`
+    (see ottermatics.sources) that builds each component when it is reached so only the current
+    one is held. Shuffling permutes the indexes of a source with random access and each chunk of
+    the others, by `shuffle_seed` or a seed drawn on the first pass that is kept for later ones'''
 
     _iterated_component_type = None #provides interface for tabulation & data reflection
     _components = []
+    _source = None
+    _current = None
     shuffle_mode = False
-    _shuffled = None
+    shuffle_seed = None
+    _shuffled = None #the seed of the shuffled order
+    _order = None
 
 
     @property
     def component_list(self):
-        return self._components
+        '''the components, a lazy source is built in full'''
+        if self._source is None:
+            return self._components
+        if isinstance(self._source,ListSource):
+            return self._source.components
+        return list(self.items())
 
     @component_list.setter
     def component_list(self, new_components):
         if all([isinstance(item,Component) for item in new_components]):
             self._components = new_components
+            self.component_source = ListSource(new_components)
         else:
             self.warning('Input Components Were Not All Of Type Component')
 
+    @property
+    def component_source(self) -> ComponentSource:
+        if self._source is None:
+            return ListSource(self._components)
+        return self._source
+
+    @component_source.setter
+    def component_source(self, source):
+        '''a ComponentSource, or a function returning a generator of components'''
+        self._source = as_source(source)
+        self._order = None
+        self._current = None
+
+    def fingerprint_items(self,ancestors):
+        '''adds the components of a list by their fingerprints or a lazy source by its own, an
+        analysis keying one of the items leaves them out with items_excluded(self) in ancestors'''
+        yield from super(ComponentIterator,self).fingerprint_items(ancestors)
+        if items_excluded(self) in ancestors:
+            return
+        if self._source is None or isinstance(self._source,ListSource):
+            yield 'component_list',list(self.component_list)
+        else:
+            yield 'component_source',self._source
+
     @property
     def current_component(self) -> Component:
+        if self._current is not None: #the item being evaluated
+            return self._current
         out = self[ self.index ]
         if out is None:
             if self.index == 0:
@@ -181,6 +219,11 @@ class ComponentIterator(Component):
         return base
 
 
+    def block_dict(self,size):
+        base = super(ComponentIterator,self).block_dict(size)
+        base.update(self.current_component.data_dict)
+        return base
+
     @property
     def data_row(self):
         return super(ComponentIterator,self).data_row + self.current_component.data_row
@@ -195,7 +238,8 @@ class ComponentIterator(Component):
 
     @classmethod
     def cls_all_property_labels(cls):
-        these_properties =  [obj.label.lower() for k,obj in cls.__dict__.items() if isinstance(obj,table_property)]
+        these_properties =  [label.lower() for k,obj in cls.__dict__.items() if isinstance(obj,table_property) \
+                                                                           for label in obj.column_labels()]
         if cls._iterated_component_type is not None and \
             type(cls._iterated_component_type) is type and \
             issubclass(cls._iterated_component_type,Component ):
@@ -206,7 +250,8 @@ class ComponentIterator(Component):
 
     @classmethod
     def cls_all_property_keys(cls):
-        these_properties =  [k for k,obj in cls.__dict__.items() if isinstance(obj,table_property)]
+        these_properties =  [key for k,obj in cls.__dict__.items() if isinstance(obj,table_property) \
+                                                                   for key in obj.column_keys(k)]
         if cls._iterated_component_type is not None and \
             type(cls._iterated_component_type) is type and \
             issubclass(cls._iterated_component_type,Component ):
@@ -215,6 +260,16 @@ class ComponentIterator(Component):
             these_properties = list(set( iterated_properties + these_properties))
         return these_properties        
     
+    @classmethod
+    def cls_table_blocks(cls):
+        these_blocks = dict(super(ComponentIterator,cls).cls_table_blocks())
+        if cls._iterated_component_type is not None and \
+            type(cls._iterated_component_type) is type and \
+            issubclass(cls._iterated_component_type,Component ):
+
+            these_blocks.update(cls._iterated_component_type.cls_table_blocks())
+        return these_blocks
+
     @classmethod
     def cls_all_attrs_fields(cls):
         these_properties =  attr.fields_dict(cls) #dictonary
@@ -233,23 +288,76 @@ class ComponentIterator(Component):
     #     return attr.fields_dict(cls)
 
     #Magicz
-    #@functools.cached_property
-    def _item_generator(self):
-        if self.shuffle_mode:
-            if self._shuffled is None:
-                self._shuffled = random.sample(self.component_list,len(self.component_list))
-            return self._shuffled
-        return self.component_list
+    def shuffle_order(self):
+        '''the seed of the shuffled order, drawn once'''
+        if self._shuffled is None:
+            self._shuffled = self.shuffle_seed if self.shuffle_seed is not None else random.getrandbits(32)
+        return self._shuffled
+
+    def _indexes(self,source,start=0,stop=None):
+        '''the indexes in a random access source of positions start to stop'''
+        size = len(source)
+        stop = size if stop is None else min(stop,size)
+        if not self.shuffle_mode:
+            return range(start,stop)
+        if self._order is None or len(self._order) != size:
+            self._order = numpy.random.default_rng(self.shuffle_order()).permutation(size)
+        return self._order[start:stop]
+
+    def _item_positions(self):
+        '''yields (rows,inx) for each item in order, rows.get(inx) builds the item'''
+        source = self.component_source
+        if source.random_access:
+            for inx in self._indexes(source):
+                yield source,inx
+            return
+        rng = numpy.random.default_rng(self.shuffle_order()) if self.shuffle_mode else None
+        for rows in source.chunks():
+            order = range(len(rows)) if rng is None else rng.permutation(len(rows))
+            for inx in order:
+                yield rows,inx
+
+    def items(self,start=0,stop=None):
+        '''yields the items from position start to stop in order, each becomes the current
+        component. Items before start are not built when the source has random access'''
+        return self.iterate(self.build_items(start,stop))
+
+    def build_items(self,start=0,stop=None):
+        '''yields the items from position start to stop in order without making them current'''
+        source = self.component_source
+        if source.random_access:
+            positions = ((source,inx) for inx in self._indexes(source,start,stop))
+        else:
+            positions = itertools.islice(self._item_positions(),start,stop)
+        for rows,inx in positions:
+            yield rows.get(int(inx))
+
+    def iterate(self,items):
+        '''yields each of items making it the current component, for items already built'''
+        for item in items:
+            if not isinstance(item,Component):
+                raise TypeError(f'{self.identity} source made a {type(item).__name__}, not a Component')
+            self._current = item
+            self._anything_changed = True
+            yield item
+            self._anything_changed = True
+
+    def item_count(self) -> int:
+        '''the number of items, a source without a length is read through by chunks except for 
+        a GeneratorSource which needs its length given, raises a TypeError otherwise'''
+        return self.component_source.count()
 
     def __getitem__(self,index):
-        if index >= 0 and index < len(self.component_list):
-            return self.component_list[index]
-        if index < 0 and index > -len(self.component_list):
-            return self.component_list[index]
+        source = self.component_source
+        if source.random_access:
+            size = len(source)
+            if index < 0:
+                index += size
+            if index >= 0 and index < size:
+                return source.get(int(self._indexes(source,index,index+1)[0]))
+        elif index >= 0:
+            for rows,inx in itertools.islice(self._item_positions(),index,index+1):
+                return rows.get(int(inx))
         
     def __iter__(self):
-        #TODO: Add shuffle mode!
-        for item in self._item_generator():
-            self._anything_changed = True
-            yield item
-            self._anything_changed = True
+        return self.items()
@@ -13,6 +13,9 @@ import os
 import inspect
 import pathlib
 import copy
+import collections
+import hashlib
+import pickle
 import matplotlib.pyplot as plt
 
 
@@ -37,11 +40,42 @@ This should allow alot more functionalty and standardization options than just p
 '''
 
 
+#Configuration Tree Structure
+'''Configurations cache a flattened index of the configurations below them, see tree_index(). Each
+configuration counts changes to its own structure in _structure_version, which increments when a
+public attribute is set to or from a configuration, attrs fields through property_changed and plain 
+attributes through tracked_setattr. An index is stamped with the sum of the versions of its nodes,
+they only ever increase so the sum changes whenever any configuration in that tree changes'''
+TreeNode = collections.namedtuple('TreeNode',('level','parent','path','config'))
+
+def structure_changed(config):
+    '''invalidates the cached tree indexes holding `config`'''
+    object.__setattr__(config,'_structure_version',config._structure_version+1)
+
+def tree_stamp(index) -> int:
+    return sum([node.config._structure_version for node in index])
+
+
 #Class Definition Wrapper Methods
 def property_changed(instance, variable, value):
     instance._anything_changed = True
+    if not variable.name.startswith('_') and \
+        (isinstance(value,Configuration) or isinstance(getattr(instance,variable.name,None),Configuration)):
+        structure_changed(instance)
+    instance._property_changed(variable.name)
     return value
 
+def tracked_setattr(setattr_):
+    '''wraps a class' __setattr__ so assigning a configuration to a public plain attribute, or 
+    replacing one, changes the structure version. Private names aren't indexed so they are skipped'''
+    def __setattr__(self,name,value):
+        if not name.startswith('_') and \
+            (isinstance(value,Configuration) or isinstance(self.__dict__.get(name),Configuration)):
+            structure_changed(self)
+        setattr_(self,name,value)
+    __setattr__.tracks_structure = True
+    return __setattr__
+
 #This one should wrap all configuraitons to track changes, and special methods
 #TODO: Make this accept arguments in appication
 def otterize(cls,*args,**kwargs):
@@ -50,10 +84,40 @@ def otterize(cls,*args,**kwargs):
     2) repr is default
     3) hash is by object identity'''
     acls = attr.s(cls, on_setattr= property_changed, repr=False,eq=False, *args,**kwargs)
+    own = acls.__dict__.get('__setattr__')
+    if own is not None and not getattr(own,'tracks_structure',False): #attrs made one for the hooks
+        acls.__setattr__ = tracked_setattr(own)
     return acls                                        
 
     
 
+def fingerprint_value(value,ancestors=frozenset()) -> bytes:
+    '''stable bytes for a value in a Configuration fingerprint, configurations contribute their own
+    fingerprint, containers their items and arrays their dtype, shape and data'''
+    if isinstance(value,Configuration):
+        if id(value) in ancestors:
+            return b'<cycle>'
+        return value._fingerprint(ancestors).encode()
+    if isinstance(value,numpy.ndarray):
+        if value.dtype.kind == 'O':
+            return b'ndarray' + fingerprint_value(value.tolist(),ancestors) + str(value.shape).encode()
+        return f'ndarray{value.dtype.str}{value.shape}'.encode() + numpy.ascontiguousarray(value).tobytes()
+    if isinstance(value,numpy.generic):
+        value = value.item()
+    if value is None or isinstance(value,(bool,int,float,complex,str,bytes)):
+        return f'{type(value).__name__}:{value!r}'.encode()
+    if isinstance(value,(list,tuple)):
+        return f'{type(value).__name__}['.encode() + b','.join([fingerprint_value(val,ancestors) for val in value]) + b']'
+    if isinstance(value,dict):
+        items = sorted([fingerprint_value(key,ancestors) + b':' + fingerprint_value(val,ancestors) for key,val in value.items()])
+        return b'dict{' + b','.join(items) + b'}'
+    if isinstance(value,(set,frozenset)):
+        return b'set{' + b','.join(sorted([fingerprint_value(val,ancestors) for val in value])) + b'}'
+    try:
+        return type(value).__qualname__.encode() + pickle.dumps(value,protocol=4)
+    except Exception:
+        return repr(value).encode()
+
 def meta(title,desc=None,**kwargs):
     '''a convienience wrapper to add metadata to attr.ib
     :param title: a title that gets formatted for column headers
@@ -83,6 +147,16 @@ class Configuration(LoggingMixin):
 
     _created_datetime = None
 
+    #Change Tracking
+    _dirty = None #attrs fields set since mark_clean(), see dirty
+    _change_version = 0
+    _structure_version = 0 #changes of the configurations this one holds, see structure_changed()
+    _tree_indexes = None #{kind: (tree stamp, [TreeNode,...])}, see tree_index()
+
+    #Fingerprints
+    fingerprint_version = 0 #bump when the class' behaviour changes so cached evaluations are not reused
+    fingerprint_exclude = () #attrs fields that don't change the behaviour of the class
+
     #Our Special Init Methodology
     def __on_init__(self):
         '''Override this when creating your special init functionality, you must use attrs for input variables'''
@@ -94,6 +168,46 @@ class Configuration(LoggingMixin):
         self._created_datetime = datetime.datetime.utcnow()
         self.__on_init__()
     
+    def _property_changed(self,name):
+        '''Called by the on_setattr hook with the name of the attrs field about to change, the field
+        is recorded as dirty. Override this (calling super) to invalidate anything that depends on the field'''
+        if self._dirty is None:
+            self._dirty = set()
+        self._dirty.add(name)
+        self._change_version += 1
+
+    @property
+    def dirty(self) -> frozenset:
+        '''the names of the attrs fields set since the last mark_clean(), save_data() marks a 
+        tabulated configuration clean once its row is stored'''
+        if not self._dirty:
+            return frozenset()
+        return frozenset(self._dirty)
+
+    def is_dirty(self,*names) -> bool:
+        '''True if any of `names` was set since the last mark_clean(), with no names if any field was'''
+        if not self._dirty:
+            return False
+        if not names:
+            return True
+        return not self._dirty.isdisjoint(names)
+
+    def mark_clean(self):
+        '''forget the dirty fields'''
+        if self._dirty:
+            self._dirty.clear()
+
+    @property
+    def change_version(self) -> int:
+        '''increments whenever an attrs field is set and is never reset, so anything derived from the
+        fields can be stamped with it'''
+        return self._change_version
+
+    def dirty_configurations(self,levels_to_descend=-1) -> dict:
+        '''{configuration: dirty fields} of this and the internal configurations that have changes'''
+        return {conf:conf.dirty for level,conf in self.go_through_configurations(0,levels_to_descend) 
+                                                                                    if conf.is_dirty()}
+
     #Identity & locatoin Methods
     @property
     def filename(self):
@@ -129,9 +243,61 @@ class Configuration(LoggingMixin):
     def internal_configurations(self):
         '''go through all attributes determining which are configuration objects
         we skip any configuration that start with an underscore (private variable)'''
-        return {k:v for k,v in self.store.items() \
-                if isinstance(v,Configuration) and not k.startswith('_')}
-
+        return {node.path[-1]:node.config for node in self.tree_index() if node.level == 1}
+
+    def fingerprint(self) -> str:
+        '''A stable hash of the class, its fingerprint_version, the attrs field values and the 
+        fingerprints of the configurations it holds, see fingerprint_items. Equal configurations 
+        have the same fingerprint in any process, so it can key stored results'''
+        return self._fingerprint(frozenset())
+
+    def _fingerprint(self,ancestors):
+        cls = type(self)
+        ancestors = ancestors | {id(self)}
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f'{cls.__module__}.{cls.__qualname__}:{self.fingerprint_version}'.encode())
+        for name,value in self.fingerprint_items(ancestors):
+            digest.update(name.encode() + b'=' + fingerprint_value(value,ancestors))
+        return digest.hexdigest()
+
+    def fingerprint_items(self,ancestors):
+        '''yields the (name,value) pairs in the fingerprint, the attrs fields then the configurations
+        held by public plain attributes as tree_index walks them, less fingerprint_exclude'''
+        fields = [field.name for field in attr.fields(type(self))]
+        for name in fields:
+            if name not in self.fingerprint_exclude:
+                yield name,getattr(self,name)
+        for name,value in self.__dict__.items():
+            if isinstance(value,Configuration) and not name.startswith('_') and name not in fields \
+                                                          and name not in self.fingerprint_exclude:
+                yield name,value
+
+    def tree_index(self,kind=None) -> list:
+        '''A flattened, depth first index of this configuration and the ones held by its public attributes,
+        as TreeNodes of (level, parent, path of attribute names, config). The index is cached until 
+        a configuration in it is reassigned, see structure_changed(). Configurations holding no
+        others aren't cached since their index is as quick to build as to check
+        :param kind: only descend through attributes holding this subclass of Configuration'''
+        kind = Configuration if kind is None else kind
+        cached = self._tree_indexes.get(kind) if self._tree_indexes is not None else None
+        if cached is not None and cached[0] == tree_stamp(cached[1]):
+            return cached[1]
+        index = []
+        self._build_tree_index(kind,index,0,None,(),frozenset())
+        if len(index) > 1:
+            if self._tree_indexes is None:
+                self._tree_indexes = {}
+            self._tree_indexes[kind] = (tree_stamp(index),index)
+        elif cached is not None:
+            del self._tree_indexes[kind]
+        return index
+
+    def _build_tree_index(self,kind,index,level,parent,path,ancestors):
+        index.append(TreeNode(level,parent,path,self))
+        ancestors = ancestors | {id(self)} #a configuration holding its parent would never end
+        for key,config in self.store.items():
+            if isinstance(config,kind) and not key.startswith('_') and id(config) not in ancestors:
+                config._build_tree_index(kind,index,level+1,self,path+(key,),ancestors)
 
     def go_through_configurations(self,level = 0,levels_to_descend = -1, parent_level=0):
         '''A generator that will go through all internal configurations up to a certain level
@@ -139,18 +305,10 @@ class Configuration(LoggingMixin):
         only go through this configuration
         
         :return: level,config'''
-
-        should_yield_level = lambda level: all([level>=parent_level, \
-                                              any([levels_to_descend < 0, level <= levels_to_descend])])
-
-        if should_yield_level(level):
-            yield level,self
-
-        level += 1
-        for config in self.internal_configurations.values():
-            for level,iconf in config.go_through_configurations(level,levels_to_descend,parent_level):
-                yield level,iconf
-
+        for node in self.tree_index():
+            node_level = level + node.level
+            if node_level >= parent_level and (levels_to_descend < 0 or node_level <= levels_to_descend):
+                yield node_level,node.config
 
     #May Depriciate - Dirty laundry below
     @contextmanager
@@ -195,11 +353,14 @@ class Configuration(LoggingMixin):
     def __copy__(self):
         newone = type(self)()
         newone.__dict__.update(self.__dict__)
+        newone._tree_indexes = None
 
         for name,item in self.__dict__.items():
+            if name == '_tree_indexes': #the copy indexes its own configurations
+                continue
             if isinstance(item,Configuration):
                 newone.__dict__[name] = copy.copy(item)
-            if isinstance(item,(tuple,list,dict)):
+            if isinstance(item,(tuple,list,dict,set)):
                 newone.__dict__[name] = copy.copy(item)
 
         return newone
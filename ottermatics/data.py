@@ -25,7 +25,7 @@ from os import sys
 
 import cachetools
 
-from ottermatics.patterns import Singleton, SingletonMeta, singleton_meta_object
+from ottermatics.patterns import Singleton, SingletonMeta, ConfiguredSingletonMeta, singleton_meta_object
 from ottermatics.logging import LoggingMixin, set_all_loggers_to, is_ec2_instance
 from ottermatics.tabulation import * #This should be considered a module of data
 
@@ -286,6 +286,66 @@ class DiskCacheStore(LoggingMixin, metaclass=SingletonMeta):
         self.cache #create cache
 
 
+_missing = object()
+
+class EvaluationCache(DiskCacheStore,metaclass=ConfiguredSingletonMeta):
+    '''Stored evaluations keyed by configuration fingerprints, see Analysis.cache_evaluations
+
+    Recently used entries are kept in an in memory LRU in front of the disk cache, which evicts 
+    the least recently used entries once size_limit bytes are stored
+
+    The cache is a singleton set up by its first call, make it with any settings before the first
+    solve, later calls with different settings raise a ValueError'''
+    size_limit = 2E9 #2GB
+    memory_items = 1024
+    cache_dir = None #a directory to use in place of the client cache folder
+    _memory = None
+
+    def __init__(self,cache_dir=None,memory_items=None,**kwargs):
+        kwargs.setdefault('eviction_policy','least-recently-used')
+        if cache_dir is not None:
+            self.cache_dir = cache_dir
+        if memory_items is not None:
+            self.memory_items = memory_items
+        super(EvaluationCache,self).__init__(**kwargs)
+
+    @property
+    def cache_root(self):
+        if self.cache_dir is not None:
+            return self.cache_dir
+        return super(EvaluationCache,self).cache_root
+
+    @property
+    def memory(self) -> cachetools.LRUCache:
+        if self._memory is None:
+            self._memory = cachetools.LRUCache(maxsize=self.memory_items)
+        return self._memory
+
+    def lookup(self,key,default=None):
+        '''the entry at key from memory or disk, or default, without warning when it is missing'''
+        value = self.memory.get(key,_missing)
+        if value is _missing:
+            with self.cache as ch:
+                value = ch.get(key,default=_missing,retry=True)
+            if value is _missing:
+                return default
+            self.memory[key] = value
+        return value
+
+    def store(self,key,value):
+        self.memory[key] = value
+        self.set(key=key,data=value)
+
+    def clear(self):
+        self.memory.clear()
+        self.cache.clear()
+
+    def __getstate__(self):
+        d = super(EvaluationCache,self).__getstate__()
+        d['_memory'] = None
+        return d
+
+
 
 class DBConnection(LoggingMixin,  metaclass=InputSingletonMeta):
     '''A database singleton that is thread safe and pickleable (serializable)
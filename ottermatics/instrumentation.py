@@ -0,0 +1,230 @@
+'''Timing and throughput instrumentation for analysis runs
+
+A RunMetrics records how long each phase of a run takes (evaluate, save_data, data_dict, each
+table_property, dataframe, save_table, report_data) per configuration class. Hooks in tabulation
+and analysis only record while a RunMetrics is active, otherwise they cost a global lookup. The
+hooks called for every row (each table_property, data_dict, append and each item's phases) only time
+the rows of a random `sample_rate` of the items, drawn once per item by sample(), and weight those 
+durations by its inverse so their counts and totals are estimates, the other items cost the hooks an
+attribute check. Phases of a whole solve, chunk or block are timed on every call.
+
+Latency percentiles come from a bounded reservoir sample per phase, so memory stays fixed over
+long runs.
+'''
+import time
+import json
+import random
+import datetime
+from contextlib import contextmanager
+
+import numpy
+import pandas
+
+#The RunMetrics the hooks record to, set by RunMetrics.active()
+ACTIVE = None
+
+perf_counter = time.perf_counter
+_random = random.Random().random
+
+
+class PhaseStats:
+    '''count, total and a reservoir sample of the durations of one phase'''
+    __slots__ = ('count','total','max','samples')
+
+    reservoir = 2048
+    _random = random.Random(0)
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self,duration,weight=1):
+        '''adds a duration standing for `weight` calls'''
+        self.count += weight
+        self.total += duration * weight
+        if duration > self.max:
+            self.max = duration
+        if len(self.samples) < self.reservoir:
+            self.samples.append(duration)
+        else:
+            inx = int(self._random.random() * self.count) #cheaper than randrange
+            if inx < self.reservoir:
+                self.samples[inx] = duration
+
+    def percentile(self,q):
+        if not self.samples:
+            return numpy.nan
+        return float(numpy.percentile(self.samples,q))
+
+    def summary(self) -> dict:
+        return {'count': self.count,
+                'total_s': self.total,
+                'mean_ms': 1000.0 * self.total / self.count if self.count else numpy.nan,
+                'p50_ms': 1000.0 * self.percentile(50),
+                'p99_ms': 1000.0 * self.percentile(99),
+                'max_ms': 1000.0 * self.max}
+
+
+class RunMetrics:
+    '''Counters and timers of a run, by (phase, owner) where owner is a class name or for
+    table properties class.property
+
+    with metrics.active():
+        ... #hooks record here
+    metrics.dataframe()
+    metrics.summary()'''
+
+    sample_rate = 1/16 #of the items whose rows are timed, see sample()
+    sampling = False #if the per row hooks time the current item
+
+    def __init__(self,run_id=None,name=None):
+        self.run_id = run_id
+        self.name = name
+        self.stats = {}
+        self.counters = {}
+        self.started = None
+        self.wall = 0.0
+
+    #Recording isn't locked to keep it cheap, the GIL keeps the dictionaries whole and at worst a 
+    #sample from the TableWriter thread landing at the same moment as one here is dropped
+    def record(self,phase,owner,duration,weight=1):
+        stats = self.stats.get((phase,owner))
+        if stats is None:
+            stats = self.stats[(phase,owner)] = PhaseStats()
+        stats.add(duration,weight)
+
+    def sample(self) -> bool:
+        '''draws if the per row hooks time the next item, sets sampling, they record with weight=self.weight'''
+        self.sampling = _random() < self.sample_rate
+        return self.sampling
+
+    @property
+    def weight(self):
+        return 1.0 / self.sample_rate
+
+    def count(self,counter,value=1):
+        self.counters[counter] = self.counters.get(counter,0) + value
+
+    @contextmanager
+    def timer(self,phase,owner):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase,owner,perf_counter()-start)
+
+    def timed(self,phase,owner,func):
+        '''wraps func so its calls are recorded, eg. for a call on another thread'''
+        def timed_call(*args,**kwargs):
+            start = perf_counter()
+            try:
+                return func(*args,**kwargs)
+            finally:
+                self.record(phase,owner,perf_counter()-start)
+        return timed_call
+
+    @contextmanager
+    def active(self):
+        '''records the hooks to this run while in the context, the time inside adds to the wall time,
+        entering again while active does nothing'''
+        global ACTIVE
+        if ACTIVE is self:
+            yield self
+            return
+        previous = ACTIVE
+        ACTIVE = self
+        if self.started is None:
+            self.started = datetime.datetime.utcnow()
+        start = perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall += perf_counter() - start
+            ACTIVE = previous
+
+    def reset(self):
+        self.stats = {}
+        self.counters = {}
+        self.started = None
+        self.wall = 0.0
+
+    def rate(self,counter):
+        '''counter per second of wall time'''
+        return self.counters.get(counter,0) / self.wall if self.wall else numpy.nan
+
+    def dataframe(self) -> pandas.DataFrame:
+        '''a row per phase and owner with count, total_s, mean_ms, p50_ms, p99_ms, max_ms and
+        per_s, the calls per second of wall time'''
+        rows = []
+        for (phase,owner),stats in sorted(self.stats.items()):
+            row = {'run_id': self.run_id,'phase': phase,'owner': owner}
+            row.update(stats.summary())
+            row['per_s'] = stats.count / self.wall if self.wall else numpy.nan
+            rows.append(row)
+        columns = ['run_id','phase','owner','count','total_s','mean_ms','p50_ms','p99_ms','max_ms','per_s']
+        return pandas.DataFrame(rows,columns=columns)
+
+    def summary(self) -> dict:
+        '''a json friendly summary of the run, with the rates of each counter and the phases'''
+        phases = {}
+        for (phase,owner),stats in sorted(self.stats.items()):
+            phases.setdefault(phase,{})[owner] = {key: json_number(value) for key,value in stats.summary().items()}
+        return {'run_id': self.run_id,
+                'name': self.name,
+                'started': self.started.isoformat() if self.started else None,
+                'wall_s': self.wall,
+                'counters': dict(self.counters),
+                'rates': {f'{counter}_per_s': json_number(self.rate(counter)) for counter in self.counters},
+                'phases': phases}
+
+    def save_summary(self,path):
+        with open(path,'w') as fp:
+            json.dump(self.summary(),fp,indent=2)
+        return path
+
+def json_number(value):
+    '''nan isn't valid json, it becomes None'''
+    if isinstance(value,float) and value != value:
+        return None
+    return value
+
+
+if __name__ == '__main__':
+
+    import unittest
+
+    class TestRunMetrics(unittest.TestCase):
+
+        def test_phases(self):
+            metrics = RunMetrics('run')
+            self.assertIsNone(ACTIVE)
+            with metrics.active():
+                self.assertIs(ACTIVE,metrics)
+                for inx in range(5000):
+                    metrics.record('evaluate','Thing',0.001 * (inx % 100))
+                    metrics.count('rows')
+            self.assertIsNone(ACTIVE)
+
+            stats = metrics.stats[('evaluate','Thing')]
+            self.assertEqual(stats.count,5000)
+            self.assertEqual(len(stats.samples),PhaseStats.reservoir)
+            self.assertAlmostEqual(stats.percentile(50),0.05,delta=0.01)
+
+            df = metrics.dataframe()
+            self.assertEqual(list(df['phase']),['evaluate'])
+            self.assertGreater(metrics.summary()['rates']['rows_per_s'],0)
+            json.dumps(metrics.summary())
+
+        def test_sampled(self):
+            metrics = RunMetrics('run')
+            metrics.sample_rate = 0.25
+            for inx in range(20000):
+                if metrics.sample():
+                    metrics.record('data_dict','Thing',0.001,metrics.weight)
+            stats = metrics.stats[('data_dict','Thing')]
+            self.assertAlmostEqual(stats.count,20000,delta=1500)
+            self.assertAlmostEqual(stats.total,20.0,delta=1.5)
+
+    unittest.main()
@@ -81,6 +81,29 @@ class SingletonMeta(type):
             return isinstance(instance.__class__, mcs)
 
 
+class ConfiguredSingletonMeta(SingletonMeta):
+    """A SingletonMeta whose instance is configured by the arguments of the first call, later
+    calls without arguments or with the same ones yield it and calls with different arguments
+    raise a ValueError rather than being ignored, e.g.:
+
+    >>> a = MyClass(path='here')
+    >>> MyClass() is a
+    True
+    >>> MyClass(path='there')
+    ValueError
+    """
+    _settings = {}
+
+    def __call__(cls, *args, **kwargs):
+        settings = (args, kwargs)
+        if cls in cls._instances and (args or kwargs) and cls._settings[cls] != settings:
+            raise ValueError(f'{cls.__name__} is a singleton made with {cls._settings[cls]}, '+\
+                             f'got different settings {settings}')
+        instance = super(ConfiguredSingletonMeta, cls).__call__(*args, **kwargs)
+        cls._settings.setdefault(cls, settings)
+        return instance
+
+
 
 
 
@@ -289,7 +289,10 @@ class ReportingMixin:
                 assert isinstance( self, Analysis )
                 rr = ResultsRegistry( self.report_db )
                 rr.ensure_analysis( self )
-                return rr.upload_analysis( self, use_thread = use_thread )
+                upload = rr.upload_analysis
+                if self.instrument:
+                    upload = self.metrics.timed('report_data', type(self).__name__, upload)
+                return upload( self, use_thread = use_thread )
 
             except Exception as e:
                 self.error(e, 'Issue Reporting Data')
@@ -0,0 +1,152 @@
+'''Sampling plans for parameter sweeps
+
+Each plan takes a dictionary of {name: array of values} and returns a dictionary of {name: array}
+where every array has one entry per sample, so sample `i` is {name: values[i] for each name}
+
+adaptive_refine instead works on the points already evaluated and their outputs, adding points
+where the outputs change fastest
+'''
+import numpy
+from scipy.spatial import cKDTree
+
+
+def as_array(values):
+    '''a 1-d numpy array of the values, strings and other objects are kept as objects'''
+    values = numpy.asarray(values)
+    if values.ndim == 0:
+        values = values.reshape(1)
+    if values.ndim != 1:
+        raise ValueError(f'sample values must be 1-d, got shape {values.shape}')
+    if values.dtype.kind in 'USV':
+        values = values.astype(object)
+    return values
+
+def grid(arrays):
+    '''every combination of the values, the last name varies fastest'''
+    arrays = {name: as_array(values) for name, values in arrays.items()}
+    shape = tuple([len(values) for values in arrays.values()])
+    indexes = numpy.indices(shape).reshape(len(shape), -1)
+    return {name: values[inx] for (name, values), inx in zip(arrays.items(), indexes)}
+
+def zipped(arrays):
+    '''the values taken together in order, all arrays must be the same length'''
+    arrays = {name: as_array(values) for name, values in arrays.items()}
+    lengths = set([len(values) for values in arrays.values()])
+    if len(lengths) > 1:
+        raise ValueError(f'zipped sample values must be the same length, got {lengths}')
+    return arrays
+
+def latin_hypercube(arrays, samples, seed=None):
+    '''`samples` points spread over the span (min to max) of each array, each span is split in
+    `samples` equal strata and every stratum is sampled exactly once per name'''
+    if not samples or samples < 1:
+        raise ValueError('latin hypercube sampling needs a number of samples')
+    rng = numpy.random.default_rng(seed)
+    out = {}
+    for name, values in arrays.items():
+        values = as_array(values)
+        if values.dtype.kind not in 'iuf':
+            raise TypeError(f'latin hypercube sampling needs numeric values for {name}')
+        low, high = float(numpy.min(values)), float(numpy.max(values))
+        strata = (rng.permutation(samples) + rng.random(samples)) / samples
+        out[name] = low + strata * (high - low)
+    return out
+
+def local_gradients(points, values, neighbours=None):
+    '''the steepest change of values to the nearest neighbours of each point, points are (n x d)
+    scaled to the unit cube and values (n x m) scaled to their range, the largest over m is kept'''
+    count, dims = points.shape
+    neighbours = min(count - 1, neighbours or 2 * dims)
+    if neighbours < 1:
+        return numpy.zeros(count)
+    distances, indexes = cKDTree(points).query(points, neighbours + 1)
+    distances, indexes = distances[:, 1:], indexes[:, 1:] #not the point itself
+    change = numpy.abs(values[:, None, :] - values[indexes]).max(axis=2)
+    return (change / numpy.maximum(distances, 1E-12)).max(axis=1)
+
+def adaptive_refine(points, values, low, high, batch, candidates=20, explore=0.1, seed=None):
+    '''`batch` new points between low and high where the values change fastest, from a random pool
+    of `candidates` points per new point. A candidate scores the gradient at its nearest evaluated
+    point times its distance to the nearest point, evaluated or picked, plus `explore` of the largest
+    gradient so flat and unexplored regions are still filled. Points are picked one at a time
+
+    :param points: (n x d) inputs evaluated so far
+    :param values: (n x m) or (n,) outputs at those points
+    :returns: (batch x d) points'''
+    low, high = numpy.asarray(low, dtype=float), numpy.asarray(high, dtype=float)
+    span = numpy.where(high > low, high - low, 1.0)
+    unit = (numpy.asarray(points, dtype=float) - low) / span
+    values = numpy.asarray(values, dtype=float).reshape(len(unit), -1)
+    vspan = numpy.ptp(values, axis=0)
+    values = (values - values.min(axis=0)) / numpy.where(vspan > 0, vspan, 1.0)
+
+    gradients = local_gradients(unit, values)
+    weight = gradients + explore * max(gradients.max(initial=0.0), 1.0)
+
+    rng = numpy.random.default_rng(seed)
+    pool = rng.random((max(candidates, 1) * batch, unit.shape[1]))
+    distance, nearest = cKDTree(unit).query(pool)
+    score = weight[nearest]
+
+    picked = []
+    for inx in range(min(batch, len(pool))):
+        best = int(numpy.argmax(score * distance))
+        picked.append(pool[best])
+        distance = numpy.minimum(distance, numpy.linalg.norm(pool - pool[best], axis=1))
+    return low + numpy.array(picked).reshape(-1, unit.shape[1]) * span
+
+SAMPLING_MODES = {'grid': grid, 'zip': zipped, 'lhs': latin_hypercube}
+
+def sample(arrays, mode='grid', samples=None, seed=None):
+    '''builds the samples of `arrays` with the sampling plan `mode`, one of grid, zip or lhs
+    :param samples: the number of samples, needed for lhs
+    :param seed: random seed for lhs'''
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f'sampling mode must be one of {list(SAMPLING_MODES)}, got {mode}')
+    if mode == 'lhs':
+        return latin_hypercube(arrays, samples, seed)
+    return SAMPLING_MODES[mode](arrays)
+
+def sample_count(samples):
+    '''the number of samples in a plan'''
+    return len(next(iter(samples.values()))) if samples else 0
+
+
+if __name__ == '__main__':
+
+    import unittest
+
+    class TestSampling(unittest.TestCase):
+
+        def test_grid(self):
+            out = grid({'a': [1, 2, 3], 'b': ['x', 'y']})
+            self.assertEqual(list(out['a']), [1, 1, 2, 2, 3, 3])
+            self.assertEqual(list(out['b']), ['x', 'y'] * 3)
+            self.assertEqual(out['b'].dtype, object)
+
+        def test_zip(self):
+            out = zipped({'a': [1, 2], 'b': [3., 4.]})
+            self.assertEqual(sample_count(out), 2)
+            with self.assertRaises(ValueError):
+                zipped({'a': [1, 2], 'b': [3.]})
+
+        def test_lhs(self):
+            out = sample({'a': [0., 10.], 'b': numpy.linspace(-1, 1, 5)}, 'lhs', samples=20, seed=1)
+            self.assertEqual(sample_count(out), 20)
+            strata = numpy.sort(numpy.floor(out['a'] / 10. * 20))
+            self.assertEqual(list(strata), list(range(20)))
+            self.assertTrue(numpy.all(numpy.abs(out['b']) <= 1))
+
+        def test_adaptive_refine(self):
+            #a step at x=0.7, the new points should crowd around it
+            rng = numpy.random.default_rng(0)
+            points = rng.random((20, 2))
+            step = lambda pts: (pts[:, 0] > 0.7).astype(float)
+            for inx in range(10):
+                new = adaptive_refine(points, step(points), [0, 0], [1, 1], 10, seed=inx)
+                self.assertEqual(new.shape, (10, 2))
+                points = numpy.concatenate([points, new])
+            near = numpy.abs(points[20:, 0] - 0.7) < 0.15
+            self.assertGreater(near.mean(), 0.5)
+
+    unittest.main()
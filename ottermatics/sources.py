@@ -0,0 +1,216 @@
+'''Sources of the components a ComponentIterator loops over
+
+A list holds every component up front, the other sources build each component when it is reached
+so only the current one (or one chunk for shuffled generators) is held:
+
+GeneratorSource(factory) - factory() returns a fresh iterable of components on each pass
+TableSource(factory, table) - component `i` is factory(**row i) of a dataframe or {name: array}
+FileSource(factory, path) - rows of a csv or parquet file read a chunk at a time
+
+Sources with random access (lists and tables) can be shuffled by a permutation of the indexes, the
+others are read in chunks and each chunk is permuted.
+'''
+import itertools
+
+import numpy
+import pandas
+
+
+class ComponentSource:
+    '''produces components on demand, `random_access` sources support len() and get(inx), the
+    rest are iterated by chunks of rows that do'''
+    random_access = False
+    chunksize = 10000
+
+    def __len__(self):
+        raise TypeError(f'{type(self).__name__} has no length until it is read')
+
+    def get(self,inx):
+        raise TypeError(f'{type(self).__name__} has no random access')
+
+    def chunks(self):
+        '''yields sources with random access over consecutive rows'''
+        yield self
+
+    def count(self) -> int:
+        '''the number of components, a source without a length is read through by chunks'''
+        try:
+            return len(self)
+        except TypeError:
+            return sum([len(rows) for rows in self.chunks()])
+
+    def __iter__(self):
+        for rows in self.chunks():
+            for inx in range(len(rows)):
+                yield rows.get(inx)
+
+
+class ListSource(ComponentSource):
+    '''components that already exist'''
+    random_access = True
+
+    def __init__(self,components):
+        self.components = components
+
+    def __len__(self):
+        return len(self.components)
+
+    def get(self,inx):
+        return self.components[inx]
+
+    def __iter__(self):
+        return iter(self.components)
+
+
+class GeneratorSource(ComponentSource):
+    '''components from `factory()`, which is called for every pass so it should make a new
+    generator each time, a generator object can only be passed over once
+    :param length: the number of components if known'''
+
+    def __init__(self,factory,length=None,chunksize=None):
+        self.factory = factory
+        self.length = length
+        if chunksize:
+            self.chunksize = chunksize
+
+    def __len__(self):
+        if self.length is None:
+            return super(GeneratorSource,self).__len__()
+        return self.length
+
+    def __iter__(self):
+        return iter(self.factory())
+
+    def count(self):
+        '''the length, counting otherwise would build every component'''
+        return len(self)
+
+    def chunks(self):
+        items = iter(self.factory())
+        while True:
+            chunk = list(itertools.islice(items,self.chunksize))
+            if not chunk:
+                return
+            yield ListSource(chunk)
+
+
+class TableSource(ComponentSource):
+    '''component `inx` is made by `factory(**row)` from the row of a dataframe or dictionary of
+    equal length arrays, values are python types (numpy scalars are converted)
+    :param columns: the columns passed to factory, all of them by default'''
+    random_access = True
+
+    def __init__(self,factory,table,columns=None):
+        self.factory = factory
+        if isinstance(table,pandas.DataFrame):
+            table = {name: table[name].to_numpy() for name in table.columns}
+        columns = list(table) if columns is None else list(columns)
+        self.columns = {name: numpy.asarray(table[name]) for name in columns}
+        lengths = set([len(values) for values in self.columns.values()])
+        if len(lengths) > 1:
+            raise ValueError(f'table columns must be the same length, got {lengths}')
+        self.length = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self.length
+
+    def row(self,inx) -> dict:
+        if inx < 0:
+            inx += self.length
+        return {name: python_value(values[inx]) for name,values in self.columns.items()}
+
+    def get(self,inx):
+        return self.factory(**self.row(inx))
+
+
+class FileSource(ComponentSource):
+    '''rows of a csv or parquet file read `chunksize` rows at a time, each row is made into a
+    component by factory(**row). The format is taken from the extension unless given, pyarrow is
+    needed for parquet
+    :param columns: the columns passed to factory, all of them by default'''
+    formats = ('csv','parquet')
+
+    def __init__(self,factory,path,chunksize=None,columns=None,format=None):
+        self.factory = factory
+        self.path = path
+        self.columns = columns
+        if chunksize:
+            self.chunksize = chunksize
+        if format is None:
+            format = 'parquet' if str(path).lower().endswith(('.parquet','.pq')) else 'csv'
+        if format not in self.formats:
+            raise ValueError(f'format must be one of {self.formats}, got {format}')
+        self.format = format
+
+    def __len__(self):
+        if self.format == 'parquet': #in the metadata
+            import pyarrow.parquet
+            return pyarrow.parquet.ParquetFile(self.path).metadata.num_rows
+        return super(FileSource,self).__len__()
+
+    def chunks(self):
+        if self.format == 'parquet':
+            import pyarrow.parquet
+            parquet = pyarrow.parquet.ParquetFile(self.path)
+            for batch in parquet.iter_batches(batch_size=self.chunksize,columns=self.columns):
+                table = {name: column.to_numpy(zero_copy_only=False) \
+                                            for name,column in zip(batch.schema.names,batch.columns)}
+                yield TableSource(self.factory,table)
+        else:
+            for frame in pandas.read_csv(self.path,chunksize=self.chunksize,usecols=self.columns):
+                yield TableSource(self.factory,frame)
+
+def python_value(value):
+    if isinstance(value,numpy.generic):
+        return value.item()
+    return value
+
+def as_source(value) -> ComponentSource:
+    '''a ComponentSource from a source, a list or tuple of components or a generator function'''
+    if isinstance(value,ComponentSource):
+        return value
+    if isinstance(value,(list,tuple)):
+        return ListSource(value)
+    if callable(value):
+        return GeneratorSource(value)
+    raise TypeError(f'cannot make a component source from {type(value).__name__}, use a list of '+\
+                     'components, a function returning a generator of them or a ComponentSource')
+
+
+if __name__ == '__main__':
+
+    import os
+    import unittest
+    import tempfile
+
+    Row = lambda **row: row
+
+    class TestSources(unittest.TestCase):
+
+        def test_table(self):
+            source = TableSource(Row,pandas.DataFrame({'x': [1,2,3],'name': ['a','b','c']}))
+            self.assertEqual(len(source),3)
+            self.assertEqual(source.get(-1),{'x': 3,'name': 'c'})
+            self.assertIs(type(source.get(0)['x']),int)
+
+        def test_generator(self):
+            source = GeneratorSource(lambda: ({'x': x} for x in range(7)),chunksize=3)
+            self.assertEqual([len(rows) for rows in source.chunks()],[3,3,1])
+            self.assertEqual(list(source),list(source)) #a new pass each time
+            with self.assertRaises(TypeError):
+                source.count()
+            self.assertEqual(GeneratorSource(source.factory,length=7).count(),7)
+
+        def test_files(self):
+            frame = pandas.DataFrame({'x': numpy.arange(25.),'n': numpy.arange(25)})
+            with tempfile.TemporaryDirectory() as tmp:
+                frame.to_csv(os.path.join(tmp,'rows.csv'),index=False)
+                frame.to_parquet(os.path.join(tmp,'rows.parquet'))
+                for fil in ('rows.csv','rows.parquet'):
+                    source = FileSource(Row,os.path.join(tmp,fil),chunksize=10)
+                    self.assertEqual([len(rows) for rows in source.chunks()],[10,10,5])
+                    self.assertEqual(list(source),frame.to_dict('records'))
+                    self.assertEqual(source.count(),25)
+                self.assertEqual(len(source),25)
+
+    unittest.main()
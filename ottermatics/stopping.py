@@ -0,0 +1,163 @@
+'''Stopping criteria for analysis solves
+
+A solve checks its criteria after every item is tabulated (after every merged chunk in parallel)
+and stops at the first one that is met, recording its reason as the analysis' stop_reason.
+
+MaxWallTime(seconds) - stops once the solve has run this long
+MaxEvaluations(count) - stops after this many items
+RunningTolerance(columns) - stops when running statistics of table columns have settled
+
+A criterion is started with the analysis at the beginning of each solve so one can be reused.
+'''
+import time
+import numpy
+
+
+class StoppingCriterion:
+    '''decides when a solve has done enough, start() is called as the solve begins and check()
+    after each item is tabulated returning True to stop, with the reason set'''
+    reason = None
+
+    def start(self,analysis):
+        self.reason = None
+
+    def check(self,analysis,items) -> bool:
+        '''
+        :param items: the number of items solved so far'''
+        return False
+
+
+class MaxWallTime(StoppingCriterion):
+    '''stops after `seconds` of wall time'''
+
+    def __init__(self,seconds):
+        self.seconds = seconds
+        self.started = None
+
+    def start(self,analysis):
+        super(MaxWallTime,self).start(analysis)
+        self.started = time.perf_counter()
+
+    def check(self,analysis,items):
+        elapsed = time.perf_counter() - self.started
+        if elapsed >= self.seconds:
+            self.reason = f'wall time {elapsed:.1f}s over {self.seconds}s'
+            return True
+        return False
+
+
+class MaxEvaluations(StoppingCriterion):
+    '''stops after `count` items'''
+
+    def __init__(self,count):
+        self.count = count
+
+    def check(self,analysis,items):
+        if items >= self.count:
+            self.reason = f'{items} items solved'
+            return True
+        return False
+
+
+class RunningTolerance(StoppingCriterion):
+    '''stops when the running statistic of every column is within `rtol * |mean| + atol`
+    for `patience` rows in a row, after at least `min_rows` rows
+
+    statistic='stderr' compares the standard error of the mean, the usual monte carlo measure,
+    statistic='mean' compares the change of the running mean from one row to the next
+
+    :param columns: column names of the component's table
+    :param component: the configuration whose table is read, by default the analysis'''
+    statistics = ('stderr','mean')
+
+    def __init__(self,columns,rtol=1E-2,atol=0.0,min_rows=10,patience=1,statistic='stderr',component=None):
+        if statistic not in self.statistics:
+            raise ValueError(f'statistic must be one of {self.statistics}, got {statistic}')
+        self.columns = [columns] if isinstance(columns,str) else list(columns)
+        self.rtol = rtol
+        self.atol = atol
+        self.min_rows = min_rows
+        self.patience = patience
+        self.statistic = statistic
+        self.component = component
+
+    def start(self,analysis):
+        super(RunningTolerance,self).start(analysis)
+        self.table = (analysis if self.component is None else self.component).TABLE
+        self.read = len(self.table) #rows before the solve aren't counted
+        self.rows = 0
+        self.mean = numpy.zeros(len(self.columns))
+        self.m2 = numpy.zeros(len(self.columns))
+        self.settled = 0
+
+    def update(self,values):
+        '''welford's running mean and variance, returns the change of the mean'''
+        self.rows += 1
+        delta = values - self.mean
+        self.mean = self.mean + delta / self.rows
+        self.m2 = self.m2 + delta * (values - self.mean)
+        return numpy.abs(delta / self.rows)
+
+    def check(self,analysis,items):
+        size = len(self.table)
+        for inx in range(self.read,size):
+            values = numpy.array([self.table.value(name,inx) for name in self.columns],dtype=float)
+            change = self.update(values)
+            if self.rows < max(self.min_rows,2):
+                continue
+            if self.statistic == 'stderr':
+                measure = numpy.sqrt(self.m2 / (self.rows - 1) / self.rows)
+            else:
+                measure = change
+            if (measure <= self.rtol * numpy.abs(self.mean) + self.atol).all():
+                self.settled += 1
+            else:
+                self.settled = 0
+        self.read = size
+
+        if self.settled >= self.patience:
+            self.reason = f'{self.statistic} of {self.columns} within tolerance after {self.rows} rows'
+            return True
+        return False
+
+def as_criteria(stop) -> list:
+    '''a list of criteria from None, a criterion or a list of them'''
+    if stop is None:
+        return []
+    if isinstance(stop,StoppingCriterion):
+        return [stop]
+    return list(stop)
+
+
+if __name__ == '__main__':
+
+    import unittest
+    from ottermatics.columnar import ColumnarTable
+
+    class Holder:
+        def __init__(self):
+            self.TABLE = ColumnarTable()
+
+    class TestStopping(unittest.TestCase):
+
+        def test_tolerance(self):
+            holder = Holder()
+            rng = numpy.random.default_rng(0)
+            criterion = RunningTolerance('y',rtol=0.01,min_rows=20)
+            criterion.start(holder)
+            for inx in range(100000):
+                holder.TABLE.append({'y': 10 + rng.normal()})
+                if criterion.check(holder,inx+1):
+                    break
+            #stderr 1/sqrt(n) <= 0.1 near n = 100
+            self.assertLess(criterion.rows,200)
+            self.assertAlmostEqual(criterion.mean[0],10,delta=0.5)
+
+        def test_limits(self):
+            self.assertTrue(MaxEvaluations(3).check(None,3))
+            criterion = MaxWallTime(0.0)
+            criterion.start(None)
+            self.assertTrue(criterion.check(None,1))
+            self.assertIn('wall time',criterion.reason)
+
+    unittest.main()
@@ -4,6 +4,10 @@ import attr
 from ottermatics.configuration import Configuration, otterize, meta, chunks, inst_vectorize
 from ottermatics.logging import LoggingMixin, log
 from ottermatics.client import ClientInfoMixin
+from ottermatics.patterns import SingletonMeta
+from ottermatics.columnar import ColumnarTable, FLOAT_KIND, INT_KIND, OBJECT_KIND, read_only
+from ottermatics import instrumentation
+from ottermatics.instrumentation import perf_counter
 from ottermatics.locations import *
 from ottermatics.gdocs import *
 
@@ -15,6 +19,12 @@ import pandas
 import os
 import inspect
 import pathlib
+import operator
+import numbers
+import uuid
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait as futures_wait
 
 import matplotlib.pyplot as plt
 
@@ -41,8 +51,6 @@ ATTR_VALIDATOR_TYPES = (attr.validators._AndValidator,attr.validators._InstanceO
 TAB_VALIDATOR_TYPE = attr.validators._InstanceOfValidator #our validators shoudl require a type i think, at least for tabulation
 
 
-#TOOD: add at iterated cache option to table property. this provides dynamic programming like performance benefits
-#TODO: add a vector_property with interface like vector_property(split_cols = 'x','y','z) for vectors
 class table_property:
     """Emulate PyProperty_Type() in Objects/descrobject.c
     
@@ -51,18 +59,37 @@ class table_property:
         def function(...): < this uses __init__ to assign function
             
         @table_property(desc='really nice',label='funky function')
-        def function(...):    < this uses __call__ to assign function"""
+        def function(...):    < this uses __call__ to assign function
+        
+        Expensive properties can be memoized with `cached=True`, the value is kept until the next
+        save_data() or until any attrs field changes. If `depends_on` names the attrs fields the 
+        value is computed from, changes of other fields keep it, it is still dropped on a new save
+        since a value may depend on more than the fields that were named.
+        @table_property(cached=True,depends_on=('length','load'))
+        def function(...):    < computed once per row, or again when length or load changes
+
+        In a vectorized save (see TabulationMixin.save_block) attrs fields can hold arrays and the
+        property is evaluated once over them, set `array_safe=False` to evaluate it once per row
+        @table_property(array_safe=False)
+        def function(...):    < uses if statements or math on scalars"""
     
     desc = ''
     label = None
+    cached = False
+    depends_on = None
+    array_safe = True
 
-    def __init__(self, fget=None, fset=None, fdel=None, doc=None, desc = None, label=None):
+    def __init__(self, fget=None, fset=None, fdel=None, doc=None, desc = None, label=None, cached=False, depends_on=None, array_safe=True):
         '''You can initalize just the functions, or precreate the object but with meta
         @table_property
         def function(...): < this uses __init__ to assign function
             
         @table_property(desc='really nice',label='funky function')
         def function(...):    < this uses __call__ to assign function
+
+        :param cached: memoize the value on the instance, see table_property
+        :param depends_on: attrs field names that invalidate a cached value when they change
+        :param array_safe: the getter works when attrs fields hold arrays
         '''
 
         self.fget = fget
@@ -82,10 +109,19 @@ class table_property:
         elif fget is not None:
             self.label = fget.__name__
 
+        if cached or depends_on is not None:
+            self.cached = True
+        if depends_on is not None:
+            self.depends_on = frozenset([depends_on] if isinstance(depends_on,str) else depends_on)
+        if not array_safe:
+            self.array_safe = False
+
     def __call__(self,fget=None, fset=None, fdel=None, doc=None):
         '''this will be called when either label or desc is set'''
         if self.fget is None:
             self.fget = fget
+        if self.label is None and fget is not None:
+            self.label = fget.__name__
         if self.fset is None:            
             self.fset = fset
         if self.fdel is None:            
@@ -102,6 +138,14 @@ class table_property:
             return self
         if self.fget is None:
             raise AttributeError("unreadable attribute")
+        if self.cached:
+            cache = obj._cached_table_properties
+            if cache is None:
+                cache = obj._cached_table_properties = {}
+            elif self in cache:
+                return cache[self]
+            value = cache[self] = self.fget(obj)
+            return value
         return self.fget(obj)
 
     def __set__(self, obj, value):
@@ -115,16 +159,282 @@ class table_property:
         self.fdel(obj)
 
     def getter(self, fget):
-        return type(self)(fget, self.fset, self.fdel, self.__doc__)
+        return type(self)(fget, self.fset, self.fdel, self.__doc__, **self.options)
 
     def setter(self, fset):
-        return type(self)(self.fget, fset, self.fdel, self.__doc__)
+        return type(self)(self.fget, fset, self.fdel, self.__doc__, **self.options)
 
     def deleter(self, fdel):
-        return type(self)(self.fget, self.fset, fdel, self.__doc__)    
+        return type(self)(self.fget, self.fset, fdel, self.__doc__, **self.options)
+
+    @property
+    def options(self) -> dict:
+        '''keyword arguments to recreate this property with different functions'''
+        return {'cached':self.cached,'depends_on':self.depends_on,'array_safe':self.array_safe}
+
+    def column_keys(self,key) -> list:
+        '''the table columns this property is tabulated as'''
+        return [key.lower()]
+
+    def column_labels(self) -> list:
+        return [self.label]
+
+    def invalidated_by(self, name=None) -> bool:
+        '''if a cached value is stale after field `name` changes, or after a new save when name is None'''
+        if name is None or self.depends_on is None:
+            return True
+        return name in self.depends_on
+
+
+class vector_property(table_property):
+    '''A table_property for fixed length vectors, the rows are stored in a contiguous (rows x k)
+    float block of the table and show up as one column per component in the dataframe
+
+        @vector_property(split_cols=('x','y','z'))
+        def cog(self): < tabulated as cog_x, cog_y, cog_z
+            return numpy.array([x,y,z])
+
+        @vector_property(length=6)
+        def loads(self): < tabulated as loads_0 ... loads_5'''
+
+    split_cols = ('x','y','z')
+
+    def __init__(self, fget=None, fset=None, fdel=None, doc=None, desc = None, label=None, cached=False, depends_on=None, array_safe=True, split_cols=None, length=None):
+        super(vector_property,self).__init__(fget, fset, fdel, doc, desc=desc, label=label, cached=cached, depends_on=depends_on, array_safe=array_safe)
+        if split_cols is not None:
+            self.split_cols = tuple([str(col) for col in split_cols])
+        elif length is not None:
+            self.split_cols = tuple([str(inx) for inx in range(length)])
+
+    @property
+    def options(self) -> dict:
+        return {'split_cols':self.split_cols,**super(vector_property,self).options}
+
+    @property
+    def width(self) -> int:
+        return len(self.split_cols)
+
+    def column_keys(self,key) -> list:
+        return [f'{key.lower()}_{col}' for col in self.split_cols]
+
+    def column_labels(self) -> list:
+        return [f'{self.label}_{col}' for col in self.split_cols]
+
+    def vector_value(self,obj) -> numpy.ndarray:
+        '''the value of this property for obj as a flat float array of `width`, None is all nan'''
+        value = self.__get__(obj)
+        if value is None:
+            return numpy.full(self.width,numpy.nan)
+        value = numpy.asarray(value,dtype=float).reshape(-1)
+        if value.size != self.width:
+            raise ValueError(f'{self.label} should have {self.width} values, got {value.size}')
+        return value
+
+    def block_value(self,value,size) -> numpy.ndarray:
+        '''a value of this property from a vectorized evaluation as a (size x width) float array, 
+        a single vector is repeated on every row'''
+        if value is None:
+            return numpy.full((size,self.width),numpy.nan)
+        value = numpy.asarray(value,dtype=float)
+        if value.shape == (self.width,):
+            return numpy.broadcast_to(value,(size,self.width))
+        if value.shape != (size,self.width):
+            raise ValueError(f'{self.label} should have shape {(size,self.width)}, got {value.shape}')
+        return value
+
+
+
+class RowExtractor:
+    '''A compiled data_dict for one class, made once from the class's attrs fields and table 
+    properties so saving a row doesn't need any reflection.
+
+    It holds the ordered lower case keys of a row and a getter for the attrs values and each
+    table_property, call it with an instance to get the row. vector_property values are numpy
+    arrays in the row, which the table stores as a block
+
+    :param skip: attribute names to leave out, defaults to the class's _skip_attr'''
+
+    __slots__ = ('cls','attr_names','keys','get_attrs','getters','properties','vector_keys','blocks',
+                 'owners')
+
+    def __init__(self,cls,skip=None):
+        self.cls = cls
+        skip = set(cls._skip_attr or []) if skip is None else set(skip)
+        self.attr_names = tuple([k for k in attr.fields_dict(cls).keys() if k not in skip])
+        self.properties = cls.classmethod_table_propeties()
+
+        self.keys = tuple([k.lower() for k in self.attr_names] + 
+                          [k.lower() for k in self.properties.keys()] + ['index'])
+
+        #attrgetter gets every attribute in one call but doesn't return a tuple for one name
+        if len(self.attr_names) > 1:
+            self.get_attrs = operator.attrgetter(*self.attr_names)
+        elif self.attr_names:
+            single = operator.attrgetter(self.attr_names[0])
+            self.get_attrs = lambda inst: (single(inst),)
+        else:
+            self.get_attrs = lambda inst: ()
+        self.getters = tuple([prop.vector_value if isinstance(prop,vector_property) else prop.__get__ \
+                                                        for prop in self.properties.values()])
+        self.vector_keys = frozenset([k.lower() for k,prop in self.properties.items() if isinstance(prop,vector_property)])
+        self.blocks = {k.lower():tuple(prop.column_keys(k)) for k,prop in self.properties.items() 
+                                                                if isinstance(prop,vector_property)}
+        self.owners = tuple([f'{cls.__name__}.{k}' for k in self.properties.keys()])
+
+    def __call__(self,inst) -> dict:
+        metrics = instrumentation.ACTIVE
+        if metrics is not None and metrics.sampling and self.getters:
+            return self.timed(inst,metrics)
+        values = self.get_attrs(inst) + tuple([getter(inst) for getter in self.getters]) + (inst.index,)
+        return {k:v if v is not None else numpy.nan for k,v in zip(self.keys,values) 
+                                                    if isinstance(v,TABLE_TYPES) or k in self.vector_keys}
+
+    def timed(self,inst,metrics) -> dict:
+        '''the row of inst, recording the time of each table property to metrics as a sample'''
+        props = []
+        weight = metrics.weight
+        for owner,getter in zip(self.owners,self.getters):
+            start = perf_counter()
+            props.append(getter(inst))
+            metrics.record('table_property',owner,perf_counter()-start,weight)
+        values = self.get_attrs(inst) + tuple(props) + (inst.index,)
+        return {k:v if v is not None else numpy.nan for k,v in zip(self.keys,values) 
+                                                    if isinstance(v,TABLE_TYPES) or k in self.vector_keys}
+
+    def block(self,inst,size) -> dict:
+        '''The values of `size` rows for inst, where attrs fields may hold arrays of size values. Each
+        column is an array of size values or one value for every row, vectors are (size x k) arrays.
+        Properties are evaluated once over the arrays, or once per row if they aren't array_safe'''
+        attr_values = self.get_attrs(inst)
+        arrays = {name:value for name,value in zip(self.attr_names,attr_values) 
+                                    if isinstance(value,numpy.ndarray) and value.shape == (size,)}
+        out = {}
+        for key,value in zip(self.keys,attr_values):
+            value = block_value(value,size)
+            if value is not None:
+                out[key] = value
+
+        prop_keys = self.keys[len(self.attr_names):-1]
+        for key,prop in zip(prop_keys,self.properties.values()):
+            if prop.array_safe or not arrays:
+                value = prop.__get__(inst)
+            else:
+                value = self.row_values(inst,prop,arrays,size)
+            if isinstance(prop,vector_property):
+                out[key] = prop.block_value(value,size)
+            else:
+                value = block_value(value,size)
+                if value is not None:
+                    out[key] = value
+
+        out['index'] = numpy.arange(inst.index,inst.index+size)
+        return out
+
+    @staticmethod
+    def row_values(inst,prop,arrays,size):
+        '''evaluates prop on each row by setting the array fields to their values for that row'''
+        cache = inst._cached_table_properties
+        values = []
+        try:
+            for inx in range(size):
+                for name,array in arrays.items():
+                    object.__setattr__(inst,name,array[inx].item() if array.dtype.kind in 'fiub' else array[inx])
+                inst._cached_table_properties = None
+                value = prop.__get__(inst)
+                values.append(prop.vector_value(inst) if isinstance(prop,vector_property) else value)
+        finally:
+            for name,array in arrays.items():
+                object.__setattr__(inst,name,array)
+            inst._cached_table_properties = cache
+        if isinstance(prop,vector_property):
+            return numpy.stack(values)
+        if all([isinstance(val,(int,float)) and not isinstance(val,bool) for val in values]):
+            return numpy.array(values)
+        out = numpy.empty(size,dtype=object)
+        out[:] = values
+        return out
+
+
+def block_value(value,size):
+    '''a column value of a vectorized row block, an array of size values or one tabular value for
+    every row, or None when the value can't be tabulated'''
+    if isinstance(value,numpy.ndarray):
+        if value.ndim == 0:
+            value = value.item()
+        elif value.shape == (size,):
+            return value
+        else:
+            return None
+    if value is None:
+        return numpy.nan
+    if isinstance(value,TABLE_TYPES):
+        return value
+    return None
+
+
+class cache_entry:
+    '''A per instance cache stored in the instance's `_tabulation_cache` dictionary, so the many 
+    tabulation caches share one lazily allocated structure rather than each becoming an instance
+    attribute, setting None removes the entry'''
+    __slots__ = ('name',)
+
+    def __set_name__(self,owner,name):
+        self.name = name
+
+    def __get__(self,obj,objtype=None):
+        if obj is None:
+            return self
+        cache = obj._tabulation_cache
+        if cache is None:
+            return None
+        return cache.get(self.name)
+
+    def __set__(self,obj,value):
+        cache = obj._tabulation_cache
+        if cache is None:
+            if value is None:
+                return
+            cache = obj._tabulation_cache = {}
+        if value is None:
+            cache.pop(self.name,None)
+        else:
+            cache[self.name] = value
+
+
+class TableWriter(LoggingMixin,metaclass=SingletonMeta):
+    '''A single background thread that save_table hands dataframes to, writes happen in the order 
+    they were submitted and each submission returns a future of the written file paths'''
 
+    _executor = None
 
+    def __init__(self):
+        self.pending = set()
+        self._lock = threading.Lock()
 
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1,thread_name_prefix='table_writer')
+        return self._executor
+
+    def submit(self,func,*args,**kwargs) -> Future:
+        future = self.executor.submit(func,*args,**kwargs)
+        with self._lock:
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self,future):
+        with self._lock:
+            self.pending.discard(future)
+        if future.exception() is not None:
+            self.error(future.exception(),'Issue Writing Table:')
+
+    def wait(self,timeout=None):
+        '''blocks until all submitted writes are finished'''
+        with self._lock:
+            pending = list(self.pending)
+        return futures_wait(pending,timeout=timeout)
 
 
 @otterize
@@ -140,7 +450,10 @@ class TabulationMixin(Configuration,ClientInfoMixin):
     
     
     #table property internal variables
-    __store_options = ('csv','excel','gsheets')#,'db','gsheets','excel','json')
+    __store_options = ('csv','csv.gz','csv.zst','parquet','feather','excel','gsheets')#,'db','json')
+    __file_store_options = {'csv':'save_csv','csv.gz':'save_csv_gzip','csv.zst':'save_csv_zstd',
+                            'parquet':'save_parquet','feather':'save_feather','excel':'save_excel'}
+    background_save = True #file formats are written on the TableWriter thread
     _store_types = None
     _store_level:int = -1  
 
@@ -149,27 +462,43 @@ class TabulationMixin(Configuration,ClientInfoMixin):
     _stat_tab_functions = None
     _avg_tab_functions = None
 
+    #Spilling, set spill_rows or spill_bytes to write TABLE rows to segments on disk as they come in,
+    #dataframes of a spilled table are read in full when asked for but never cached, iter_dataframes
+    #reads one segment at a time
+    spill_rows:int = None
+    spill_bytes:int = None
+    spill_format:str = 'arrow' #or parquet
+    _spill_path = None
+
+    #Delta Rows, store only the values that changed from the row before with a keyframe every so often
+    delta_rows:bool = False
+    keyframe_interval:int = 256
+
     _table = None
+    _cls_table_schema = None #per class column kinds, see cls_table_schema()
     _cls_attrs = None
     _attr_labels = None 
     #_attr_keys = None
     _anything_changed = False
+    _cached_table_properties = cache_entry() #{table_property: value} for cached table properties
     _skip_table = False #This prevents config from reportin up through internal configurations    
 
     max_col_width_static:int = 10
 
-    #Internal Dataframe Caches: - Reset on anything_changed, and reset_table()
-    _dataframe = None
-    _variable_dataframe= None
-    _static_dataframe= None
-    _static_data_dict= None
-    _variable_data_dict= None
-    _toplevel_static= None
-    _otherstatic_tables= None
-    _variable_tables= None
-    _joined_dataframe= None
-    _complete_dataframe = None
-    __table_properties = None #hot caching of table properties from all user subclasses
+    #Internal Dataframe Caches: - Tracked against table versions, reset with reset_table() or refresh()
+    _tabulation_cache = None #{name: value} for the cache entries, allocated on first use
+    _dataframe = cache_entry()
+    _variable_dataframe= cache_entry()
+    _static_dataframe= cache_entry()
+    _static_data_dict= cache_entry()
+    _variable_data_dict= cache_entry()
+    _toplevel_static= cache_entry()
+    _otherstatic_tables= cache_entry()
+    _variable_tables= cache_entry()
+    _joined_dataframe= cache_entry()
+    _complete_dataframe = cache_entry()
+    _cache_stamps = cache_entry() #the table versions each cache was built at
+    _row_extractor = None #per class RowExtractor, see row_extractor()
 
     #Data Tabulation - Intelligent Lookups
     def save_data(self,index=None,saved=None, force = False):
@@ -183,7 +512,19 @@ class TabulationMixin(Configuration,ClientInfoMixin):
         
 
         if self.anything_changed or not self.TABLE or force:
-            self.TABLE.append(self.data_dict)
+            metrics = instrumentation.ACTIVE
+            if metrics is None or not metrics.sampling:
+                self.TABLE.append(self.data_dict)
+            else:
+                start = perf_counter()
+                row = self.data_dict
+                middle = perf_counter()
+                self.TABLE.append(row)
+                owner = type(self).__name__
+                weight = metrics.weight
+                metrics.record('data_dict',owner,middle-start,weight)
+                metrics.record('append',owner,perf_counter()-middle,weight)
+                metrics.count('rows',weight)
             self.debug('saving data {}'.format(self.index))
             saved.add(self)    
 
@@ -191,6 +532,8 @@ class TabulationMixin(Configuration,ClientInfoMixin):
                 self.index = index
             else:
                 self.index += 1
+
+            self.clear_cached_properties()
             
             
         for config in self.internal_components.values():
@@ -200,6 +543,35 @@ class TabulationMixin(Configuration,ClientInfoMixin):
                 self.debug(f'skipping saved config {config.identity}')
 
         self._anything_changed = False
+        self.mark_clean()
+
+    def save_block(self,size,saved=None,force=False):
+        '''Saves `size` rows at once like save_data, for a vectorized evaluation where attrs fields
+        hold arrays of size values. Table properties are evaluated over the arrays and anything
+        that isn't an array is repeated on every row, see RowExtractor.block'''
+        if saved is None:
+            saved = set()
+
+        if self.anything_changed or not self.TABLE or force:
+            self.TABLE.extend(self.block_dict(size),size)
+            if instrumentation.ACTIVE is not None:
+                instrumentation.ACTIVE.count('rows',size)
+            self.debug('saving data {}:{}'.format(self.index,self.index+size))
+            saved.add(self)
+            self.index += size
+            self.clear_cached_properties()
+
+        for config in self.internal_components.values():
+            if config not in saved:
+                config.save_block(size,saved=saved)
+
+        self._anything_changed = False
+        self.mark_clean()
+
+    @property
+    def internal_components(self):
+        '''tabulated configurations held by this one, Component narrows these to components'''
+        return {k:v for k,v in self.internal_configurations.items() if isinstance(v,TabulationMixin)}
 
     @property
     def anything_changed(self):
@@ -209,11 +581,40 @@ class TabulationMixin(Configuration,ClientInfoMixin):
             return True
         return False        
 
+    def _property_changed(self,name):
+        super()._property_changed(name)
+        self.clear_cached_properties(name)
+
+    def clear_cached_properties(self,name=None,everything=False):
+        '''Drops cached table_property values made stale by a change of attrs field `name`, with no
+        name every cached value is dropped as a new row starts
+        :param everything: drop all cached values regardless of their dependencies'''
+        cache = self._cached_table_properties
+        if cache:
+            for prop in list(cache.keys()):
+                if everything or prop.invalidated_by(name):
+                    del cache[prop]
+
+    def __copy__(self):
+        '''the copy saves rows to its own table, starting with a copy of this one's'''
+        newone = super(TabulationMixin,self).__copy__()
+        newone._tabulation_cache = None #the nested caches would be shared otherwise
+        if self._table is not None:
+            newone._table = copy.copy(self._table)
+        return newone
+
+    def __setstate__(self,state):
+        self.__dict__.update(state)
+        self._tabulation_cache = None #rebuilt from the table as it is used
+
     def reset_table(self):
         '''Resets the table, and attrs label stores'''
         self.index = 0.0
+        self.clear_cached_properties(everything=True)
         self._cls_attrs = None
         self._attr_labels = None
+        if self._table is not None:
+            self._table.remove_segments()
         self._table = None
         self.reset_meta()
 
@@ -227,39 +628,141 @@ class TabulationMixin(Configuration,ClientInfoMixin):
         self._toplevel_static = None
         self._otherstatic_tables = None
         self._variable_tables = None
-        self._joined_dataframe = None    
+        self._joined_dataframe = None
+        self._complete_dataframe = None
+        self._cache_stamps = None
+
+    def refresh(self):
+        '''Drops the cached dataframes of this configuration and its internal components, they
+        will be fully rebuilt from their tables on the next access'''
+        for level,conf in self.go_through_configurations():
+            if isinstance(conf,TabulationMixin):
+                conf.reset_meta()
 
     @property
-    def TABLE(self):
-        '''this should seem significant'''
+    def table_version(self) -> int:
+        '''increments whenever data is added to TABLE, the dataframes are cached against this'''
+        return self.TABLE.version
+
+    @property
+    def tables_signature(self) -> tuple:
+        '''the identity and table version of each configuration reported at store_level'''
+        return tuple([ (id(conf),conf.table_version) for level,conf in self.go_through_configurations(0,self.store_level)
+                                                        if isinstance(conf,TabulationMixin) ])
+
+    def _stamp(self,name):
+        stamps = self._cache_stamps
+        if stamps is None:
+            return None
+        return stamps.get(name)
+
+    def _set_stamp(self,name,stamp):
+        if self._cache_stamps is None:
+            self._cache_stamps = {}
+        self._cache_stamps[name] = stamp
+
+    def _incremental_frame(self,name,columns=None):
+        '''Returns the frame cached as _<name> with only the rows added to TABLE since it was built 
+        appended, it is rebuilt when columns are added or change type, or when the table is smaller 
+        than the frame. A table with spilled rows is read in full and the frame isn't kept'''
+        table = self.TABLE
+        if table.spilled_rows:
+            setattr(self,'_'+name,None)
+            self._set_stamp(name,None)
+            return table.to_dataframe(columns=columns)
+
+        frame = getattr(self,'_'+name)
+        rows = len(table)
+        cols = tuple(table.keys()) if columns is None else tuple(columns)
+        stamp = self._stamp(name)
+
+        if frame is None or stamp is None or stamp[0] != table.schema_version \
+                                          or stamp[2] != cols or stamp[1] > rows:
+            frame = table.to_dataframe(columns=columns)
+        elif stamp[1] < rows:
+            frame = pandas.concat([frame,table.to_dataframe(stamp[1],columns=columns)])
+
+        self._set_stamp(name,(table.schema_version,rows,cols))
+        setattr(self,'_'+name,frame)
+        return frame
+
+    def iter_dataframes(self,columns=None):
+        '''yields a dataframe per spilled segment of TABLE then one of the buffered rows, so a table
+        larger than memory can be read a segment at a time, their indexes are the row numbers'''
+        return self.TABLE.iter_dataframes(columns)
+
+    @property
+    def TABLE(self) -> ColumnarTable:
+        '''this should seem significant, a columnar table which appends and iterates rows as dictionaries'''
         if self._table is None:
-            self._table = []
+            options = {}
+            if self.spill_rows or self.spill_bytes:
+                options.update(spill_dir=self.spill_path, spill_rows=self.spill_rows,
+                               spill_bytes=self.spill_bytes, spill_format=self.spill_format)
+            if self.delta_rows:
+                options.update(delta=True, keyframe_interval=self.keyframe_interval)
+            self._table = ColumnarTable(schema=self.cls_table_schema(),blocks=self.cls_table_blocks(),**options)
         return self._table
 
     @property
-    def dataframe(self):
-        if self._dataframe is None or self._anything_changed:
-            #self._dataframe = pandas.DataFrame(data = self.TABLE, columns = self.data_label,copy=True)
-            self._dataframe = pandas.DataFrame(data = self.TABLE, copy=True)
+    def spill_path(self):
+        '''the directory TABLE segments are written to, by default a unique folder in config_path_daily'''
+        if self._spill_path is None:
+            self._spill_path = os.path.join(self.config_path_daily,'segments',uuid.uuid4().hex[:12])
+        return self._spill_path
+
+    @spill_path.setter
+    def spill_path(self,path):
+        self._spill_path = path
+        if self._table is not None:
+            self._table.spill_dir = path
 
-        return self._dataframe
+    @classmethod
+    def cls_table_blocks(cls) -> dict:
+        '''the split column names of each vector_property'''
+        return cls.row_extractor().blocks
 
-    @property
-    def variable_dataframe(self):
-        if self._variable_dataframe is None or self._anything_changed:
+    @classmethod
+    def cls_table_schema(cls) -> dict:
+        '''The column kinds of this class's attrs fields, determined from their instance_of validators
+        and cached per class so each new table can type its columns before any data arrives'''
+        schema = cls.__dict__.get('_cls_table_schema')
+        if schema is None:
+            schema = {}
+            for k,field in attr.fields_dict(cls).items():
+                if not isinstance(field.validator,TAB_VALIDATOR_TYPE):
+                    continue
+                types = field.validator.type
+                types = types if isinstance(types,tuple) else (types,)
+                if all([issubclass(typ,STR_TYPES) for typ in types]):
+                    schema[k.lower()] = OBJECT_KIND
+                elif all([typ in NUMERIC_NAN_TYPES for typ in types]):
+                    schema[k.lower()] = FLOAT_KIND if float in types else INT_KIND
+            cls._cls_table_schema = schema
+        return schema
 
-            vals = list(zip(*list((self.variable_data_dict.values()))))
-            cols = list((self.variable_data_dict.keys()))
-            if vals:
-                self._variable_dataframe = pandas.DataFrame(data = vals, columns=cols, copy = True)
-            else:
-                self._variable_dataframe = None
+    @property
+    def dataframe(self):
+        metrics = instrumentation.ACTIVE
+        if metrics is None:
+            return self._incremental_frame('dataframe')
+        with metrics.timer('dataframe',type(self).__name__):
+            return self._incremental_frame('dataframe')
 
-        return self._variable_dataframe
+    @property
+    def variable_dataframe(self):
+        table = self.TABLE
+        #the variable columns of table_iterator, from the state the table tracks without reading them
+        variable = [label for label in table.variable_columns() if table.is_tabular(label)] if len(table) > 1 else []
+        if variable:
+            return self._incremental_frame('variable_dataframe',variable)
+        self._variable_dataframe = None
+        return None
 
     @property
     def static_dataframe(self):
-        if self._static_dataframe is None or self._anything_changed:
+        if self._static_dataframe is None or self._stamp('static_dataframe') != self.table_version:
+            self._set_stamp('static_dataframe',self.table_version)
 
             vals = [list((self.static_data_dict.values()))]
             cols = list((self.static_data_dict.keys()))
@@ -274,11 +777,13 @@ class TabulationMixin(Configuration,ClientInfoMixin):
     def static_data_dict(self):
         '''returns key-value pairs in table that are single valued, all in type 1, some in type 2'''
         
-        if self._static_data_dict is None or self._anything_changed:
+        if self._static_data_dict is None or self._stamp('static_data_dict') != self.table_version:
+            self._set_stamp('static_data_dict',self.table_version)
             output = {}
             for tab_type,value,label in self.table_iterator:
                 if tab_type == 1:
-                    return {l:v for l,v in zip(label,value)}
+                    output = {l:v for l,v in zip(label,value)}
+                    break
                 elif tab_type == 2:
                     output[label] = value
             self._static_data_dict = output
@@ -287,7 +792,8 @@ class TabulationMixin(Configuration,ClientInfoMixin):
     @property
     def variable_data_dict(self):
         '''returns a dictionary of key value pairs where values list is not the same all of type 3 and some of type 2'''
-        if self._variable_data_dict is None or self._anything_changed:
+        if self._variable_data_dict is None or self._stamp('variable_data_dict') != self.table_version:
+            self._set_stamp('variable_data_dict',self.table_version)
             output = {}
             for tab_type,value,label in self.table_iterator:
                 if tab_type == 3:
@@ -298,7 +804,8 @@ class TabulationMixin(Configuration,ClientInfoMixin):
     #Multi-Component Table Lookups
     @property
     def toplevel_static(self):
-        if self._toplevel_static is None or self._anything_changed:
+        if self._toplevel_static is None or self._stamp('toplevel_static') != self.table_version:
+            self._set_stamp('toplevel_static',self.table_version)
             out_df = self.cleanup_dataframe( self.static_dataframe )
             df_list = self.split_dataframe_by_colmum(out_df,self.max_col_width_static)
 
@@ -308,22 +815,24 @@ class TabulationMixin(Configuration,ClientInfoMixin):
 
     @property
     def other_static_tables(self):
-        if self._otherstatic_tables is None or self._anything_changed:
-            rds = self.recursive_data_structure(self.store_level)
+        signature = self.tables_signature
+        if self._otherstatic_tables is None or self._stamp('other_static_tables') != signature:
+            self._set_stamp('other_static_tables',signature)
             output = []
-            for index, components in rds.items():
-                if index > 0:
-                    for comp in components:
-                        if comp['static'] is not None:
-                            df_list = self.split_dataframe_by_colmum(comp['static'],self.max_col_width_static)                        
-                            output.append({'conf':comp['conf'],'dfs': df_list})
+            for level,conf in self.go_through_configurations(0,self.store_level): #no variable frames needed
+                static = conf.static_dataframe if level > 0 else None
+                if static is not None:
+                    df_list = self.split_dataframe_by_colmum(static,self.max_col_width_static)
+                    output.append({'conf':conf,'dfs': df_list})
             self._otherstatic_tables = output
         return self._otherstatic_tables            
 
     @property
     def variable_tables(self):
         '''Grabs all valid variable dataframes and puts them in a list'''
-        if self._variable_tables is None or self._anything_changed:
+        signature = self.tables_signature
+        if self._variable_tables is None or self._stamp('variable_tables') != signature:
+            self._set_stamp('variable_tables',signature)
             rds = self.recursive_data_structure(self.store_level)
 
             output = []
@@ -337,19 +846,47 @@ class TabulationMixin(Configuration,ClientInfoMixin):
 
     @property
     def joined_dataframe(self):
-        '''this is a high level data frame with all data that changes in the system'''
-        if self._joined_dataframe is None or self._anything_changed:
-            if self.variable_tables:
-                self._joined_dataframe = pandas.concat([ vt['df'] for vt in list(reversed(self.variable_tables))],axis=1)
+        '''this is a high level data frame with all data that changes in the system, when the
+        components have only added rows since it was built those rows are appended to it. It is
+        empty until something varies'''
+        variable_tables = list(reversed(self.variable_tables))
+        if not variable_tables:
+            self._set_stamp('joined_dataframe',None)
+            self._joined_dataframe = pandas.DataFrame()
+            return self._joined_dataframe
+
+        if any([vt['conf'].TABLE.spilled_rows for vt in variable_tables]): #built in full, see spill_rows
+            self._set_stamp('joined_dataframe',None)
+            self._joined_dataframe = None
+            return pandas.concat([ vt['df'] for vt in variable_tables],axis=1)
+
+        layout = tuple([(id(vt['conf']),tuple(vt['df'].columns)) for vt in variable_tables])
+        lengths = tuple([len(vt['df']) for vt in variable_tables])
+        stamp = self._stamp('joined_dataframe')
+        frame = self._joined_dataframe
+
+        if frame is None or stamp is None or stamp[0] != layout:
+            frame = pandas.concat([ vt['df'] for vt in variable_tables],axis=1)
+        elif stamp[1] != lengths:
+            built = len(frame)
+            #rows already in the frame only stay valid if each table was complete or hasn't grown
+            if all([new >= old and (old == built or old == new) for old,new in zip(stamp[1],lengths)]):
+                tail = pandas.concat([ vt['df'].iloc[built:] for vt in variable_tables],axis=1)
+                frame = pandas.concat([frame,tail])
             else:
-                self._joined_dataframe = None
+                frame = pandas.concat([ vt['df'] for vt in variable_tables],axis=1)
+
+        self._set_stamp('joined_dataframe',(layout,lengths))
+        self._joined_dataframe = frame
         return self._joined_dataframe
 
     @property
     def complete_dataframe(self):
         '''this is a high level data frame with all data in the system'''
         #FIXME: join all dataframes
-        if self._complete_dataframe is None or self._anything_changed:
+        signature = self.tables_signature
+        if self._complete_dataframe is None or self._stamp('complete_dataframe') != signature:
+            self._set_stamp('complete_dataframe',signature)
 
             rds = self.recursive_data_structure()
             if rds:
@@ -391,30 +928,43 @@ class TabulationMixin(Configuration,ClientInfoMixin):
         
         iterates table_type,values,label'''
 
-        if not self.TABLE:
-            return 0,[],[]
-        if len(self.TABLE) <= 1:
-            yield 1,self.TABLE[0],self.data_label
+        table = self.TABLE
+        if not table:
+            return
+        if len(table) <= 1:
+            row = table[0]
+            yield 1,list(row.values()),list(row.keys())
         else:
-
-            for label in set.union(*[set(tuple(row.keys())) for row in self.TABLE]):
-                #col = numpy.array(col).flatten().tolist()
-                col = [row[label] if label in row else None for row in self.TABLE]
-
-                if all([isinstance(cvar,TABLE_TYPES) for cvar in col]): #do a type check
-                    if len(set(col)) <= 1: #All Values Are Similar
-                        yield 2, col[0], label #Can assume that first value is equal to all
+            #the table tracks each column's state as rows are saved, so this doesn't scan the data
+            for label in table.keys():
+                if table.is_tabular(label): #type check
+                    if table.is_constant(label): #All Values Are Similar
+                        yield 2, table.first(label), label #first value is equal to all
                     else:
-                        yield 3, col, label
+                        yield 3, table.column(label), label
 
     #Properties & Attribues
     #TODO: Switch to dict based recording, that way the data frame can sort out sparsity of data for intermittent vars
+    @classmethod
+    def row_extractor(cls) -> RowExtractor:
+        '''The compiled data_dict of this class, created on first use'''
+        extractor = cls.__dict__.get('_row_extractor')
+        if extractor is None:
+            extractor = RowExtractor(cls)
+            cls._row_extractor = extractor
+        return extractor
+
     @property
     def data_dict(self):
-        out = self.attr_dict
-        out.update(self.table_dict )
-        out['index'] = self.index
-        return {k.lower():v if v is not None else numpy.nan for k,v in out.items() if isinstance(v,TABLE_TYPES)}
+        if '_skip_attr' in self.__dict__: #instance skips, rare but we respect them
+            return RowExtractor(self.__class__,self._skip_attr)(self)
+        return self.row_extractor()(self)
+
+    def block_dict(self,size) -> dict:
+        '''the data_dict of a vectorized evaluation over `size` rows, see RowExtractor.block'''
+        if '_skip_attr' in self.__dict__:
+            return RowExtractor(self.__class__,self._skip_attr).block(self,size)
+        return self.row_extractor().block(self,size)
 
     @property
     def data_row(self):
@@ -433,9 +983,10 @@ class TabulationMixin(Configuration,ClientInfoMixin):
     @property
     def plot_variables(self):
         '''Checks columns for ones that only contain numeric types or haven't been explicitly skipped'''
-        if self.joined_dataframe is not None:
-            check_type = lambda key: all([ isinstance(v, NUMERIC_TYPES) for v in self.joined_dataframe[key] ])
-            return [ var.lower() for var in self.joined_dataframe.columns 
+        df = self.joined_dataframe
+        if not df.empty:
+            check_type = lambda key: all([ isinstance(v, NUMERIC_TYPES) for v in df[key] ])
+            return [ var.lower() for var in df.columns 
                                  if var.lower() not in self.skip_plot_vars and check_type(var)]
         return []
 
@@ -477,27 +1028,9 @@ class TabulationMixin(Configuration,ClientInfoMixin):
 
     @property
     def class_table_propeties(self):
-        '''Combine other classes table properties into this one, in the case of subclassed table_properties'''
-        if self.__table_properties is None or self.anything_changed:
-            self.__table_properties =  {}
-            cls = self.__class__
-            for k,obj in cls.__dict__.items():
-                if isinstance(obj,table_property):
-                    self.__table_properties[ k ] = obj
-
-            mrl = cls.mro()
-            inx_comp = mrl.index( TabulationMixin ) #Ensures everything is includes Tabulation Functionality
-            mrvs = mrl[1:inx_comp] 
-            for mrv in mrvs:
-                #Remove anything not in the user code
-                if issubclass(mrv,TabulationMixin) and 'ottermatics' not in mrv.__module__:
-                    for k,obj in mrv.__dict__.items():
-                        if k not in self.__table_properties and isinstance(obj,table_property):  #Precedent
-                            prop = getattr( self.__class__, k , None) #Assumes our instance has assumed this table propertie
-                            if prop and isinstance(prop,table_property):
-                                self.__table_properties[ k ] = prop                     
-        
-        return self.__table_properties
+        '''Combine other classes table properties into this one, in the case of subclassed table_properties
+        these are found once per class by the row extractor'''
+        return self.row_extractor().properties
 
     @classmethod
     def classmethod_table_propeties(cls):
@@ -554,11 +1087,11 @@ class TabulationMixin(Configuration,ClientInfoMixin):
 
     @classmethod
     def cls_all_property_labels(cls):
-        return [obj.label for k,obj in cls.classmethod_table_propeties().items() ]
+        return [label for k,obj in cls.classmethod_table_propeties().items() for label in obj.column_labels()]
 
     @classmethod
     def cls_all_property_keys(cls):
-        return [k for k,obj in cls.classmethod_table_propeties().items() ]                       
+        return [key for k,obj in cls.classmethod_table_propeties().items() for key in obj.column_keys(k)]
     
     @classmethod
     def cls_all_attrs_fields(cls):
@@ -587,32 +1120,102 @@ class TabulationMixin(Configuration,ClientInfoMixin):
     #Multi-Component Table Combination Methods
 
     #Saving & Data Acces Methods
+    def field_table(self,field) -> ColumnarTable:
+        '''the TABLE of this or an internal configuration (down to store_level) holding column `field`,
+        or None if there is no data
+        :returns: (table, column key)'''
+        any_data = False
+        for level,conf in self.go_through_configurations(0,self.store_level):
+            if not isinstance(conf,TabulationMixin) or not conf.TABLE:
+                continue
+            any_data = True
+            for key in (field,field.lower()):
+                if key in conf.TABLE:
+                    return conf.TABLE,key
+        if not any_data:
+            return None,field
+        raise KeyError('No Field Named {}'.format(field))
+
+    def table_column(self,field,finite=False,dtype=None) -> numpy.ndarray:
+        '''A read only numpy view of `field` straight from the TABLE storage, see field_table
+        :param finite: replace infinities with nan, the column is only copied if it has any
+        :param dtype: a numpy dtype or type the column must safely cast to, raises a TypeError otherwise'''
+        table,key = self.field_table(field)
+        if table is None:
+            return numpy.array([],dtype=float if dtype is None else dtype)
+        return self._typed_column(table.column(key),field,finite,dtype)
+
+    def table_columns(self,fields,finite=False,dtype=None) -> dict:
+        '''{field: read only view} for each of fields, see table_column'''
+        by_table = {}
+        for field in fields:
+            table,key = self.field_table(field)
+            by_table.setdefault(id(table),(table,[]))[1].append((field,key))
+
+        out = {}
+        for table,keys in by_table.values():
+            if table is None:
+                out.update({field:numpy.array([],dtype=float if dtype is None else dtype) for field,key in keys})
+                continue
+            values = table.columns([key for field,key in keys])
+            for field,key in keys:
+                out[field] = self._typed_column(values[key],field,finite,dtype)
+        return {field:out[field] for field in fields}
+
+    @staticmethod
+    def _typed_column(values,field,finite=False,dtype=None):
+        if dtype is not None:
+            dtype = numpy.dtype(dtype)
+            if values.dtype != dtype:
+                if not numpy.can_cast(values.dtype,dtype,'safe'):
+                    raise TypeError(f'field {field} of {values.dtype} can not be read as {dtype}')
+                values = read_only(values.astype(dtype))
+
+        if finite and values.dtype.kind == FLOAT_KIND:
+            infs = numpy.isinf(values)
+            if infs.any():
+                values = numpy.where(infs,numpy.nan,values)
+                values.flags.writeable = False
+        elif finite and values.dtype.kind == OBJECT_KIND:
+            values = numpy.array([numpy.nan if isinstance(v,float) and numpy.isinf(v) else v for v in values.tolist()],dtype=object)
+            values.flags.writeable = False
+        return values
+
     def get_field_from_table(self,field,check_type=None,check_value:Callable = None):
-        '''Converts Pandas To Numpy Array By Key, also handles poorly formated fields
-        :param check_type: use a type or tuple of types to validate if the field is of type table
+        '''Converts the joined dataframe column of `field` (or field.title()) to a numpy array copy
+        with infinities as nan, table_column reads a TABLE column without copying
+        :param check_type: use a type or tuple of types to validate if the field is of type table,
+                           numbers held as objects are cast to float when the types are all numeric
         :param check_value: use a function to check each value to ensure its valid for return, check type take priority'''
-        if self.joined_dataframe is None:
+        joined = self.joined_dataframe
+        if joined.empty:
             return numpy.array([])
-        elif field in self.joined_dataframe:                                              
-            table = self.joined_dataframe[field]
-        elif field.title() in self.joined_dataframe:
-            table = self.joined_dataframe[field.title()]
+        elif field in joined:
+            table = joined[field]
+        elif field.title() in joined:
+            table = joined[field.title()]
         else:
             raise Exception('No Field Named {}'.format(field))
-        
-        #Remove Infinity
-        table = table.replace([numpy.inf, -numpy.inf], numpy.nan)
 
-        if check_type is not None:    
-            if all([isinstance(v,check_type) for v in table]):
-                return table.to_numpy(copy=True)
-            return None            
+        table = self._typed_column(table.to_numpy(copy=True),field,finite=True)
+        table.flags.writeable = True
+
+        if check_type is not None:
+            types = check_type if isinstance(check_type,tuple) else (check_type,)
+            kind_types = {FLOAT_KIND:float,INT_KIND:int}
+            if table.dtype.kind in kind_types: #the column type decides, no need to look at each value
+                return table if any([issubclass(kind_types[table.dtype.kind],typ) for typ in types]) else None
+            if not all([isinstance(v,check_type) for v in table.tolist()]):
+                return None
+            if all([issubclass(typ,numbers.Number) and not issubclass(typ,bool) for typ in types]):
+                return table.astype(float)
+            return table
         elif check_value is not None:
             if all([check_value(v) for v in table]):
-                return table.to_numpy(copy=True)
+                return table
             return None                       
 
-        return table.to_numpy(dtype=float,copy=True)
+        return table
 
         
 
@@ -688,47 +1291,116 @@ class TabulationMixin(Configuration,ClientInfoMixin):
             cur_index += (3,0)   
 
     #Save functionality
-    def save_table(self,dataframe=None,filename=None,meta_tags=None,*args,**kwargs):
-        '''Header method to save the config in many different formats
-        :param meta_tags: a dictionary with headers being column names, and the value as the item to fill that column'''
+    def save_table(self,dataframe=None,filename=None,meta_tags=None,*args,background=None,**kwargs) -> Future:
+        '''Header method to save the config in many different formats, file formats are written by 
+        the TableWriter thread and gsheets on the calling thread
+        :param meta_tags: a dictionary with headers being column names, and the value as the item to fill that column
+        :param background: write files on the TableWriter thread, defaults to `background_save`
+        :returns: a future of the written file paths'''
         if dataframe is None:
             dataframe = self.dataframe
         
-        self.info('saving gsheets...')
-
+        #the writer gets its own frame, so later changes to ours dont end up in the file
+        dataframe = dataframe.copy() 
         if meta_tags is not None and type(meta_tags) is dict:
             for tag,value in meta_tags.items():
                 dataframe[tag] = value
 
+        file_formats = [fmt for fmt in self.store_types if fmt in self.__file_store_options]
+        background = self.background_save if background is None else background
+        write = self._write_tables
+        if instrumentation.ACTIVE is not None: #timed where it runs, perhaps on the writer thread
+            write = instrumentation.ACTIVE.timed('save_table',type(self).__name__,write)
+        if background:
+            future = TableWriter().submit(write,file_formats,dataframe,filename,*args,**kwargs)
+        else:
+            future = Future()
+            future.set_result(write(file_formats,dataframe,filename,*args,**kwargs))
 
-        for save_format in self.store_types:
+        if 'gsheets' in self.store_types:
+            self.info('saving gsheets...')
             try:
-                if save_format == 'csv':
-                    self.save_csv(dataframe,filename,*args,**kwargs)
-                elif save_format == 'excel':
-                    self.save_excel(dataframe,filename,*args,**kwargs)
-                elif save_format == 'gsheets':
-                    self.save_gsheets(dataframe,filename,*args,**kwargs)
+                self.save_gsheets(dataframe,filename,*args,**kwargs)
             except Exception as e:
-                self.error(e,'Issue Saving Tables:')                      
+                self.error(e,'Issue Saving Tables:')
+
+        return future
+
+    def _write_tables(self,file_formats,dataframe,filename=None,*args,**kwargs):
+        '''writes `dataframe` in each of file_formats, returning the paths written'''
+        paths = []
+        for save_format in file_formats:
+            try:
+                writer = getattr(self,self.__file_store_options[save_format])
+                paths.append(writer(dataframe,filename,*args,**kwargs))
+            except Exception as e:
+                self.error(e,'Issue Saving Tables:')
+        return [path for path in paths if path]
+
+    def wait_for_tables(self,timeout=None):
+        '''blocks until the tables handed to the TableWriter thread are written'''
+        return TableWriter().wait(timeout)
+
+    def table_dtypes(self,dataframe) -> dict:
+        '''explicit dtypes of the dataframe's columns from the TABLE column kinds, object columns
+        are written as strings'''
+        kinds = self.TABLE.kinds
+        dtypes = {}
+        for col in dataframe.columns:
+            kind = kinds.get(col, kinds.get(col.lower()) if isinstance(col,str) else None)
+            if kind == FLOAT_KIND:
+                dtypes[col] = 'float64'
+            elif kind == INT_KIND:
+                dtypes[col] = 'int64'
+            elif kind == OBJECT_KIND or dataframe[col].dtype == object:
+                dtypes[col] = 'string'
+        return dtypes
+
+    def typed_dataframe(self,dataframe):
+        '''the dataframe cast to table_dtypes with a plain index, for the columnar formats'''
+        dtypes = self.table_dtypes(dataframe)
+        for col,dtype in list(dtypes.items()):
+            if dtype == 'string': #keep missing values missing
+                dtypes[col] = pandas.StringDtype()
+        return dataframe.astype(dtypes).reset_index(drop=True)
+
+    def table_filepath(self,filename,ext):
+        if filename is None:
+            filename = '{}.{}'.format(self.filename,ext)
+        if type(filename) is str and not filename.endswith('.'+ext):
+            filename += '.'+ext
+        return os.path.join(self.config_path_daily,filename)
+
+    def save_csv(self,dataframe,filename=None,*args,compression=None,ext='csv',**kwargs):
+        if self.TABLE:
+            filepath = self.table_filepath(filename,ext)
+            dataframe.to_csv(path_or_buf=filepath,index=False,compression=compression,*args,**kwargs)
+            return filepath
+
+    def save_csv_gzip(self,dataframe,filename=None,*args,**kwargs):
+        return self.save_csv(dataframe,filename,*args,compression='gzip',ext='csv.gz',**kwargs)
+
+    def save_csv_zstd(self,dataframe,filename=None,*args,**kwargs):
+        '''requires the zstandard package'''
+        return self.save_csv(dataframe,filename,*args,compression='zstd',ext='csv.zst',**kwargs)
 
-    def save_csv(self,dataframe,filename=None,*args,**kwargs):
+    def save_parquet(self,dataframe,filename=None,*args,**kwargs):
         if self.TABLE:
-            if filename is None:
-                filename = '{}.csv'.format(self.filename)
-            if type(filename) is str and not filename.endswith('.csv'):
-                filename += '.csv'
-            filepath = os.path.join(self.config_path_daily,filename)
-            dataframe.to_csv(path_or_buf=filepath,index=False,*args,**kwargs)
+            filepath = self.table_filepath(filename,'parquet')
+            self.typed_dataframe(dataframe).to_parquet(filepath,index=False,*args,**kwargs)
+            return filepath
+
+    def save_feather(self,dataframe,filename=None,*args,**kwargs):
+        if self.TABLE:
+            filepath = self.table_filepath(filename,'feather')
+            self.typed_dataframe(dataframe).to_feather(filepath,*args,**kwargs)
+            return filepath
 
     def save_excel(self,dataframe,filename=None,*args,**kwargs):
         if self.TABLE:
-            if filename is None:
-                filename = '{}.xlsx'.format(self.filename)
-            if type(filename) is str and not filename.endswith('.xlsx'):
-                filename += '.xlsx'
-            filepath = os.path.join(self.config_path_daily,filename)
-            dataframe.to_excel(path_or_buf=filepath,*args,**kwargs)
+            filepath = self.table_filepath(filename,'xlsx')
+            dataframe.to_excel(filepath,*args,**kwargs)
+            return filepath
 
     def save_gsheets(self,dataframe,filename=None,index=False,*args,**kwargs):
         '''A function to save the table to google sheets
@@ -801,6 +1473,8 @@ if __name__ == '__main__':
     import unittest
     import io
     import tempfile
+    import pickle
+    import copy
 
     @otterize
     class TestConfig(TabulationMixin):
@@ -825,6 +1499,64 @@ if __name__ == '__main__':
         def test_four(self):
             return numpy.random.rand(100)
 
+    @otterize
+    class CachedConfig(TabulationMixin):
+
+        length = attr.ib(1.0)
+        load = attr.ib(2.0)
+        calls = 0
+
+        @table_property(cached=True)
+        def per_row(self):
+            self.calls += 1
+            return self.length * 2
+
+        @table_property(cached=True,depends_on=('load',))
+        def stress(self):
+            self.calls += 1
+            return self.load * 3
+
+    @otterize
+    class VectorConfig(TabulationMixin):
+
+        length = attr.ib(1.0)
+        always_save_data = True
+
+        @vector_property(split_cols=('x','y','z'))
+        def cog(self):
+            return numpy.array([self.length/2.0,0.0,0.0])
+
+    @otterize
+    class NestedConfig(TabulationMixin):
+
+        inner = attr.ib(factory=VectorConfig)
+        cached = attr.ib(factory=CachedConfig)
+
+    @otterize
+    class BlockConfig(TabulationMixin):
+
+        length = attr.ib(1.0)
+        always_save_data = True
+
+        @table_property
+        def double(self):
+            return self.length * 2
+
+        @table_property(array_safe=False)
+        def size(self):
+            return 'big' if self.length > 2 else 'small'
+
+    @otterize
+    class HolderConfig(TabulationMixin):
+
+        length = attr.ib(1.0)
+        inner = attr.ib(factory=VectorConfig)
+        always_save_data = True
+
+        @table_property
+        def double(self):
+            return self.length * 2
+
     class Test(unittest.TestCase):
         test_file_name= 'test_dataframe_file'
         test_dir = '~/'
@@ -870,6 +1602,163 @@ if __name__ == '__main__':
             self.test_config.save_data()
             self.assertTrue(self.test_config.variable_data_dict)
 
+        def test_cached_property(self):
+            conf = CachedConfig()
+            conf.save_data()
+            self.assertEqual(conf.calls, 2)
+            conf.data_dict
+            self.assertEqual(conf.calls, 4) #both values were dropped by the save
+            conf.data_dict
+            self.assertEqual(conf.calls, 4)
+            conf.length = 3.0
+            self.assertEqual(conf.per_row, 6.0)
+            self.assertEqual(conf.calls, 5) #stress doesn't depend on length
+            conf.load = 1.0
+            self.assertEqual(conf.stress, 3.0)
+            self.assertEqual(conf.calls, 6)
+
+        def test_dirty_fields(self):
+            conf = CachedConfig()
+            self.assertFalse(conf.is_dirty())
+            conf.load = 4.0
+            self.assertEqual(conf.dirty,{'load'})
+            self.assertTrue(conf.is_dirty('length','load'))
+            self.assertFalse(conf.is_dirty('length'))
+            version = conf.change_version
+            conf.length = 2.0
+            self.assertEqual(conf.change_version,version+1)
+            self.assertEqual(conf.dirty_configurations(),{conf:{'load','length'}})
+            conf.save_data()
+            self.assertFalse(conf.dirty)
+
+        def test_tree_index(self):
+            conf = NestedConfig()
+            index = conf.tree_index()
+            self.assertEqual([(node.level,node.path) for node in index],[(0,()),(1,('inner',)),(1,('cached',))])
+            self.assertIs(conf.tree_index(),index) #cached
+            conf.inner.length = 2.0
+            self.assertIs(conf.tree_index(),index)
+            conf.inner = VectorConfig(name='other')
+            self.assertIsNot(conf.tree_index(),index)
+            self.assertEqual([c.name for l,c in conf.go_through_configurations(0,0)],['default'])
+            self.assertEqual(conf.internal_configurations['inner'].name,'other')
+            conf.tree_index()
+            conf.extra = VectorConfig(name='extra') #a plain attribute
+            self.assertEqual(conf.tree_index()[-1].path,('extra',))
+            copied = copy.copy(conf)
+            self.assertIs(copied.tree_index()[0].config,copied)
+            self.assertIsNot(copied.tree_index()[1].config,conf.inner)
+
+        def test_cache_copies(self):
+            conf = HolderConfig()
+            self.assertEqual(conf.internal_configurations,{'inner':conf.inner})
+            for length in (1.0,2.0):
+                conf.length = length
+                conf.save_data()
+            self.assertEqual(list(conf.dataframe['double']),[2.0,4.0])
+            self.assertEqual(set(conf.__dict__) & {'_dataframe','_cache_stamps'},set())
+            other = pickle.loads(pickle.dumps(conf))
+            self.assertEqual(other.length,2.0)
+            self.assertEqual(len(other.TABLE),2)
+            self.assertIsNone(other._tabulation_cache)
+            copied = copy.copy(conf)
+            self.assertEqual(copied.length,2.0)
+            self.assertIsNot(copied.inner,conf.inner)
+            copied.length = 3.0
+            copied.save_data()
+            self.assertEqual(len(copied.TABLE),3)
+            self.assertEqual(len(conf.TABLE),2)
+            self.assertEqual(list(copied.dataframe['double']),[2.0,4.0,6.0])
+            self.assertIsNot(copied._cache_stamps,conf._cache_stamps)
+            self.assertEqual(list(conf.dataframe['double']),[2.0,4.0])
+
+        def test_vector_property(self):
+            conf = VectorConfig()
+            for length in (1.0,2.0,4.0):
+                conf.length = length
+                conf.save_data()
+            self.assertEqual(conf.TABLE.block('cog').shape,(3,3))
+            self.assertEqual(list(conf.dataframe['cog_x']),[0.5,1.0,2.0])
+            self.assertIn('cog_x',conf.variable_data_dict)
+            self.assertIn('cog_y',conf.static_data_dict)
+            self.assertEqual(VectorConfig.cls_all_property_keys(),['cog_x','cog_y','cog_z'])
+
+        def test_fingerprint(self):
+            conf,other = NestedConfig(),NestedConfig()
+            self.assertEqual(conf.fingerprint(),other.fingerprint())
+            other.inner.length = 2.0
+            self.assertNotEqual(conf.fingerprint(),other.fingerprint())
+            other.inner.length = numpy.array([1.0,2.0])
+            fingerprint = other.fingerprint()
+            other.inner.length = numpy.array([1.0,3.0])
+            self.assertNotEqual(other.fingerprint(),fingerprint)
+            fingerprint = other.fingerprint()
+            other.extra = VectorConfig(name='extra') #a plain attribute, as tree_index walks them
+            self.assertNotEqual(other.fingerprint(),fingerprint)
+            fingerprint = other.fingerprint()
+            other.extra.length = 3.0
+            self.assertNotEqual(other.fingerprint(),fingerprint)
+
+        def test_save_block(self):
+            rows,block = BlockConfig(),BlockConfig()
+            for length in (1.0,2.0,3.0,4.0):
+                rows.length = length
+                rows.save_data()
+            block.length = numpy.array([1.0,2.0,3.0,4.0])
+            block.save_block(4)
+            block.length = 1.0
+            self.assertEqual(block.index,4)
+            self.assertEqual(list(block.dataframe['size']),['small','small','big','big'])
+            pandas.testing.assert_frame_equal(rows.dataframe,block.dataframe)
+
+        def test_table_column(self):
+            conf = VectorConfig()
+            for length in (1.0,numpy.inf):
+                conf.length = length
+                conf.save_data()
+            cog = conf.table_column('cog_x')
+            self.assertFalse(cog.flags.writeable)
+            self.assertTrue(numpy.isinf(cog[1]))
+            self.assertTrue(numpy.isnan(conf.table_column('cog_x',finite=True)[1]))
+            self.assertEqual(conf.table_columns(['index','length'],dtype=float)['index'].dtype,numpy.float64)
+            with self.assertRaises(TypeError):
+                conf.table_column('name',dtype=float)
+            field = conf.get_field_from_table('cog_x')
+            field[0] = 2.0 #a copy
+            self.assertEqual(cog[0],0.5)
+
+        def test_spilled_frames(self):
+            with tempfile.TemporaryDirectory() as tmp:
+                conf,memory = BlockConfig(),BlockConfig()
+                conf.spill_rows,conf.spill_path = 2,tmp
+                for length in (1.0,2.0,3.0,4.0,5.0):
+                    for each in (conf,memory):
+                        each.length = length
+                        each.save_data()
+                self.assertEqual(conf.TABLE.spilled_rows,4)
+                self.assertEqual([len(df) for df in conf.iter_dataframes()],[2,2,1])
+                pandas.testing.assert_frame_equal(pandas.concat(conf.iter_dataframes()),memory.dataframe)
+                pandas.testing.assert_frame_equal(conf.dataframe,memory.dataframe)
+                pandas.testing.assert_frame_equal(conf.joined_dataframe,memory.joined_dataframe)
+                self.assertIsNone(conf._dataframe) #read from the segments each time
+                self.assertIsNone(conf._variable_dataframe)
+                self.assertIsNone(conf._joined_dataframe)
+                self.assertIsNotNone(memory._dataframe)
+
+        def test_get_field_from_table(self):
+            conf = BlockConfig()
+            self.assertEqual(len(conf.get_field_from_table('size')),0)
+            for length in (1.0,3.0):
+                conf.length = length
+                conf.save_data()
+            self.assertEqual(list(conf.get_field_from_table('size')),['small','big'])
+            self.assertEqual(list(conf.get_field_from_table('size',check_type=str)),['small','big'])
+            self.assertIsNone(conf.get_field_from_table('size',check_type=float))
+            self.assertEqual(list(conf.get_field_from_table('length',check_type=float)),[1.0,3.0])
+            self.assertIsNone(conf.get_field_from_table('length',check_type=str))
+            with self.assertRaises(Exception):
+                conf.get_field_from_table('missing')
+
         def file_in_format(self,fileextension,path=True):
             fille =  '{}.{}'.format(self.test_file_name,fileextension)
             if path:
@@ -891,6 +1780,21 @@ if __name__ == '__main__':
             #self.test_config.save_excel(self.file_in_format('xlsx'))
             #self.assertIn(self.file_in_format('xlsx',False),os.listdir(self.test_dir))
 
+        def test_table_formats(self):
+            conf = VectorConfig()
+            for length in (1.0,2.0):
+                conf.length = length
+                conf.save_data()
+            conf.store_types = ['csv.gz','parquet','feather']
+            future = conf.save_table(filename=os.path.join(self.test_dir,self.test_file_name))
+            paths = future.result(timeout=30)
+            self.assertEqual(len(paths),3)
+            self.assertTrue(paths[0].endswith('.csv.gz'))
+            df = pandas.read_parquet(self.file_in_format('parquet'))
+            self.assertEqual(list(df['cog_x']),[0.5,1.0])
+            self.assertEqual(str(df['name'].dtype),'string')
+            self.assertEqual(pandas.read_feather(self.file_in_format('feather')).shape,df.shape)
+
         def test_table_to_gsheets(self):
             pass
         
@@ -0,0 +1,281 @@
+'''Benchmarks of the tabulation and analysis hot paths
+
+A synthetic analysis tree is built with `width` components held by each configuration down to
+`depth` levels, every component has numeric and string attrs fields plus table properties. The
+benchmarks time saving rows, data_dict, building dataframes, recursive_data_structure, save_csv
+and pickling over `rows` rows. An iterator analysis evaluating `rows` leaves is solved with and
+without instrument, the cost of the instrumentation hooks is the ratio of the two.
+
+Results are written as json and can be compared with a stored baseline, a benchmark whose best
+time is slower than the baseline by more than the threshold is a regression and the exit code is 1.
+The best of the repeats is compared since it is the least noisy. Baselines are machine specific so
+none is kept in the repository, make one on the machine doing the comparison (locally or as a CI
+step) by saving a run of the reference commit, then compare later runs with it.
+
+python -m testing.benchmarks --save testing/benchmark_baseline.json   #on the reference commit
+python -m testing.benchmarks --baseline --threshold 1.5                #compares with that file
+python -m testing.benchmarks --baseline results.json
+'''
+import argparse
+import datetime
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import attr
+import numpy
+import pandas
+
+from ottermatics.configuration import otterize
+from ottermatics.tabulation import table_property
+from ottermatics.components import Component, ComponentIterator
+from ottermatics.analysis import Analysis
+
+#The default baseline, made locally with --save and ignored by git
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),'benchmark_baseline.json')
+
+#Synthetic Trees
+@otterize
+class BenchLeaf(Component):
+    length = attr.ib(1.0)
+    width = attr.ib(2.0)
+    count = attr.ib(3)
+    label = attr.ib('leaf')
+
+    always_save_data = True
+
+    @table_property
+    def area(self):
+        return self.length * self.width
+
+    @table_property
+    def ratio(self):
+        return self.length / self.width
+
+    @table_property
+    def tag(self):
+        return f'{self.label}_{self.count}'
+
+_tree_classes = {}
+
+def tree_class(width,depth,base=Component):
+    '''a component class holding `width` components of the class one level down, depth 0 is the
+    leaf, classes are made once per (width,depth)'''
+    if depth <= 0 and base is Component:
+        return BenchLeaf
+    key = (width,depth,base)
+    if key not in _tree_classes:
+        child = tree_class(width,depth-1)
+        body = {f'child_{inx}': attr.ib(factory=child) for inx in range(width)}
+        body.update(scale=attr.ib(1.0),always_save_data=True,
+                    total=table_property(lambda self: self.scale * width,label='total'))
+        prefix = 'BenchAnalysis' if base is Analysis else 'BenchNode'
+        cls = otterize(type(f'{prefix}{width}x{depth}',(base,),body))
+        globals()[cls.__name__] = cls #so pickle finds it
+        _tree_classes[key] = cls
+    return _tree_classes[key]
+
+def make_analysis(width,depth):
+    '''an analysis with `width` components per level down to `depth`'''
+    return tree_class(width,depth,Analysis)()
+
+def leaves(analysis):
+    return [conf for level,conf in analysis.go_through_components() if isinstance(conf,BenchLeaf)]
+
+def fill_rows(analysis,rows):
+    '''saves `rows` rows through the whole tree, changing each leaf so every table grows'''
+    parts = leaves(analysis)
+    for inx in range(rows):
+        analysis.scale = float(inx)
+        for leaf in parts:
+            leaf.length = float(inx)
+        analysis.save_data()
+    return analysis
+
+#Benchmarks, each takes (width,depth,rows) and returns a callable to time, built with setup untimed
+def bench_save_data(width,depth,rows):
+    def run():
+        fill_rows(make_analysis(width,depth),rows)
+    return run
+
+def bench_data_dict(width,depth,rows):
+    confs = [conf for level,conf in make_analysis(width,depth).go_through_components()]
+    def run():
+        for inx in range(rows):
+            for conf in confs:
+                conf.data_dict
+    return run
+
+def bench_dataframe(width,depth,rows):
+    analysis = fill_rows(make_analysis(width,depth),rows)
+    confs = [conf for level,conf in analysis.go_through_components()]
+    def run():
+        for conf in confs:
+            conf.reset_meta()
+            conf.dataframe
+    return run
+
+def bench_joined_dataframe(width,depth,rows):
+    analysis = fill_rows(make_analysis(width,depth),rows)
+    confs = [conf for level,conf in analysis.go_through_components()]
+    def run():
+        for conf in confs:
+            conf.reset_meta()
+        analysis.joined_dataframe
+    return run
+
+def bench_recursive_data_structure(width,depth,rows):
+    analysis = fill_rows(make_analysis(width,depth),rows)
+    confs = [conf for level,conf in analysis.go_through_components()]
+    def run():
+        for conf in confs:
+            conf.reset_meta()
+        analysis.recursive_data_structure()
+    return run
+
+def bench_save_csv(width,depth,rows):
+    analysis = fill_rows(make_analysis(width,depth),rows)
+    dataframe = analysis.joined_dataframe
+    folder = tempfile.mkdtemp()
+    def run():
+        analysis.save_csv(dataframe,os.path.join(folder,'bench.csv'))
+    return run
+
+def bench_pickle(width,depth,rows):
+    analysis = fill_rows(make_analysis(width,depth),rows)
+    def run():
+        pickle.loads(pickle.dumps(analysis))
+    return run
+
+@otterize
+class BenchLeaves(ComponentIterator):
+    _iterated_component_type = BenchLeaf
+
+@otterize
+class BenchSolve(Analysis):
+    '''a light evaluate over leaves, where the hooks cost the most relative to the work'''
+    leaves = attr.ib(factory=BenchLeaves)
+    gain = attr.ib(1.0)
+    mode = 'iterator'
+
+    @property
+    def component_iterator(self):
+        return self.leaves
+
+    def evaluate(self,item):
+        self.gain = 2.0 * item.length
+        return item.length
+
+    @table_property
+    def output(self):
+        return self.gain + 1.0
+
+def solve_benchmark(instrument):
+    '''solves of a BenchSolve over `rows` leaves, the tables grow by `rows` each time'''
+    def bench(width,depth,rows):
+        analysis = BenchSolve()
+        analysis.instrument = instrument
+        analysis.leaves.component_list = [BenchLeaf(length=float(inx)) for inx in range(rows)]
+        def run():
+            analysis._solved = False
+            analysis.solve()
+        return run
+    return bench
+
+BENCHMARKS = {'save_data': bench_save_data,
+              'data_dict': bench_data_dict,
+              'dataframe': bench_dataframe,
+              'joined_dataframe': bench_joined_dataframe,
+              'recursive_data_structure': bench_recursive_data_structure,
+              'save_csv': bench_save_csv,
+              'pickle': bench_pickle,
+              'solve': solve_benchmark(False),
+              'solve_instrumented': solve_benchmark(True)}
+
+#Running & Comparison
+def time_benchmark(name,width,depth,rows,repeat=7):
+    run = BENCHMARKS[name](width,depth,rows)
+    times = []
+    for inx in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {'min_s': min(times),'median_s': float(numpy.median(times)),'mean_s': float(numpy.mean(times)),
+            'repeat': repeat,'width': width,'depth': depth,'rows': rows}
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git','rev-parse','--short','HEAD'],stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+def run_benchmarks(names=None,width=3,depth=2,rows=200,repeat=7) -> dict:
+    names = list(BENCHMARKS) if not names else names
+    results = {}
+    for name in names:
+        results[name] = time_benchmark(name,width,depth,rows,repeat)
+        print(f'{name:<28}{1000*results[name]["median_s"]:>12.3f} ms')
+    if 'solve' in results and 'solve_instrumented' in results:
+        overhead = results['solve_instrumented']['min_s'] / results['solve']['min_s'] - 1
+        print(f'{"instrument overhead":<28}{100*overhead:>12.1f} %')
+    return {'meta': {'created': datetime.datetime.utcnow().isoformat(),
+                     'commit': git_commit(),
+                     'python': platform.python_version(),
+                     'numpy': numpy.__version__,
+                     'pandas': pandas.__version__,
+                     'machine': platform.platform(),
+                     'width': width,'depth': depth,'rows': rows,'repeat': repeat},
+            'results': results}
+
+def compare(results,baseline,threshold=1.5) -> pandas.DataFrame:
+    '''a row per benchmark in both with the ratio of the best times to the baseline, ratios over
+    the threshold are regressions when the tree sizes match'''
+    rows = []
+    for name,result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['min_s'] / base['min_s'] if base['min_s'] else numpy.nan
+        same_size = all([result[key] == base[key] for key in ('width','depth','rows')])
+        rows.append({'benchmark': name,'min_s': result['min_s'],'baseline_s': base['min_s'],
+                     'ratio': ratio,'same_size': same_size,'regression': same_size and ratio > threshold})
+    return pandas.DataFrame(rows,columns=['benchmark','min_s','baseline_s','ratio','same_size','regression'])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser('ottermatics benchmarks')
+    parser.add_argument('--width',type=int,default=3,help='components held by each configuration')
+    parser.add_argument('--depth',type=int,default=2,help='levels of components below the analysis')
+    parser.add_argument('--rows',type=int,default=200,help='rows saved through the tree')
+    parser.add_argument('--repeat',type=int,default=7)
+    parser.add_argument('--only',nargs='*',choices=list(BENCHMARKS),help='benchmarks to run')
+    parser.add_argument('--save',help='write the results json here')
+    parser.add_argument('--baseline',nargs='?',const=BASELINE,
+                        help='compare with a results json, by default one saved to testing/benchmark_baseline.json')
+    parser.add_argument('--threshold',type=float,default=1.5,help='slowdown ratio that is a regression')
+    args = parser.parse_args(argv)
+    if args.baseline and not os.path.exists(args.baseline):
+        parser.error(f'no baseline at {args.baseline}, make one with --save {args.baseline} on the reference commit')
+
+    results = run_benchmarks(args.only,args.width,args.depth,args.rows,args.repeat)
+    if args.save:
+        with open(args.save,'w') as fp:
+            json.dump(results,fp,indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        comparison = compare(results,baseline,args.threshold)
+        print(comparison.to_string(index=False))
+        if comparison['regression'].any():
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
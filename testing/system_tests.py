@@ -28,6 +28,9 @@ class ImportTest( unittest.TestCase ):
     def test_import_analysis(self):
         import analysis
 
+    def test_import_columnar(self):
+        import columnar
+
     def test_import_common(self):
         import common
 
@@ -43,6 +46,9 @@ class ImportTest( unittest.TestCase ):
     def test_import_gdocs(self):
         import gdocs
 
+    def test_import_instrumentation(self):
+        import instrumentation
+
     def test_import_locations(self):
         import locations
 
@@ -58,9 +64,18 @@ class ImportTest( unittest.TestCase ):
     def test_import_patterns(self):
         import patterns
 
+    def test_import_sampling(self):
+        import sampling
+
+    def test_import_sources(self):
+        import sources
+
     def test_import_solid_materials(self):
         import solid_materials
 
+    def test_import_stopping(self):
+        import stopping
+
     def test_import_tabulation(self):
         import tabulation
 